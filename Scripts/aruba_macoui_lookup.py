@@ -1,13 +1,21 @@
 import os
-from netmiko import ConnectHandler
 from datetime import date
 from update_oui_vendors import update_oui
 from mac_vendor_lookup import MacLookup, BaseMacLookup
 import pandas as pd
 import getpass
 import logging
+from parquet_export import DatasetWriter, prompt_dataset_export
 import time
+from connect_helper import open_connection
+from table_parser import parse_fixed_width, table_rows
+from device_detect import FingerprintCache, connect_detected
+from progress import Progress
+from snapshot_store import SnapshotStore
+from timing_profiles import TimingProfiles
 
+# Columns of the mac_lookup Parquet dataset - the CSV columns plus the switch they came from
+MAC_LOOKUP_DATASET_COLUMNS = ["Hostname", "Switch IP", "VLAN", "MAC Address", "MAC Vendor", "Interface"]
 
 # Function to gather device type information based on MAC OUI
 def lookup_mac_oui(mac_address):
@@ -24,25 +32,18 @@ def lookup_mac_oui(mac_address):
 
 def parse_mac_table(mac_table):
     parsed_entries = []
-    mac_lines = mac_table.split('\n')
-    processed_lines = 0  # Counter for processed lines
+    # Column spans come from the 'MAC Address  Port  VLAN' header once; every row is sliced in one pass
+    table = parse_fixed_width(mac_table, ["MAC Address", "Port", "VLAN"])
+    progress = Progress("Parsing MAC entries", total=len(table["MAC Address"]), unit="entries")
 
-    for line in mac_lines:
-        if line.strip().endswith("VLAN") or line.strip().endswith("--") or line.strip().endswith("Table") or not line.strip():
-            continue  # Ignore system MACs, separator lines, or empty lines
+    for mac_address, interface, vlan in table_rows(table, ["MAC Address", "Port", "VLAN"]):
+        progress.update()
 
-        # Split the line by whitespace
-        parts = line.split()
-        if len(parts) < 3:
-            print(f"Skipping line: {line}")
-            continue  # Skip incomplete lines
+        if not mac_address or not interface or not vlan:
+            progress.write(f"Skipping row: {mac_address} {interface} {vlan}")
+            continue  # Skip incomplete rows
 
         try:
-            # Extract the VLAN, MAC address, and interface
-            vlan = parts[2]
-            mac_address = parts[0]
-            interface = parts[1]
-
             # Perform additional processing
             mac_oui = lookup_mac_oui(mac_address)
 
@@ -55,17 +56,9 @@ def parse_mac_table(mac_table):
             parsed_entries.append(parsed_entry)
 
         except Exception as e:
-            print(f"Error parsing line: {line}\nError: {e}")
-
-        # Increment the counter
-        processed_lines += 1
-
-        # Calculate the progress percentage
-        progress = (processed_lines / len(mac_lines)) * 100
-
-        # Print the progress message
-        print(f"\r{progress:.2f}% - Parsed {processed_lines}/{len(mac_lines)} MAC entries", end='')
+            progress.write(f"Error parsing row: {mac_address} {interface} {vlan}\nError: {e}")
 
+    progress.close()
     return parsed_entries
 
 def main():
@@ -77,87 +70,111 @@ def main():
         today = date.isoformat(date.today())
         username = input("Enter your TACACS username: ")
         password = getpass.getpass(prompt="Enter your TACACS password: ")
+        dataset = DatasetWriter("mac_lookup", site_id, MAC_LOOKUP_DATASET_COLUMNS) if prompt_dataset_export() else None
 
-        # Create a log file for this session
-        log_filename = f"session_{site_id}_{today}.log"
-        logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(message)s')
-
-        # Validate the format of the input
-        switch_list = switches.split(',')
-        switch_list = [s.strip() for s in switch_list]  # Remove leading/trailing whitespace
-
-        for switch in switch_list:
-            device = {
-                'device_type': 'aruba_os',
-                'ip': switch,
-                'username': username,
-                'password': password,
-                'global_delay_factor': 3,
-            }
+        # MAC entries also go to the shared snapshot database
+        store = SnapshotStore()
+        snapshot = store.start('aruba_macoui_lookup', site_id)
 
-            try:
-                # Establish an SSH connection to the device
-                connection = ConnectHandler(**device)
-                logging.info(f'Connected to device IP: {switch}')
-
-                # Send the 'enable' command without a password
-                connection.enable()
-                logging.info('Enabled mode')
-
-                connection.send_command('screen-length 1000')
-
-                # Retrieve the hostname from the device
-                prompt = connection.find_prompt()
-                hostname = prompt.rstrip('#')
-                logging.info(f'Retrieved switch name: {hostname}')
-                print(f"\nCollecting MACs from {hostname}.")
-
-                # Send the 'show mac' command and collect the output
-                mac_table = connection.send_command('show mac-add')
-                logging.info('Executed "show mac-add" command')
-
-                # Close the SSH connection
-                connection.disconnect()
-                logging.info('Disconnected from device')
-
-                # Process MAC table through parse_mac_table function.
-                print(f"\nParsing MAC Table for {hostname}")
-                logging.info(f"Parsing MAC Table for {hostname}")
-                parsed_entries = parse_mac_table(mac_table)
-
-                if parsed_entries:
-                    # Create a DataFrame from the parsed entries
-                    df = pd.DataFrame(parsed_entries)
-
-                    # Rename the columns to match your desired output
-                    df = df.rename(columns={
-                        "vlan": "VLAN",
-                        "mac_address": "MAC Address",
-                        "mac_oui": "MAC Vendor",
-                        "interface": "Interface",
-                    })
-
-                    # Set output dir to Output
-                    output_dir = 'Output'
-                    if not os.path.exists(output_dir):
-                        os.makedirs(output_dir)
-
-                    # Determine the file name
-                    filename = f"{site_id} - {hostname} - mac_lookup - {today}.csv"
-
-                    # Save the data to a CSV file
-                    outfile = os.path.join(output_dir, filename)
-                    df.to_csv(outfile, index=False)
-
-                    print(f"MAC lookup results exported for {hostname} to {filename}")
-                    logging.info(f"MAC lookup results exported for {hostname} to {filename}")
-                else:
-                    print(f"No valid data found for {hostname}")
-                    logging.warning(f"No valid data found for {hostname}")
-
-            except Exception as e:
-                print(f"An error occurred: {str(e)}")
-                logging.error(f"An error occurred: {str(e)}")
+        try:
+            # Create a log file for this session
+            log_filename = f"session_{site_id}_{today}.log"
+            logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(message)s')
+
+            # Validate the format of the input
+            switch_list = switches.split(',')
+            switch_list = [s.strip() for s in switch_list]  # Remove leading/trailing whitespace
+
+            # Learned per-switch timing replaces the flat delay factor once a switch has history
+            timing = TimingProfiles()
+
+            # Cached device types so only new or expired switches are probed
+            fingerprints = FingerprintCache()
+
+            for switch in switch_list:
+                device = {
+                    'ip': switch,
+                    'username': username,
+                    'password': password,
+                    'global_delay_factor': 3,  # Default until the switch has a timing profile
+                }
+                try:
+                    # Establish an SSH connection to the device, re-detecting if a cached device_type no longer works
+                    device['device_type'], connection = connect_detected(device, fingerprints, lambda detected: open_connection(dict(device, device_type=detected), timing=timing), default='aruba_os')
+                    logging.info(f'Connected to device IP: {switch}')
+
+                    # Send the 'enable' command without a password
+                    connection.enable()
+                    logging.info('Enabled mode')
+
+                    connection.send_command('screen-length 1000')
+
+                    # Retrieve the hostname from the device
+                    prompt = timing.find_prompt(connection, switch)
+                    hostname = prompt.rstrip('#')
+                    logging.info(f'Retrieved switch name: {hostname}')
+                    print(f"\nCollecting MACs from {hostname}.")
+
+                    # Send the 'show mac' command and collect the output
+                    mac_table = timing.send_command(connection, switch, 'show mac-add')
+                    logging.info('Executed "show mac-add" command')
+
+                    # Close the SSH connection
+                    connection.disconnect()
+                    logging.info('Disconnected from device')
+
+                    # Process MAC table through parse_mac_table function.
+                    print(f"\nParsing MAC Table for {hostname}")
+                    logging.info(f"Parsing MAC Table for {hostname}")
+                    parsed_entries = parse_mac_table(mac_table)
+                    for entry in parsed_entries:
+                        snapshot.add('mac_entries', {'device_ip': switch, 'hostname': hostname, 'interface': entry['interface'], 'vlan': entry['vlan'], 'mac': entry['mac_address'], 'vendor': entry['mac_oui']})
+
+                    if parsed_entries:
+                        # Create a DataFrame from the parsed entries
+                        df = pd.DataFrame(parsed_entries)
+
+                        # Rename the columns to match your desired output
+                        df = df.rename(columns={
+                            "vlan": "VLAN",
+                            "mac_address": "MAC Address",
+                            "mac_oui": "MAC Vendor",
+                            "interface": "Interface",
+                        })
+
+                        # Set output dir to Output
+                        output_dir = 'Output'
+                        if not os.path.exists(output_dir):
+                            os.makedirs(output_dir)
+
+                        # Determine the file name
+                        filename = f"{site_id} - {hostname} - mac_lookup - {today}.csv"
+
+                        # Save the data to a CSV file
+                        outfile = os.path.join(output_dir, filename)
+                        df.to_csv(outfile, index=False)
+
+                        # Same rows appended to the site's partition of the mac_lookup dataset
+                        if dataset is not None:
+                            dataset.write_frame(df.assign(**{"Hostname": hostname, "Switch IP": switch}))
+
+                        print(f"MAC lookup results exported for {hostname} to {filename}")
+                        logging.info(f"MAC lookup results exported for {hostname} to {filename}")
+                    else:
+                        print(f"No valid data found for {hostname}")
+                        logging.warning(f"No valid data found for {hostname}")
+
+                except Exception as e:
+                    print(f"An error occurred: {str(e)}")
+                    logging.error(f"An error occurred: {str(e)}")
+
+            timing.save()
+            fingerprints.save()
+        finally:
+            snapshot.finish()
+            store.close()
+        if dataset is not None:
+            dataset.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
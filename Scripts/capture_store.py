@@ -0,0 +1,129 @@
+# Description:
+"""Persists raw per-command device output so reports can be regenerated offline, across all cores."""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import json
+import os
+import re
+import threading
+from progress import Progress
+
+RUN_MANIFEST = 'capture.json'
+DEVICE_MANIFEST = 'manifest.json'
+
+# Function to turn a command into a file name ('show mac address-table' -> 'show_mac_address-table.txt')
+def command_filename(command):
+    return re.sub(r'[^\w.-]+', '_', command).strip('_') + '.txt'
+
+# One capture directory per collection run:
+#   <root>/capture.json                  - run name, creation time and any run-wide details
+#   <root>/<ip>/manifest.json            - device details (type, hostname, ...), first capture time and command -> file map
+#   <root>/<ip>/<command>.txt            - raw output exactly as the device returned it
+# Device manifests being captured are kept in memory and written once per device by flush(ip).
+class CaptureStore:
+    def __init__(self, root, name=None):
+        self.root = root
+        self.lock = threading.Lock()
+        self.pending = {}  # ip -> manifest not yet written to disk
+        if not os.path.exists(root):
+            os.makedirs(root)
+
+        run_path = os.path.join(root, RUN_MANIFEST)
+        run = {}
+        if os.path.exists(run_path):
+            with open(run_path, 'r') as file:
+                run = json.load(file)
+        elif name is not None:
+            run = {'name': name, 'created': datetime.now().isoformat(timespec='seconds')}
+            with open(run_path, 'w') as file:
+                json.dump(run, file, indent=4)
+        self.run = run
+        self.name = run.get('name') or name or os.path.basename(os.path.normpath(root))
+
+    # Function to record run-wide details (e.g. probe results for every swept address) in capture.json.
+    # Any device manifests not flushed yet are written too.
+    def save_run(self, **details):
+        self.flush()
+        with self.lock:
+            self.run.update(details)
+            with open(os.path.join(self.root, RUN_MANIFEST), 'w') as file:
+                json.dump(self.run, file, indent=4)
+
+    def _device_dir(self, ip):
+        return os.path.join(self.root, ip.replace(':', '_'))
+
+    def manifest(self, ip):
+        if ip in self.pending:
+            return self.pending[ip]
+        path = os.path.join(self._device_dir(ip), DEVICE_MANIFEST)
+        if not os.path.exists(path):
+            return {'ip': ip, 'commands': {}}
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    # Function to get the in-memory manifest for a device being captured, reading it from disk the first time
+    def _pending_manifest(self, ip):
+        if ip not in self.pending:
+            os.makedirs(self._device_dir(ip), exist_ok=True)
+            manifest = self.manifest(ip)
+            manifest.setdefault('captured', datetime.now().isoformat(timespec='microseconds'))
+            self.pending[ip] = manifest
+        return self.pending[ip]
+
+    # Function to record device details alongside its captures (device_type, hostname, probe results, ...)
+    def save_device(self, ip, **details):
+        with self.lock:
+            self._pending_manifest(ip).update(details)
+
+    # Function to save one command's raw output
+    def save(self, ip, command, output):
+        filename = command_filename(command)
+        with self.lock:
+            manifest = self._pending_manifest(ip)
+            with open(os.path.join(self._device_dir(ip), filename), 'w') as file:
+                file.write(output)
+            manifest['commands'][command] = filename
+
+    # Function to write a device's manifest once its captures are done (every pending device when ip is None)
+    def flush(self, ip=None):
+        with self.lock:
+            ips = list(self.pending) if ip is None else [ip]
+            for device_ip in ips:
+                manifest = self.pending.pop(device_ip, None)
+                if manifest is not None:
+                    with open(os.path.join(self._device_dir(device_ip), DEVICE_MANIFEST), 'w') as file:
+                        json.dump(manifest, file, indent=4)
+
+    # Function to load one command's raw output, or None if it wasn't captured
+    def load(self, ip, command):
+        filename = self.manifest(ip)['commands'].get(command)
+        if filename is None:
+            return None
+        with open(os.path.join(self._device_dir(ip), filename), 'r') as file:
+            return file.read()
+
+    # Function to list the captured device IPs in capture order
+    def devices(self):
+        manifests = []
+        for entry in os.scandir(self.root):
+            path = os.path.join(entry.path, DEVICE_MANIFEST)
+            if entry.is_dir() and os.path.exists(path):
+                with open(path, 'r') as file:
+                    manifest = json.load(file)
+                manifests.append((manifest.get('captured', ''), manifest['ip']))
+        return [ip for _, ip in sorted(manifests)]
+
+# Function to run function(item) for every item in a process pool, one process per core.
+# Yields (item, result, error) as each one finishes, so callers can write results out straight away;
+# a failing device is reported rather than stopping the run.
+# function must be a module-level function so worker processes can import it.
+def run_offline(function, items, label='Reprocessing captures', unit='devices'):
+    with ProcessPoolExecutor() as pool:
+        futures = {pool.submit(function, item): item for item in items}
+        progress = Progress(label, total=len(futures), unit=unit)
+        for future in as_completed(futures):
+            progress.update()
+            error = future.exception()
+            yield futures[future], (None if error else future.result()), error
+        progress.close()
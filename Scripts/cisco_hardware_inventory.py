@@ -3,18 +3,43 @@
 """Sweeps IP addresses and/or VLSM networks to discover Cisco hardware inventory & open ports."""
 
 from datetime import datetime
-from netmiko import ConnectHandler
+from capture_store import CaptureStore, run_offline
+from config_archive import ConfigArchive, RUNNING_CONFIG_COMMANDS
+from connect_helper import open_connection, prompt_jump_host
+from credential_sets import CredentialSets, prompt_credential_sets
+from device_detect import FingerprintCache, connect_detected
+from interface_names import is_ethernet, long_interface_type
+from parquet_export import DatasetWriter, prompt_dataset_export
 import getpass
 import ipaddress
 import os
-import pandas as pd
 import ping3
+import pyarrow as pa
 import socket
-
-def cisco_get_info(ip, username, password, method):
+from progress import Progress
+from report_writer import ReportWriter
+from snapshot_store import SnapshotStore
+from textfsm_cache import parse_output, parse_text
+from timing_profiles import TimingProfiles
+
+# Hardware, service & interface sheet column headers
+HW_COLUMNS = ["Hostname", "IP", "Type", "Make", "Model", "Serial", "SW Image", "OS Version", "Location", "ConfigBackup"]
+SERVICE_COLUMNS = ["IP", "ICMP", "SSH", "Telnet", "HTTPS", "HTTP"]
+INT_COLUMNS = ["Hostname", "Group", "Type", "Connected", "Available", "Total"]
+
+# Parquet dataset per sheet, and the columns that aren't stored as strings
+INVENTORY_DATASETS = {
+    'hardware': ('inventory_hardware', HW_COLUMNS, None),
+    'services': ('inventory_services', SERVICE_COLUMNS, {service: pa.bool_() for service in SERVICE_COLUMNS[1:]}),
+    'interfaces': ('inventory_interfaces', INT_COLUMNS, {count: pa.int64() for count in INT_COLUMNS[3:]}),
+}
+
+# connection, when given, is an open session to reuse - it is left open for the caller's next collector.
+# log prints messages; the sweep passes its progress.write so they don't garble the status line.
+def cisco_get_info(ip, username, password, method, jump_host=None, timing=None, device_type='cisco_ios', credentials=None, captures=None, connection=None, log=print):
     if method == "ssh":
         conn_info = {
-            'device_type': 'cisco_ios',
+            'device_type': device_type,
             'ip': ip,
             'username': username,
             'password': password,
@@ -28,20 +53,35 @@ def cisco_get_info(ip, username, password, method):
         }
     else:
         if method is None:
-            print("Error: method cannot be blank.")
+            log("Error: method cannot be blank.")
         else:
-            print(f"Error: {method} is not a valid method.")
+            log(f"Error: {method} is not a valid method.")
     
+    timing = timing or TimingProfiles()
+    shared = connection is not None
     try:
-        connection = ConnectHandler(**conn_info)
-        hostname = connection.find_prompt().strip('#<>[]')
-        ver_text = connection.send_command('show version', use_textfsm=True)
-        connection.disconnect()
+        if not shared:
+            connection = open_connection(conn_info, jump_host, timing, credentials)
+        hostname = timing.find_prompt(connection, ip).strip('#<>[]')
+        ver_raw = timing.send_command(connection, ip, 'show version')
+        if not shared:
+            connection.disconnect()
+
+        if captures is not None:
+            captures.save_device(ip, hostname=hostname, device_type=conn_info['device_type'])
+            captures.save(ip, 'show version', ver_raw)
+
+        # Parsed in the TextFSM pool after the session is closed
+        ver_text = parse_output(conn_info['device_type'], 'show version', ver_raw)
 
     except Exception as e:
-        print(f"Unable to connect to {ip}: {e}")
+        log(f"Unable to connect to {ip}: {e}")
         return []
 
+    return device_info_from_version(hostname, ip, ver_text)
+
+# Function to build hardware rows (one per stack member/module) from parsed 'show version' records
+def device_info_from_version(hostname, ip, ver_text):
     if isinstance(ver_text, list):
         device_info_list = []
         for entry in ver_text:
@@ -69,7 +109,7 @@ def cisco_get_info(ip, username, password, method):
 
     return []
 
-def cisco_get_show_commands(ip, username, password, method, location):
+def cisco_get_show_commands(ip, username, password, method, location, jump_host=None, timing=None, device_type='cisco_ios', credentials=None, archive=None, connection=None, log=print):
     commands = [
         'show ver',
         'show module',
@@ -102,7 +142,7 @@ def cisco_get_show_commands(ip, username, password, method, location):
     ]
     if method == "ssh":
         conn_info = {
-            'device_type': 'cisco_ios',
+            'device_type': device_type,
             'ip': ip,
             'username': username,
             'password': password,
@@ -116,15 +156,18 @@ def cisco_get_show_commands(ip, username, password, method, location):
         }
     else:
         if method is None:
-            print("Error: method cannot be blank.")
+            log("Error: method cannot be blank.")
         else:
-            print(f"Error: {method} is not a valid method.")
+            log(f"Error: {method} is not a valid method.")
     
+    timing = timing or TimingProfiles()
+    shared = connection is not None
     try:
         today = datetime.now().strftime('%Y-%m-%d')
-        connection = ConnectHandler(**conn_info)
+        if not shared:
+            connection = open_connection(conn_info, jump_host, timing, credentials)
         connection.enable()
-        prompt = connection.find_prompt().strip("#<>[]")
+        prompt = timing.find_prompt(connection, ip).strip("#<>[]")
         filename = f"{prompt} - {ip} - {today}.txt"
         outdir = os.path.join("Output", location, "Configs")
         if not os.path.exists(outdir):
@@ -132,22 +175,34 @@ def cisco_get_show_commands(ip, username, password, method, location):
         outfile = os.path.join(outdir, filename)
         file = open(outfile, "w")
         file.write(f"{prompt.upper()} ({ip})\n\n")
-        print(f"Gathering show commands from {prompt} at {ip}")
+        log(f"Gathering show commands from {prompt} at {ip}")
+
+        def send(command):
+            return timing.send_command(connection, ip, command, default_timeout=30.0)
 
         for command in commands:
             file.write(f"{command}\n")
-            output = connection.send_command(command, read_timeout=30.0)
+            if archive is not None and command in RUNNING_CONFIG_COMMANDS:
+                # Incremental mode - only transfer the config if it changed since the archived copy
+                output, reused = archive.get_config(ip, conn_info['device_type'], command, send)
+                if reused:
+                    log(f"Configuration unchanged on {prompt} - reusing archived '{command}'")
+            else:
+                output = send(command)
             file.write(f"{output}\n\n")
+        file.close()
 
+        if not shared:
+            connection.disconnect()
         return True
     
     except Exception as e:
-        print(f"Error: {e}")
+        log(f"Error: {e}")
         return False
 
-def generate_inventory(networks, username, password, location):
+def generate_inventory(networks, username, password, location, jump_host=None, credential_sets=None, incremental=False, datasets=False):
     usage = """
-    generate_inventory(networks, username, password, location)
+    generate_inventory(networks, username, password, location, jump_host=None, credential_sets=None, incremental=False, datasets=False)
 
     Purpose:
     Gather info from single IP or VLSM network. Checks IPs for icmp, telnet, ssh, http, and https and attempts to login (assuming the devices is Cisco) to gather hardware information.
@@ -157,6 +212,10 @@ def generate_inventory(networks, username, password, location):
     username (str) - Username to attempt login
     password (str, input hidden) - Password to attempt login
     location (str) - Customer, site, building, room, or other descriptive value - also used in filename
+    jump_host (JumpHost, optional) - Bastion to tunnel through; probes and logins are made from the jump host
+    credential_sets (list, optional) - Extra (username, password) pairs to try after username/password; the set that works is remembered per device
+    incremental (bool, optional) - Skip the full 'show run' transfer when the device's config hasn't changed since the archived copy
+    datasets (bool, optional) - Also append every row to the Parquet datasets in Output\Datasets, partitioned by location and date
 
     Example usage: 
     generate_inventory(10.10.0.0/24, myuser, MyS3cr3tP@ss, Corp-Dallas)
@@ -177,15 +236,8 @@ def generate_inventory(networks, username, password, location):
         print(f"Error: location must be specified.\nUsage: {usage}")
         location = input(f"Enter a location name for {networks}\nNote: Location used in filename\nLocation: ")
     
-    # Define the hardware & service column headers
-    hw_columns = ["Hostname", "IP", "Type", "Make", "Model", "Serial", "SW Image", "OS Version", "Location", "ConfigBackup"]
-    service_columns = ["IP", "ICMP", "SSH", "Telnet", "HTTPS", "HTTP"]
-    int_columns = ["Hostname", "Group", "Type", "Connected", "Available", "Total"]
-    
-    # Initialize an empty list to hold the data
-    hw_data = []
+    # Probe results are also kept for the capture manifest; device rows go straight to the workbook
     service_data = []
-    int_data = []
 
     # Split comma-delimited IPs or handle single subnet
     targets = [t.strip() for t in networks.split(',')]
@@ -211,90 +263,248 @@ def generate_inventory(networks, username, password, location):
     total_ips = len(all_ips)
     failures = 0
 
-    for index, ip in enumerate(all_ips, start=1):
-        str_ip = str(ip)
-        try:
-            # Print the progress message
-            successes = index - failures
-            progress_message = f"Working on {str_ip} - Processed {index} of {total_ips} addresses. - Successes: {successes} - Failures: {failures}"
-            print(progress_message)
-
-            icmp_status = try_ping(str_ip)
-            telnet_status = try_telnet(str_ip)
-            ssh_status = try_ssh(str_ip)
-            http_status = try_http(str_ip)
-            https_status = try_https(str_ip)
-            # snmp_status = try_snmp(str_ip) # Unsure how I want to handle auth at this time
-
-            # Collect service status data
-            service_data.append({
-                "IP": str_ip,
-                "ICMP": icmp_status,
-                "SSH": ssh_status,
-                "Telnet": telnet_status,
-                "HTTPS": https_status,
-                "HTTP": http_status
-            })
+    # Learned per-device delay factors and read timeouts from previous runs
+    timing = TimingProfiles()
 
-            if ssh_status is True:
-                device_info_list = cisco_get_info(str_ip, username, password, "ssh")
-                hostname, device_interface_list = cisco_parse_interfaces(str_ip, username, password, "ssh")
-                config_downloaded = cisco_get_show_commands(str_ip, username, password, "ssh", location)
-            elif telnet_status is True and ssh_status is not None:
-                device_info_list = cisco_get_info(str_ip, username, password, "telnet")
-                hostname, device_interface_list = cisco_parse_interfaces(str_ip, username, password, "telnet")
-                config_downloaded = cisco_get_show_commands(str_ip, username, password, "telnet", location)
-            else:
-                failures += 1
-                continue
-
-            if hostname and device_interface_list:
-                int_list = device_interface_list['interface_summary']
-
-            for device_info in device_info_list:
-                device_info["Location"] = location  # Set the location if provided
-                device_info["ConfigBackup"] = config_downloaded
-                hw_data.append(device_info)
-
-            for device_interface in int_list:
-                int_data.append({
-                    'Hostname': hostname,
-                    'Type': device_interface['interface_type'],
-                    'Total': device_interface['total'],
-                    'Group': device_interface['group'],
-                    'Connected': device_interface['connected'],
-                    'Available': device_interface['available']
+    # Cached device types so only new or expired addresses are probed
+    fingerprints = FingerprintCache()
+
+    # Every credential set is tried per device, starting with the one that worked there last time
+    credentials = CredentialSets([(username, password)] + list(credential_sets or []))
+
+    # Archived running configs for incremental mode
+    archive = ConfigArchive() if incremental else None
+
+    # Raw 'show version' / 'show interface status' per device, so the workbook can be rebuilt offline
+    captures = CaptureStore(os.path.join("Output", location, "Captures", datetime.now().strftime('%Y-%m-%d')), name=location)
+
+    # Workbook sheets are written as each address finishes
+    report, sheets = open_inventory_report(location, networks)
+    if datasets:
+        sheets = with_datasets(sheets, location)
+
+    # Probe results and hardware rows also go to the shared snapshot database
+    store = SnapshotStore()
+    snapshot = store.start('cisco_hardware_inventory', location)
+
+    try:
+        progress = Progress("Sweeping addresses", total=total_ips, unit="addresses", min_total=0)
+
+        for index, ip in enumerate(all_ips, start=1):
+            str_ip = str(ip)
+            connection = None
+            try:
+                # Throttled progress line - rate and ETA over the whole sweep
+                successes = index - 1 - failures
+                progress.update(detail=f"Working on {str_ip} - Successes: {successes} - Failures: {failures}")
+
+                if jump_host is None:
+                    icmp_status = try_ping(str_ip)
+                    telnet_status = try_telnet(str_ip)
+                    ssh_status = try_ssh(str_ip)
+                    http_status = try_http(str_ip)
+                    https_status = try_https(str_ip)
+                else:
+                    # ICMP can't be tunnelled, so only TCP services are probed from the jump host
+                    icmp_status = None
+                    telnet_status = jump_host.probe(str_ip, 23)
+                    ssh_status = jump_host.probe(str_ip, 22)
+                    http_status = jump_host.probe(str_ip, 80)
+                    https_status = jump_host.probe(str_ip, 443)
+                # snmp_status = try_snmp(str_ip) # Unsure how I want to handle auth at this time
+
+                # Collect service status data
+                service_data.append({
+                    "IP": str_ip,
+                    "ICMP": icmp_status,
+                    "SSH": ssh_status,
+                    "Telnet": telnet_status,
+                    "HTTPS": https_status,
+                    "HTTP": http_status
                 })
+                sheets['services'].write_record(service_data[-1])
+                snapshot.add('sweep_results', {key.lower(): value for key, value in service_data[-1].items()})
+
+                # One login per device, shared by every collector below. Detection (only for addresses
+                # without a cached fingerprint) runs first; a cached type that fails is re-detected.
+                login = {'ip': str_ip, 'username': username, 'password': password}
+                if ssh_status is True:
+                    method = "ssh"
+                    device_type, connection = connect_detected(login, fingerprints, lambda detected: open_connection(dict(login, device_type=detected), jump_host, timing, credentials), jump_host, credentials=credentials)
+                elif telnet_status is True and ssh_status is not None and jump_host is None:
+                    method = "telnet"
+                    device_type = 'cisco_ios_telnet'
+                    connection = open_connection(dict(login, device_type=device_type), timing=timing, credentials=credentials)
+                else:
+                    failures += 1
+                    continue
+                device_info_list = cisco_get_info(str_ip, username, password, method, jump_host, timing, device_type, credentials, captures, connection, progress.write)
+                hostname, device_interface_list = cisco_parse_interfaces(str_ip, username, password, method, jump_host, timing, device_type, credentials, captures, connection, progress.write)
+                config_downloaded = cisco_get_show_commands(str_ip, username, password, method, location, jump_host, timing, device_type, credentials, archive, connection, progress.write)
+                captures.save_device(str_ip, location=location, config_backup=config_downloaded)
+
+                for device_info in device_info_list:
+                    device_info["Location"] = location  # Set the location if provided
+                    device_info["ConfigBackup"] = config_downloaded
+                    sheets['hardware'].write_record(device_info)
+                    snapshot.add('devices', snapshot_device(device_info))
+
+                # Only this device's own summary - nothing is written when its interfaces couldn't be read
+                if hostname and device_interface_list:
+                    for int_row in interface_rows(hostname, device_interface_list['interface_summary']):
+                        sheets['interfaces'].write_record(int_row)
+
+            except Exception as e:
+                progress.write(f"Unable to get hardware info for {str_ip}\n\n{str(e)}")
+                failures += 1
+            finally:
+                if connection is not None:
+                    connection.disconnect()
+                # Every session for this address is done - write its capture manifest once
+                captures.flush(str_ip)
+
+        progress.close()
+        timing.save()
+        fingerprints.save()
+        credentials.save()
+    finally:
+        snapshot.finish()
+        store.close()
+
+    # Probe results for every address, so the services sheet can be rebuilt offline too
+    captures.save_run(networks=networks, services=service_data)
+
+    close_inventory_report(report, sheets, location, networks)
+
+# Function to map a 'Device Inventory' row to the snapshot database's devices columns
+def snapshot_device(device_info):
+    return {
+        'ip': device_info['IP'],
+        'hostname': device_info['Hostname'],
+        'make': device_info['Make'],
+        'model': device_info['Model'],
+        'serial': device_info['Serial'],
+        'os_version': device_info['OS Version'],
+        'location': device_info['Location'],
+    }
 
-        except Exception as e:
-            print(f"\nUnable to get hardware info for {str_ip}\n\n{str(e)}")
-            failures += 1
-    
-    # Create the dataframes with the collected data
-    hw_df = pd.DataFrame(hw_data, columns=hw_columns)
-    service_df = pd.DataFrame(service_data, columns=service_columns)
-    int_df = pd.DataFrame(int_data, columns=int_columns)
-    
+# Function to turn an interface summary into 'Interface Inventory' rows
+def interface_rows(hostname, interface_summary):
+    return [
+        {
+            'Hostname': hostname,
+            'Type': device_interface['interface_type'],
+            'Total': device_interface['total'],
+            'Group': device_interface['group'],
+            'Connected': device_interface['connected'],
+            'Available': device_interface['available']
+        }
+        for device_interface in interface_summary
+    ]
+
+# Function to open the inventory workbook in Output\{location} - its three sheets are filled in as the sweep runs
+def open_inventory_report(location, networks, suffix=''):
     # Set output dir to: \Output\{location} and create it, if it doesn't exist
     output_dir = os.path.join("Output", location)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Save the dataframes to an Excel file on separate sheets
     current_datetime = datetime.now().strftime('%Y-%m-%d')
-    filename = f"{location}_inventory - {networks.replace('/', '_')} - {current_datetime}.xlsx"
-    outfile = os.path.join(output_dir, filename)
-    with pd.ExcelWriter(outfile, engine='xlsxwriter') as writer:
-        hw_df.to_excel(writer, sheet_name='Device Inventory', index=False)
-        service_df.to_excel(writer, sheet_name='Control Plane Srvcs', index=False)
-        int_df.to_excel(writer, sheet_name='Interface Inventory', index=False)
+    filename = f"{location}_inventory - {networks.replace('/', '_')} - {current_datetime}{suffix}.xlsx"
+    report = ReportWriter(os.path.join(output_dir, filename))
+    sheets = {
+        'hardware': report.add_sheet('Device Inventory', HW_COLUMNS),
+        'services': report.add_sheet('Control Plane Srvcs', SERVICE_COLUMNS),
+        'interfaces': report.add_sheet('Interface Inventory', INT_COLUMNS),
+    }
+    return report, sheets
+
+# Function to make each sheet also append its rows to the matching Parquet dataset
+def with_datasets(sheets, site, day=None):
+    outputs = {}
+    for key, sheet in sheets.items():
+        name, columns, types = INVENTORY_DATASETS[key]
+        outputs[key] = InventoryOutput(sheet, DatasetWriter(name, site, columns, types, day))
+    return outputs
+
+# A sheet plus its Parquet dataset - rows written to one are written to both
+class InventoryOutput:
+    def __init__(self, sheet, dataset):
+        self.sheet = sheet
+        self.dataset = dataset
+
+    def write_record(self, record):
+        self.sheet.write_record(record)
+        self.dataset.write_record(record)
+
+    def close(self):
+        self.sheet.close()
+        self.dataset.close()
+
+# Function to size the sheets' columns and finish the workbook
+def close_inventory_report(report, sheets, location, networks):
+    for sheet in sheets.values():
+        sheet.close()
+    report.close()
+    current_datetime = datetime.now().strftime('%Y-%m-%d')
+    print(f"{location} inventory generated for {networks} at {current_datetime}.\nOutput saved to: {report.path}")
+
+# Function run in a worker process for offline mode - rebuilds one device's hardware and interface rows
+def offline_inventory(capture):
+    capture_root, ip = capture
+    captures = CaptureStore(capture_root)
+    manifest = captures.manifest(ip)
+    device_type = manifest.get('device_type', 'cisco_ios')
+    hostname = manifest.get('hostname', '')
+
+    hw_rows = []
+    ver_raw = captures.load(ip, 'show version')
+    if ver_raw is not None:
+        for device_info in device_info_from_version(hostname, ip, parse_text(device_type, 'show version', ver_raw)):
+            device_info["Location"] = manifest.get('location', '')
+            device_info["ConfigBackup"] = manifest.get('config_backup', '')
+            hw_rows.append(device_info)
+
+    int_rows = []
+    interfaces_raw = captures.load(ip, 'show interface status')
+    if interfaces_raw is not None:
+        summary = summarize_interfaces(parse_text(device_type, 'show interface status', interfaces_raw))
+        int_rows = interface_rows(hostname, summary['interface_summary'])
+
+    return hw_rows, int_rows
+
+# Function to regenerate the inventory workbook from a capture directory - no network access needed
+def reprocess_inventory(capture_root, datasets=False):
+    if not os.path.isdir(capture_root):
+        print(f"Capture directory not found: {capture_root}")
+        return
+
+    captures = CaptureStore(capture_root)
+    networks = captures.run.get('networks', '')
+    report, sheets = open_inventory_report(captures.name, networks, suffix=' - offline')
+    if datasets:
+        # Rows land in the partition for the day they were captured, not the day they were reprocessed
+        sheets = with_datasets(sheets, captures.name, captures.run.get('created', '')[:10] or None)
+    for service in captures.run.get('services', []):
+        sheets['services'].write_record(service)
+
+    # Rows are written as each device's worker finishes
+    for (_, ip), result, error in run_offline(offline_inventory, [(capture_root, ip) for ip in captures.devices()]):
+        if error is not None:
+            print(f"Unable to reprocess {ip}: {error}")
+            continue
+        hw_rows, int_rows = result
+        for device_info in hw_rows:
+            sheets['hardware'].write_record(device_info)
+        for int_row in int_rows:
+            sheets['interfaces'].write_record(int_row)
 
-    print(f"{location} inventory generated for {networks} at {current_datetime}.\nOutput saved to: {outfile}")
+    close_inventory_report(report, sheets, captures.name, networks)
 
-def cisco_get_interfaces(ip, username, password, method):
+def cisco_get_interfaces(ip, username, password, method, jump_host=None, timing=None, device_type='cisco_ios', credentials=None, captures=None, connection=None, log=print):
     if method == "ssh":
         conn_info = {
-            'device_type': 'cisco_ios',
+            'device_type': device_type,
             'ip': ip,
             'username': username,
             'password': password,
@@ -308,51 +518,56 @@ def cisco_get_interfaces(ip, username, password, method):
         }
     else:
         if method is None:
-            print("Error: method cannot be blank.")
+            log("Error: method cannot be blank.")
         else:
-            print(f"Error: {method} is not a valid method.")
+            log(f"Error: {method} is not a valid method.")
         return None
     
+    timing = timing or TimingProfiles()
+    shared = connection is not None
     try:
-        connection = ConnectHandler(**conn_info)
-        hostname = connection.find_prompt().strip('#<>[]')
-        interfaces = connection.send_command('show interface status', use_textfsm=True)
-        connection.disconnect()
+        if not shared:
+            connection = open_connection(conn_info, jump_host, timing, credentials)
+        hostname = timing.find_prompt(connection, ip).strip('#<>[]')
+        interfaces_raw = timing.send_command(connection, ip, 'show interface status')
+        if not shared:
+            connection.disconnect()
+        if captures is not None:
+            captures.save(ip, 'show interface status', interfaces_raw)
+        interfaces = parse_output(conn_info['device_type'], 'show interface status', interfaces_raw)
         return {'hostname': hostname, 'interfaces': interfaces}
     
     except Exception as e:
-        print(f"Error: {e}")
+        log(f"Error: {e}")
         return None
 
-def cisco_parse_interfaces(ip, username, password, method):
-    interface_data = cisco_get_interfaces(ip, username, password, method)
+def cisco_parse_interfaces(ip, username, password, method, jump_host=None, timing=None, device_type='cisco_ios', credentials=None, captures=None, connection=None, log=print):
+    interface_data = cisco_get_interfaces(ip, username, password, method, jump_host, timing, device_type, credentials, captures, connection, log)
     if not interface_data:
-        print("Failed to retrieve interface data. Check your connection details.")
-        return None
+        log("Failed to retrieve interface data. Check your connection details.")
+        return None, None
 
-    hostname = interface_data['hostname']
-    interfaces = interface_data['interfaces']
+    return interface_data['hostname'], summarize_interfaces(interface_data['interfaces'])
 
+# Function to count total/connected/available physical ports per type from parsed 'show interface status' records
+def summarize_interfaces(interfaces):
     interface_groups = {
         'FastEthernet': {},
         'GigabitEthernet': {},
         'TenGigabitEthernet': {}
     }
 
-    for interface in interfaces:
+    for interface in interfaces if isinstance(interfaces, list) else []:
         interface_type = interface.get('type', '')
         if not interface_type or interface_type.startswith("Po"):
             continue
 
+        # Group physical ports by long type name (FastEthernet through HundredGigabitEthernet)
         port_name = interface['port']
-        if port_name.startswith("Fa"):
-            key = 'FastEthernet'
-        elif port_name.startswith("Gi"):
-            key = 'GigabitEthernet'
-        elif port_name.startswith("Te"):
-            key = 'TenGigabitEthernet'
-        else:
+        if not is_ethernet(port_name):
             continue
+        key = long_interface_type(port_name)
+        interface_groups.setdefault(key, {})
 
         if interface_type in interface_groups[key]:
             interface_groups[key][interface_type]['total'] += 1
@@ -380,7 +595,7 @@ def cisco_parse_interfaces(ip, username, password, method):
                 'total': total_count
             })
 
-    return hostname, results
+    return results
 
 def try_ping(ip):
     result = ping3.ping(ip)
@@ -444,14 +659,29 @@ def try_https(ip, port=443):
 #         return False
 
 def main():
+    # Offline mode rebuilds the workbook from a previous sweep's raw captures
+    mode = input("Sweep live or reprocess captured output? [type live or offline]: ").strip().lower()
+    if mode == 'offline':
+        capture_root = input("Enter the capture directory (e.g. Output\\<location>\\Captures\\<date>): ").strip().strip('"')
+        reprocess_inventory(capture_root, prompt_dataset_export())
+        return
+
     networks = input("Example: '10.10.0.1' or '10.10.0.0/24' or '10.10.1.1,10.10.0.0/24'\nEnter IP address or VSLM network to generate inventory from: ")
     username = input(f"Enter username to try for {networks}: ")
     password = getpass.getpass(prompt=f"Enter password to try for {username}: ")
+    credential_sets = prompt_credential_sets()
     location = input(f"Enter a location name for {networks}\nNote: Location used in filename\nLocation: ")
+    jump_host = prompt_jump_host()
+    incremental = input("Reuse archived 'show run' for unchanged devices (incremental)? [y/n]: ").strip().lower() == 'y'
+    datasets = prompt_dataset_export()
 
     print("Hang onto your butts....")
 
-    generate_inventory(networks, username, password, location)
+    try:
+        generate_inventory(networks, username, password, location, jump_host, credential_sets, incremental, datasets)
+    finally:
+        if jump_host is not None:
+            jump_host.close()
 
 if __name__ == "__main__":
     main()
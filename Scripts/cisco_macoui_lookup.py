@@ -1,12 +1,19 @@
 import os
 from netmiko import ConnectHandler
+from device_detect import FingerprintCache, connect_detected
+from progress import Progress
+from snapshot_store import SnapshotStore
+from table_parser import parse_fixed_width, table_rows
 from datetime import date
 from update_oui_vendors import update_oui
 from mac_vendor_lookup import MacLookup, BaseMacLookup
 import pandas as pd
 import getpass
 import logging
+from parquet_export import DatasetWriter, prompt_dataset_export
 
+# Columns of the mac_lookup Parquet dataset - the CSV columns plus the switch they came from
+MAC_LOOKUP_DATASET_COLUMNS = ["Hostname", "Switch IP", "VLAN", "MAC Address", "MAC Vendor", "Interface"]
 
 # Function to gather device type information based on MAC OUI
 def lookup_mac_oui(mac_address):
@@ -23,25 +30,21 @@ def lookup_mac_oui(mac_address):
 
 def parse_mac_table(mac_table):
     parsed_entries = []
-    mac_lines = mac_table.split('\n')
-    processed_lines = 0  # Counter for processed lines
+    # Column spans come from the 'Vlan  Mac Address  Type  Ports' header once; every row is sliced in one pass
+    table = parse_fixed_width(mac_table, ["Vlan", "Mac Address", "Type", "Ports"])
+    progress = Progress("Parsing MAC entries", total=len(table["Vlan"]), unit="entries")
 
-    for line in mac_lines:
-        if line.strip().endswith("CPU") or line.strip().endswith("--") or not line.strip():
-            continue  # Ignore system MACs, separator lines, or empty lines
+    for vlan, mac_address, interface in table_rows(table, ["Vlan", "Mac Address", "Ports"]):
+        progress.update()
 
-        # Split the line by whitespace
-        parts = line.split()
-        if len(parts) < 3:
-            print(f"Skipping line: {line}")
-            continue  # Skip incomplete lines
+        if interface.endswith("CPU") or not vlan[:1].isdigit():
+            continue  # Ignore system MACs and the trailing 'Total Mac Addresses' line
 
-        try:
-            # Extract the VLAN, MAC address, and interface
-            vlan = parts[0]
-            mac_address = parts[1]
-            interface = parts[3]
+        if not mac_address or not interface:
+            progress.write(f"Skipping row: {vlan} {mac_address} {interface}")
+            continue  # Skip incomplete rows
 
+        try:
             # Perform additional processing
             mac_oui = lookup_mac_oui(mac_address)
 
@@ -54,17 +57,9 @@ def parse_mac_table(mac_table):
             parsed_entries.append(parsed_entry)
 
         except Exception as e:
-            print(f"Error parsing line: {line}\nError: {e}")
-
-        # Increment the counter
-        processed_lines += 1
-
-        # Calculate the progress percentage
-        progress = (processed_lines / len(mac_lines)) * 100
-
-        # Print the progress message
-        print(f"\r{progress:.2f}% - Parsed {processed_lines}/{len(mac_lines)} MAC entries", end='')
+            progress.write(f"Error parsing row: {vlan} {mac_address} {interface}\nError: {e}")
 
+    progress.close()
     return parsed_entries
 
 def main():
@@ -77,79 +72,99 @@ def main():
         username = input("Enter your TACACS username: ")
         password = getpass.getpass(prompt="Enter your TACACS password: ")
         enpass = getpass.getpass(prompt="Enter enable password (if any): ")
+        dataset = DatasetWriter("mac_lookup", site_id, MAC_LOOKUP_DATASET_COLUMNS) if prompt_dataset_export() else None
 
-        # Create a log file for this session
-        log_filename = f"session_{site_id}_{today}.log"
-        logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(message)s')
-
-        # Validate the format of the input
-        switch_list = switches.split(',')
-        switch_list = [s.strip() for s in switch_list]  # Remove leading/trailing whitespace
-
-        for switch in switch_list:
-            device = {
-                'device_type': 'cisco_ios',
-                'ip': switch,
-                'username': username,
-                'password': password,
-                'secret': enpass,
-            }
+        # MAC entries also go to the shared snapshot database
+        store = SnapshotStore()
+        snapshot = store.start('cisco_macoui_lookup', site_id)
 
-            try:
-                # Establish an SSH connection to the device
-                connection = ConnectHandler(**device)
-                logging.info(f'Connected to device IP: {switch}')
-
-                # Send the 'enable' command without a password
-                connection.enable()
-                logging.info('Enabled mode')
-
-                # Retrieve the hostname from the device
-                hostname = connection.find_prompt().strip('#')
-                switch_name = device['ip']  # Store the IP as 'switch_name' if 'hostname' is empty
-
-                # Send the 'show mac' command and collect the output
-                mac_table = connection.send_command('show mac add')
-                logging.info('Executed "show mac" command')
-
-                # Close the SSH connection
-                connection.disconnect()
-                logging.info('Disconnected from device')
-
-                # Process MAC table through parse_mac_table function.
-                logging.info(f"Parsing MAC Table for {hostname or switch_name}")
-                parsed_entries = parse_mac_table(mac_table)
-
-                if parsed_entries:
-                    # Create a DataFrame from the parsed entries
-                    df = pd.DataFrame(parsed_entries)
-
-                    # Rename the columns to match your desired output
-                    df = df.rename(columns={
-                        "vlan": "VLAN",
-                        "mac_address": "MAC Address",
-                        "mac_oui": "MAC Vendor",
-                        "interface": "Interface",
-                    })
-
-                    # Set output dir to Output
-                    output_dir = 'Output'
-                    if not os.path.exists(output_dir):
-                        os.makedirs(output_dir)
-
-                    # Determine the file name
-                    filename = f"{site_id} - {hostname or switch_name} - mac_lookup - {today}.csv"
-
-                    # Save the data to a CSV file
-                    outfile = os.path.join(output_dir, filename)
-                    df.to_csv(outfile, index=False)
-
-                    logging.info(f"MAC lookup results exported for {hostname or switch_name} to {filename}")
-                else:
-                    logging.warning(f"No valid data found for {hostname or switch_name}")
-
-            except Exception as e:
-                logging.error(f"An error occurred: {str(e)}")
+        try:
+            # Create a log file for this session
+            log_filename = f"session_{site_id}_{today}.log"
+            logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(message)s')
+
+            # Validate the format of the input
+            switch_list = switches.split(',')
+            switch_list = [s.strip() for s in switch_list]  # Remove leading/trailing whitespace
+
+            # Cached device types so only new or expired switches are probed
+            fingerprints = FingerprintCache()
+
+            for switch in switch_list:
+                device = {
+                    'ip': switch,
+                    'username': username,
+                    'password': password,
+                    'secret': enpass,
+                }
+                try:
+                    # Establish an SSH connection to the device, re-detecting if a cached device_type no longer works
+                    device['device_type'], connection = connect_detected(device, fingerprints, lambda detected: ConnectHandler(**dict(device, device_type=detected)), default='cisco_ios')
+                    logging.info(f'Connected to device IP: {switch}')
+
+                    # Send the 'enable' command without a password
+                    connection.enable()
+                    logging.info('Enabled mode')
+
+                    # Retrieve the hostname from the device
+                    hostname = connection.find_prompt().strip('#')
+                    switch_name = device['ip']  # Store the IP as 'switch_name' if 'hostname' is empty
+
+                    # Send the 'show mac' command and collect the output
+                    mac_table = connection.send_command('show mac add')
+                    logging.info('Executed "show mac" command')
+
+                    # Close the SSH connection
+                    connection.disconnect()
+                    logging.info('Disconnected from device')
+
+                    # Process MAC table through parse_mac_table function.
+                    logging.info(f"Parsing MAC Table for {hostname or switch_name}")
+                    parsed_entries = parse_mac_table(mac_table)
+                    for entry in parsed_entries:
+                        snapshot.add('mac_entries', {'device_ip': switch, 'hostname': hostname or switch_name, 'interface': entry['interface'], 'vlan': entry['vlan'], 'mac': entry['mac_address'], 'vendor': entry['mac_oui']})
+
+                    if parsed_entries:
+                        # Create a DataFrame from the parsed entries
+                        df = pd.DataFrame(parsed_entries)
+
+                        # Rename the columns to match your desired output
+                        df = df.rename(columns={
+                            "vlan": "VLAN",
+                            "mac_address": "MAC Address",
+                            "mac_oui": "MAC Vendor",
+                            "interface": "Interface",
+                        })
+
+                        # Set output dir to Output
+                        output_dir = 'Output'
+                        if not os.path.exists(output_dir):
+                            os.makedirs(output_dir)
+
+                        # Determine the file name
+                        filename = f"{site_id} - {hostname or switch_name} - mac_lookup - {today}.csv"
+
+                        # Save the data to a CSV file
+                        outfile = os.path.join(output_dir, filename)
+                        df.to_csv(outfile, index=False)
+
+                        # Same rows appended to the site's partition of the mac_lookup dataset
+                        if dataset is not None:
+                            dataset.write_frame(df.assign(**{"Hostname": hostname or switch_name, "Switch IP": switch}))
+
+                        logging.info(f"MAC lookup results exported for {hostname or switch_name} to {filename}")
+                    else:
+                        logging.warning(f"No valid data found for {hostname or switch_name}")
+
+                except Exception as e:
+                    logging.error(f"An error occurred: {str(e)}")
+
+            fingerprints.save()
+        finally:
+            snapshot.finish()
+            store.close()
+        if dataset is not None:
+            dataset.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
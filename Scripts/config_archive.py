@@ -0,0 +1,71 @@
+# Description:
+"""Skips re-transferring unchanged running configs by checking a cheap change indicator first."""
+
+import json
+import os
+import re
+
+ARCHIVE_DIR = os.path.join('Resources', 'ConfigArchive')
+
+# Commands that pull the full running config, per platform family
+RUNNING_CONFIG_COMMANDS = {'show run', 'show running-config', 'display current-configuration'}
+
+# Cheap commands whose output changes whenever the running config does, with the line that must be
+# in the output for it to count as a marker. IOS-XE's 'show configuration id' reads a counter (plus the
+# time it last moved) without building the config; classic IOS rejects the command, the pattern doesn't
+# match and the full config is pulled as before. Platforms with no equivalent are left out on purpose.
+CHANGE_INDICATORS = {
+    'cisco_ios': ('show configuration id', r'^\s*Configuration ID\s*:.*$'),
+    'cisco_ios_telnet': ('show configuration id', r'^\s*Configuration ID\s*:.*$'),
+    'cisco_xe': ('show configuration id', r'^\s*Configuration ID\s*:.*$'),
+}
+
+# Keeps the last full running config per device IP alongside the change indicator it was taken at:
+# Resources/ConfigArchive/<ip>.txt and Resources/ConfigArchive/<ip>.json
+class ConfigArchive:
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+
+    def _paths(self, ip):
+        base = os.path.join(self.archive_dir, ip.replace(':', '_'))
+        return f"{base}.txt", f"{base}.json"
+
+    def load(self, ip, command):
+        config_path, state_path = self._paths(ip)
+        if not (os.path.exists(config_path) and os.path.exists(state_path)):
+            return None, None
+        with open(state_path, 'r') as file:
+            state = json.load(file)
+        if state.get('command') != command:
+            return None, None
+        with open(config_path, 'r') as file:
+            return file.read(), state.get('marker')
+
+    def store(self, ip, command, marker, config):
+        config_path, state_path = self._paths(ip)
+        with open(config_path, 'w') as file:
+            file.write(config)
+        with open(state_path, 'w') as file:
+            json.dump({'command': command, 'marker': marker}, file, indent=4)
+
+    # Function to get the running config, reusing the archived copy if the change indicator hasn't moved.
+    # send is a callable(command) -> output so callers keep their own timeouts. Returns (config, reused).
+    def get_config(self, ip, device_type, command, send):
+        indicator = CHANGE_INDICATORS.get(device_type)
+        if indicator is None:
+            return send(command), False
+
+        indicator_command, pattern = indicator
+        match = re.search(pattern, send(indicator_command), re.MULTILINE)
+        marker = match.group(0).strip() if match else ''
+        if marker:
+            archived, archived_marker = self.load(ip, command)
+            if archived is not None and archived_marker == marker:
+                return archived, True
+
+        config = send(command)
+        if marker:
+            self.store(ip, command, marker, config)
+        return config, False
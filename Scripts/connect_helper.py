@@ -0,0 +1,113 @@
+# Description:
+"""Shared netmiko connection helper with optional jump host (bastion) tunnelling."""
+
+import getpass
+import threading
+import paramiko
+from netmiko import ConnectHandler
+
+# Holds one persistent SSH transport to a jump host. Device sessions are opened as
+# direct-tcpip channels over that transport, so the bastion handshake and auth happen once.
+class JumpHost:
+    def __init__(self, host, username, password, port=22, timeout=10):
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Function to connect to the jump host (no-op if the transport is already up)
+    def connect(self):
+        with self._lock:
+            if self._client is not None:
+                transport = self._client.get_transport()
+                if transport is not None and transport.is_active():
+                    return
+                self._client.close()
+
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(
+                self.host,
+                port=self.port,
+                username=self.username,
+                password=self.password,
+                timeout=self.timeout,
+                allow_agent=False,
+                look_for_keys=False,
+            )
+            # Keep the shared transport alive between devices on long runs
+            client.get_transport().set_keepalive(30)
+            self._client = client
+
+    # Function to open a direct-tcpip channel from the jump host to ip:port
+    def open_channel(self, ip, port=22):
+        self.connect()
+        transport = self._client.get_transport()
+        return transport.open_channel(
+            'direct-tcpip',
+            (ip, int(port)),
+            ('127.0.0.1', 0),
+            timeout=self.timeout,
+        )
+
+    # Function to check if ip:port is reachable from the jump host
+    def probe(self, ip, port):
+        try:
+            channel = self.open_channel(ip, port)
+            channel.close()
+            return True
+        except (paramiko.ChannelException, paramiko.SSHException, OSError):
+            return False
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+# Function to open a netmiko session, tunnelled through jump_host when one is given.
+# If timing (a TimingProfiles store) is given, its learned delay factor is applied first.
+# If credentials (a CredentialSets) is given, each set is tried in turn - remembered one first.
+def open_connection(device_info, jump_host=None, timing=None, credentials=None):
+    if timing is not None:
+        device_info = timing.apply(device_info)
+
+    if credentials is not None:
+        return credentials.connect(device_info, lambda info: open_connection(info, jump_host))
+
+    if jump_host is None:
+        return ConnectHandler(**device_info)
+
+    device_type = device_info.get('device_type', '')
+    if device_type.endswith('_telnet'):
+        raise ValueError(f"{device_type} cannot be tunnelled through a jump host (SSH only).")
+
+    target = device_info.get('host') or device_info.get('ip')
+    channel = jump_host.open_channel(target, device_info.get('port', 22))
+    try:
+        return ConnectHandler(**device_info, sock=channel)
+    except Exception:
+        # A failed login (or any other setup error) would otherwise leave the tunnel open
+        channel.close()
+        raise
+
+# Function to prompt for an optional jump host - returns None to connect directly
+def prompt_jump_host():
+    jump_input = input("Enter jump host IP address[:port] (leave blank to connect directly): ").strip()
+    if not jump_input:
+        return None
+
+    host, _, port = jump_input.partition(':')
+    username = input(f"Enter username for jump host {host}: ")
+    password = getpass.getpass(prompt=f"Enter password for {username}@{host}: ")
+    return JumpHost(host, username, password, port=port or 22)
@@ -0,0 +1,100 @@
+# Description:
+"""Tries an ordered list of credentials per device and remembers which one worked."""
+
+import getpass
+import hashlib
+import json
+import os
+import secrets
+import threading
+from netmiko.exceptions import NetmikoAuthenticationException
+
+AFFINITY_PATH = os.path.join('Resources', 'credential_affinity.json')
+HASH_ITERATIONS = 100000
+
+# Holds the credential sets for a run plus an on-disk map of device IP -> the set that last worked.
+# Sets are recorded as salted PBKDF2 digests, so the affinity file never holds a username or password:
+# {"salt": "<hex>", "devices": {"10.0.0.1": "<digest>"}}
+class CredentialSets:
+    def __init__(self, credentials, path=AFFINITY_PATH):
+        self.credentials = [(username, password) for username, password in credentials]
+        self.path = path
+        self._lock = threading.Lock()
+        store = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as file:
+                    store = json.load(file)
+            except (OSError, ValueError):
+                store = {}
+        self.salt = store.get('salt') or secrets.token_hex(16)
+        self.devices = store.get('devices', {})
+        # Hash each set once per run - PBKDF2 is deliberately slow
+        self.digests = [self._digest(username, password) for username, password in self.credentials]
+        # Per-run memory, so each device is authenticated against the list at most once per run:
+        # the set that worked is the only one tried on later sessions, and devices where every set
+        # was rejected are skipped rather than retried (account lockout)
+        self.working = {}
+        self.failed = set()
+
+    def _digest(self, username, password):
+        secret = f"{username}\0{password}".encode()
+        return hashlib.pbkdf2_hmac('sha256', secret, bytes.fromhex(self.salt), HASH_ITERATIONS).hex()[:32]
+
+    # Function to list the credential sets for an IP with the remembered set first
+    def ordered(self, ip):
+        remembered = self.devices.get(ip)
+        if remembered in self.digests:
+            first = self.digests.index(remembered)
+            return [self.credentials[first]] + self.credentials[:first] + self.credentials[first + 1:]
+        return list(self.credentials)
+
+    def remember(self, ip, username, password):
+        with self._lock:
+            self.devices[ip] = self.digests[self.credentials.index((username, password))]
+            self.working[ip] = (username, password)
+            self.failed.discard(ip)
+
+    # Function to check whether every credential set has already been rejected by an IP this run
+    def exhausted(self, ip):
+        return ip in self.failed
+
+    # Function to call connect(device_info) with each credential set in turn until one authenticates.
+    # Once a set has worked on an IP this run only that set is used; once every set has been rejected
+    # the IP is refused without another login attempt.
+    def connect(self, device_info, connect):
+        ip = device_info.get('host') or device_info.get('ip')
+        if ip in self.failed:
+            raise NetmikoAuthenticationException(f"Skipping {ip} - every credential set was rejected earlier this run")
+        candidates = [self.working[ip]] if ip in self.working else self.ordered(ip)
+        last_error = None
+        for username, password in candidates:
+            try:
+                connection = connect(dict(device_info, username=username, password=password))
+            except NetmikoAuthenticationException as e:
+                last_error = e
+                continue
+            self.remember(ip, username, password)
+            return connection
+        with self._lock:
+            self.working.pop(ip, None)
+            self.failed.add(ip)
+        raise last_error or NetmikoAuthenticationException(f"No credential sets to try for {ip}")
+
+    def save(self):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, 'w') as file:
+                json.dump({'salt': self.salt, 'devices': self.devices}, file, indent=4)
+
+# Function to prompt for any extra credential sets beyond the first - returns a list of (username, password)
+def prompt_credential_sets():
+    credentials = []
+    while True:
+        username = input("Enter another username to try (leave blank when done): ").strip()
+        if not username:
+            return credentials
+        password = getpass.getpass(prompt=f"Enter password for {username}: ")
+        credentials.append((username, password))
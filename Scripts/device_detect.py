@@ -0,0 +1,153 @@
+# Description:
+"""Identifies a device's netmiko device_type and caches the fingerprint per IP."""
+
+import json
+import logging
+import os
+import threading
+import time
+from netmiko import SSHDetect
+from netmiko.exceptions import NetmikoAuthenticationException, NetmikoTimeoutException
+
+FINGERPRINT_PATH = os.path.join('Resources', 'fingerprints.json')
+FINGERPRINT_TTL = 30 * 24 * 60 * 60  # Re-detect after 30 days (code upgrades, RMAs, re-IPs)
+
+# Value to put in an inventory's device_type field to have it detected
+AUTODETECT = 'autodetect'
+
+# SSH server banner fragments -> device_type, used when the show version probes don't match
+BANNER_HINTS = [
+    ('Cisco', 'cisco_ios'),
+    ('Comware', 'hp_comware'),
+    ('HUAWEI', 'huawei'),
+    ('Arista', 'arista_eos'),
+    ('ProCurve', 'hp_procurve'),
+    ('Aruba', 'aruba_os'),
+    ('RomSShell', 'dell_powerconnect'),
+]
+
+# Keeps a JSON store of detected device types keyed by IP:
+# {"10.0.0.1": {"device_type": "cisco_ios", "source": "show version", "detected": 1700000000}}
+class FingerprintCache:
+    def __init__(self, path=FINGERPRINT_PATH, ttl=FINGERPRINT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.fingerprints = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as file:
+                    self.fingerprints = json.load(file)
+            except (OSError, ValueError):
+                self.fingerprints = {}
+
+    # Function to get the cached device_type for an IP, or None if missing/expired
+    def get(self, ip):
+        entry = self.fingerprints.get(ip)
+        if entry is None or time.time() - entry['detected'] > self.ttl:
+            return None
+        return entry['device_type']
+
+    def set(self, ip, device_type, source):
+        with self._lock:
+            self.fingerprints[ip] = {'device_type': device_type, 'source': source, 'detected': int(time.time())}
+
+    # Function to forget an IP, e.g. when the cached driver stops working
+    def forget(self, ip):
+        with self._lock:
+            self.fingerprints.pop(ip, None)
+
+    def save(self):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, 'w') as file:
+                json.dump(self.fingerprints, file, indent=4)
+
+# Function to map an SSH server banner (e.g. 'SSH-2.0-Cisco-1.25') to a device_type
+def device_type_from_banner(banner):
+    for hint, device_type in BANNER_HINTS:
+        if hint.lower() in (banner or '').lower():
+            return device_type
+    return None
+
+# Function to start SSHDetect, tunnelled through jump_host when one is given
+def _open_detector(probe_info, jump_host=None):
+    if jump_host is None:
+        return SSHDetect(**probe_info)
+    target = probe_info.get('host') or probe_info.get('ip')
+    channel = jump_host.open_channel(target, probe_info.get('port', 22))
+    try:
+        return SSHDetect(**dict(probe_info, sock=channel))
+    except Exception:
+        # A failed login would otherwise leave the tunnel open
+        channel.close()
+        raise
+
+# Function to detect a device_type from the show version probes, falling back to the SSH banner.
+# Returns (device_type, source) - device_type is None if the device couldn't be identified.
+def detect_device_type(device_info, jump_host=None, credentials=None):
+    probe_info = dict(device_info, device_type=AUTODETECT)
+    if credentials is not None:
+        guesser = credentials.connect(probe_info, lambda info: _open_detector(info, jump_host))
+    else:
+        guesser = _open_detector(probe_info, jump_host)
+    try:
+        best_match = guesser.autodetect()
+        if best_match:
+            return best_match, 'show version'
+
+        # Prompt styles the probes don't cover - '<sysname>' is Comware/Huawei user view
+        prompt = guesser.connection.find_prompt()
+        if prompt.startswith('<') and prompt.endswith('>'):
+            return 'hp_comware', 'prompt'
+
+        banner = guesser.connection.remote_conn_pre.get_transport().remote_version
+        banner_match = device_type_from_banner(banner)
+        if banner_match:
+            return banner_match, 'banner'
+        return None, None
+    finally:
+        guesser.connection.disconnect()
+
+# Function to get a device's device_type - cached fingerprint first, then detection, then default.
+# Devices that connect but can't be identified are cached with the default so they aren't re-probed.
+def resolve_device_type(device_info, fingerprints, jump_host=None, default='cisco_ios', credentials=None):
+    ip = device_info.get('host') or device_info.get('ip')
+    cached = fingerprints.get(ip)
+    if cached:
+        return cached
+
+    try:
+        device_type, source = detect_device_type(device_info, jump_host, credentials)
+    except Exception as e:
+        logging.error(f"Device type detection failed for {ip}: {str(e)}")
+        return default
+
+    if device_type is None:
+        device_type, source = default, 'default'
+    fingerprints.set(ip, device_type, source)
+    return device_type
+
+# Function to open a session with a device's resolved device_type. connect is a callable(device_type) -> connection.
+# If a type taken from the fingerprint cache can't open a session, the fingerprint is forgotten and the device
+# re-detected; the session is retried once when detection finds a different type. Returns (device_type, connection).
+def connect_detected(device_info, fingerprints, connect, jump_host=None, default='cisco_ios', credentials=None):
+    ip = device_info.get('host') or device_info.get('ip')
+    cached = fingerprints.get(ip) is not None
+    device_type = resolve_device_type(device_info, fingerprints, jump_host, default, credentials)
+    try:
+        return device_type, connect(device_type)
+    except (NetmikoAuthenticationException, NetmikoTimeoutException):
+        # Bad credentials or an unreachable device - the driver isn't the problem
+        raise
+    except Exception as e:
+        if not cached:
+            raise
+        logging.error(f"Cached device type {device_type} failed for {ip}, re-detecting: {str(e)}")
+        fingerprints.forget(ip)
+        detected = resolve_device_type(device_info, fingerprints, jump_host, default, credentials)
+        if detected == device_type:
+            raise
+        return detected, connect(detected)
@@ -0,0 +1,101 @@
+# Description:
+"""Resolves PTR records concurrently and caches answers, including misses, on disk."""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from progress import Progress
+
+DNS_CACHE_PATH = os.path.join('Resources', 'dns_cache.json')
+POSITIVE_TTL = 24 * 60 * 60  # Re-resolve names after a day (DHCP leases move names around)
+NEGATIVE_TTL = 60 * 60  # Retry addresses with no PTR record after an hour
+MAX_WORKERS = 32  # PTR lookups in flight at once
+# Error codes for an authoritative 'no such record' - h_errno HOST_NOT_FOUND/NO_DATA on Linux and macOS,
+# WSAHOST_NOT_FOUND/WSANO_DATA on Windows. TRY_AGAIN (2, WSATRY_AGAIN 11002) and the rest aren't misses.
+NOT_FOUND_ERRORS = {1, 4, 11001, 11004}
+
+# Keeps a JSON store of reverse lookups keyed by IP, with the time each answer expires:
+# {"10.0.0.5": {"name": "pc-1234.corp.local", "expires": 1700086400}, "10.0.0.6": {"name": null, "expires": 1700003600}}
+# A null name is a cached miss. Only NOT_FOUND_ERRORS are cached - TRY_AGAIN, timeouts and other failures aren't.
+class DnsResolver:
+    def __init__(self, path=DNS_CACHE_PATH, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    # Function to get a cached answer - returns (True, name or None) while it's fresh, (False, None) otherwise
+    def cached(self, ip):
+        entry = self.entries.get(ip)
+        if entry is None or entry['expires'] < time.time():
+            return False, None
+        return True, entry['name']
+
+    def _store(self, ip, name, ttl):
+        with self._lock:
+            self.entries[ip] = {'name': name, 'expires': int(time.time() + ttl)}
+
+    # Function to resolve one address with the blocking resolver, caching the answer or the miss
+    def _lookup(self, ip):
+        try:
+            name = socket.gethostbyaddr(ip)[0]
+        except OSError as e:
+            # herror on a plain lookup miss; Windows can also report it as gaierror WSAHOST_NOT_FOUND
+            if isinstance(e, (socket.herror, socket.gaierror)) and e.errno in NOT_FOUND_ERRORS:
+                self._store(ip, None, self.negative_ttl)
+            else:
+                logging.error(f"Hostname lookup failed for {ip}: {str(e)}")
+            return None
+        self._store(ip, name, self.positive_ttl)
+        return name
+
+    # Function to resolve one address - None when it has no PTR record or the lookup failed
+    def resolve(self, ip):
+        hit, name = self.cached(ip)
+        if hit:
+            return name
+        return self._lookup(ip)
+
+    # Function to resolve many addresses at once - cached answers are returned straight away and the
+    # rest are looked up in a bounded thread pool. Returns {ip: name or None}.
+    def resolve_many(self, ips):
+        names = {}
+        misses = []
+        for ip in dict.fromkeys(ips):
+            hit, name = self.cached(ip)
+            if hit:
+                names[ip] = name
+            else:
+                misses.append(ip)
+        if not misses:
+            return names
+
+        progress = Progress("Resolving hostnames", total=len(misses), unit="addresses")
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(misses))) as pool:
+            for ip, name in zip(misses, pool.map(self._lookup, misses)):
+                names[ip] = name
+                progress.update(detail=ip)
+        progress.close()
+        return names
+
+    # Function to write the cache back to disk, dropping expired entries
+    def save(self):
+        with self._lock:
+            now = time.time()
+            self.entries = {ip: entry for ip, entry in self.entries.items() if entry['expires'] >= now}
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, 'w') as file:
+                json.dump(self.entries, file, indent=4)
@@ -0,0 +1,236 @@
+# Author - Bryan Dufresne
+# Description:
+"""Finds the switch edge port for any MAC or IP address from the latest snapshots of every switch and router."""
+
+import ipaddress
+import time
+from interface_names import canonical_interface
+from snapshot_store import SnapshotStore, normalize_mac
+
+# A port with more learned MACs than this is treated as an uplink even without a CDP/LLDP neighbor
+MAX_EDGE_MACS = 8
+
+# Collectors whose snapshots hold ARP caches - each device they list in 'devices' had its whole cache
+# read, so a device listed with no ARP rows has an empty cache rather than simply not being polled
+ARP_COLLECTORS = {'gateway_harvester', 'sp_arper', 'sp_device_inventory', 'subnet_recon'}
+
+# Function to turn a MAC address in any vendor format into an int key, or None if it isn't one
+def mac_key(mac):
+    digits = normalize_mac(mac)
+    if not digits or len(digits) != 12:
+        return None
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return None
+
+# Function to print a MAC key as Cisco-style dotted hex
+def format_mac(key):
+    digits = f"{key:012x}"
+    return f"{digits[0:4]}.{digits[4:8]}.{digits[8:12]}"
+
+# In-memory index over the snapshot database, built from each device's most recent finished snapshot:
+#   MAC tables -> {mac int: {switch IP: (hostname, port, port key, VLAN, seen)}}
+#   ARP caches -> {IP: (mac int, router IP, seen)} and {mac int: {IPs}}
+# Ports with a CDP/LLDP neighbor or more than MAX_EDGE_MACS MACs are uplinks, so lookups return the edge port.
+# Ports are shown as the device reported them; the port key (canonical_interface) is only used for matching
+# a MAC table's port against the neighbor tables, which may spell the same port differently.
+# refresh() loads only snapshots finished since the last call; each device a snapshot covers replaces its
+# older entries (with nothing, if the snapshot found none), so the index stays current without rebuilding.
+# A switch is covered by any snapshot with interface, neighbor or MAC rows for it; a router by an
+# ARP_COLLECTORS snapshot listing it. Old ARP rows with no device_ip are keyed by collector and site.
+class EndpointLocator:
+    def __init__(self, store):
+        self.store = store
+        self.loaded = set()
+        self.mac_devices = {}  # switch IP -> ((started, snapshot id), [(mac int, hostname, port, port key, VLAN)])
+        self.arp_devices = {}  # router IP -> ((started, snapshot id), [(IP, mac int)])
+        self.neighbor_ports = {}  # switch IP -> ((started, snapshot id), {port keys with a neighbor})
+        self.uplinks = {}  # switch IP -> {uplink port keys}
+        self.sightings = {}
+        self.ip_to_mac = {}
+        self.mac_to_ips = {}
+
+    # Function to load snapshots finished since the last refresh - returns how many were loaded
+    def refresh(self):
+        rows = [
+            row for row in self.store.query("SELECT id, collector, site, started FROM snapshots WHERE finished IS NOT NULL")
+            if row['id'] not in self.loaded
+        ]
+        if not rows:
+            return 0
+        snapshots = {row['id']: (row['started'], row['id']) for row in rows}
+        collectors = {row['id']: row['collector'] for row in rows}
+        sources = {row['id']: f"{row['collector']}:{row['site'] or ''}" for row in rows}
+        placeholders = ', '.join('?' * len(snapshots))
+        ids = list(snapshots)
+
+        # (device IP, snapshot id) pairs each snapshot covers, whether or not it found any entries.
+        # Port walks (interface rows) cover a switch's neighbors as well as its MAC table.
+        port_covered = set()
+        for row in self.store.query(f"SELECT snapshot_id, device_ip FROM interfaces WHERE snapshot_id IN ({placeholders})", ids):
+            port_covered.add((row['device_ip'], row['snapshot_id']))
+        arp_covered = set()
+        for row in self.store.query(f"SELECT snapshot_id, ip FROM devices WHERE snapshot_id IN ({placeholders})", ids):
+            if collectors[row['snapshot_id']] in ARP_COLLECTORS:
+                arp_covered.add((row['ip'], row['snapshot_id']))
+        mac_covered = set(port_covered)
+
+        macs = {}
+        for row in self.store.query(f"SELECT snapshot_id, device_ip, hostname, interface, vlan, mac FROM mac_entries WHERE snapshot_id IN ({placeholders})", ids):
+            mac_covered.add((row['device_ip'], row['snapshot_id']))
+            key = mac_key(row['mac'])
+            if key is not None:
+                macs.setdefault((row['device_ip'], row['snapshot_id']), []).append((key, row['hostname'], row['interface'], canonical_interface(row['interface'] or ''), row['vlan']))
+
+        arps = {}
+        for row in self.store.query(f"SELECT snapshot_id, device_ip, ip, mac FROM arp_entries WHERE snapshot_id IN ({placeholders})", ids):
+            device_ip = row['device_ip'] or sources[row['snapshot_id']]
+            arp_covered.add((device_ip, row['snapshot_id']))
+            key = mac_key(row['mac'])
+            if key is not None and row['ip']:
+                arps.setdefault((device_ip, row['snapshot_id']), []).append((row['ip'], key))
+
+        neighbors = {}
+        for row in self.store.query(f"SELECT snapshot_id, device_ip, interface FROM neighbors WHERE snapshot_id IN ({placeholders})", ids):
+            port_covered.add((row['device_ip'], row['snapshot_id']))
+            mac_covered.add((row['device_ip'], row['snapshot_id']))
+            neighbors.setdefault((row['device_ip'], row['snapshot_id']), set()).add(canonical_interface(row['interface'] or ''))
+
+        changed = set()
+        for device_ip, snapshot_id in mac_covered:
+            if self._newer(self.mac_devices, device_ip, snapshots[snapshot_id]):
+                entries = macs.get((device_ip, snapshot_id), [])
+                self._drop_macs(device_ip)
+                self.mac_devices[device_ip] = (snapshots[snapshot_id], entries)
+                for key, hostname, port, port_key, vlan in entries:
+                    self.sightings.setdefault(key, {})[device_ip] = (hostname, port, port_key, vlan, snapshots[snapshot_id][0])
+                changed.add(device_ip)
+        for device_ip, snapshot_id in port_covered:
+            if self._newer(self.neighbor_ports, device_ip, snapshots[snapshot_id]):
+                self.neighbor_ports[device_ip] = (snapshots[snapshot_id], neighbors.get((device_ip, snapshot_id), set()))
+                changed.add(device_ip)
+        for device_ip, snapshot_id in arp_covered:
+            if self._newer(self.arp_devices, device_ip, snapshots[snapshot_id]):
+                entries = arps.get((device_ip, snapshot_id), [])
+                self._drop_arps(device_ip)
+                self.arp_devices[device_ip] = (snapshots[snapshot_id], entries)
+                for ip, key in entries:
+                    self._add_arp(ip, key, device_ip, snapshots[snapshot_id][0])
+
+        for device_ip in changed:
+            self._update_uplinks(device_ip)
+        self.loaded.update(snapshots)
+        return len(snapshots)
+
+    # Function to check whether a snapshot is newer than the one already indexed for a device
+    @staticmethod
+    def _newer(index, device_ip, snapshot):
+        current = index.get(device_ip)
+        return current is None or snapshot > current[0]
+
+    def _drop_macs(self, device_ip):
+        for key, _, _, _, _ in self.mac_devices.get(device_ip, (None, []))[1]:
+            devices = self.sightings.get(key, {})
+            devices.pop(device_ip, None)
+            if not devices:
+                self.sightings.pop(key, None)
+
+    def _drop_arps(self, device_ip):
+        for ip, key in self.arp_devices.get(device_ip, (None, []))[1]:
+            if self.ip_to_mac.get(ip, (None, None))[1] == device_ip:
+                del self.ip_to_mac[ip]
+                self.mac_to_ips.get(key, set()).discard(ip)
+
+    # Function to index one ARP entry - where routers disagree about an IP, the most recent sighting wins
+    def _add_arp(self, ip, key, device_ip, seen):
+        current = self.ip_to_mac.get(ip)
+        if current is not None and current[2] > seen:
+            return
+        if current is not None:
+            self.mac_to_ips.get(current[0], set()).discard(ip)
+        self.ip_to_mac[ip] = (key, device_ip, seen)
+        self.mac_to_ips.setdefault(key, set()).add(ip)
+
+    # Function to work out a switch's uplinks from its neighbors and per-port MAC counts
+    def _update_uplinks(self, device_ip):
+        counts = {}
+        for _, _, _, port_key, _ in self.mac_devices.get(device_ip, (None, []))[1]:
+            counts[port_key] = counts.get(port_key, 0) + 1
+        uplinks = {port for port, count in counts.items() if count > MAX_EDGE_MACS}
+        uplinks.update(self.neighbor_ports.get(device_ip, (None, set()))[1])
+        self.uplinks[device_ip] = uplinks
+
+    # Function to find a MAC or IP address. Returns a list of result dicts, edge ports first;
+    # uplink sightings are only returned when the address isn't seen on any edge port.
+    def locate(self, query):
+        query = query.strip()
+        try:
+            ip = str(ipaddress.ip_address(query))
+        except ValueError:
+            key = mac_key(query)
+        else:
+            key = self.ip_to_mac.get(ip, (None,))[0]
+        if key is None:
+            return []
+
+        results = []
+        for device_ip, (hostname, port, port_key, vlan, seen) in self.sightings.get(key, {}).items():
+            results.append({
+                'mac': format_mac(key),
+                'ips': sorted(self.mac_to_ips.get(key, ())),
+                'switch': hostname or device_ip,
+                'switch_ip': device_ip,
+                'port': port,
+                'vlan': vlan,
+                'seen': seen,
+                'edge': port_key not in self.uplinks.get(device_ip, ()),
+            })
+        edge = [result for result in results if result['edge']]
+        results = sorted(edge or results, key=lambda result: result['seen'], reverse=True)
+        if not results and key in self.mac_to_ips:
+            # Known to a router but not on any switch MAC table yet
+            results.append({'mac': format_mac(key), 'ips': sorted(self.mac_to_ips[key]), 'switch': None, 'switch_ip': None, 'port': None, 'vlan': None, 'seen': None, 'edge': False})
+        return results
+
+def main():
+
+    print("#####\nEndpoint Locator\n#####\n")
+
+    store = SnapshotStore()
+    locator = EndpointLocator(store)
+
+    start = time.perf_counter()
+    loaded = locator.refresh()
+    print(f"Indexed {loaded} snapshots ({len(locator.sightings)} MACs, {len(locator.ip_to_mac)} IPs) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    while True:
+        query = input("\nEnter a MAC or IP address (or type 'exit' to quit): ").strip()
+        if query.lower() == 'exit':
+            break
+        if not query:
+            continue
+
+        # Pick up any collection runs that finished since the last lookup
+        locator.refresh()
+
+        start = time.perf_counter()
+        results = locator.locate(query)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if not results:
+            print(f"{query} not found in the latest snapshots ({elapsed:.2f} ms)")
+            continue
+        for result in results:
+            ips = ', '.join(result['ips']) or 'no ARP entry'
+            if result['switch'] is None:
+                print(f"{result['mac']} ({ips}) - seen in ARP only, not on any switch")
+                continue
+            where = "edge port" if result['edge'] else "uplink only"
+            print(f"{result['mac']} ({ips}) - {result['switch']} [{result['switch_ip']}] {result['port']} VLAN {result['vlan']} - {where}, seen {result['seen']}")
+        print(f"({elapsed:.2f} ms)")
+
+    store.close()
+
+if __name__ == "__main__":
+    main()
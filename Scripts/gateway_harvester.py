@@ -0,0 +1,254 @@
+# Author - Bryan Dufresne
+# Description:
+"""Discovers live hosts by pulling the ARP table from each L3 gateway concurrently, instead of ping-sweeping."""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import getpass
+import ipaddress
+import json
+import os
+import re
+from connect_helper import open_connection, prompt_jump_host
+from dns_resolver import DnsResolver
+from progress import Progress
+from snapshot_store import SnapshotStore
+from timing_profiles import TimingProfiles
+
+MAX_WORKERS = 16  # Gateways harvested at once
+
+IPV4 = re.compile(r'^\d{1,3}(\.\d{1,3}){3}$')
+MAC = re.compile(r'^([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}|[0-9a-fA-F]{2}([:-][0-9a-fA-F]{2}){5}|[0-9a-fA-F]{6}-[0-9a-fA-F]{6})$')
+
+# BusyBox-style arp output from the SilverPeak shell: '? (10.0.0.5) at aa:bb:cc:dd:ee:ff [ether] on lan0'
+SILVERPEAK_ARP_LINE = re.compile(r'\((\d{1,3}(?:\.\d{1,3}){3})\) at (\S+)(?: \[\w+\])?(?: on (\S+))?')
+
+PREFIX = re.compile(r'\d{1,3}(?:\.\d{1,3}){3}/\d{1,2}')
+
+# Function to parse Cisco 'show ip arp':
+# 'Internet  10.0.0.5  12  aabb.ccdd.eeff  ARPA  Vlan10' - incomplete entries have no MAC and are skipped
+def parse_cisco_arp(output):
+    entries = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 4 and parts[0] == 'Internet' and IPV4.match(parts[1]) and MAC.match(parts[3]):
+            entries.append({'ip': parts[1], 'mac': parts[3], 'interface': parts[5] if len(parts) > 5 else ''})
+    return entries
+
+# Function to parse the SilverPeak shell's arp output (entries shown as '<incomplete>' are skipped)
+def parse_silverpeak_arp(output):
+    entries = []
+    for line in output.splitlines():
+        match = SILVERPEAK_ARP_LINE.search(line)
+        if match and MAC.match(match.group(2)):
+            entries.append({'ip': match.group(1), 'mac': match.group(2), 'interface': match.group(3) or ''})
+    return entries
+
+# Function to parse Aruba 'show arp' - AOS-Switch ('10.0.0.5  aabbcc-ddeeff  dynamic  1') and
+# AOS-CX ('10.0.0.5  aa:bb:cc:dd:ee:ff  vlan10  1/1/1  reachable') both lead with the IP and MAC
+def parse_aruba_arp(output):
+    entries = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and IPV4.match(parts[0]) and MAC.match(parts[1]):
+            entries.append({'ip': parts[0], 'mac': parts[1], 'interface': parts[2] if len(parts) > 2 and parts[2].lower().startswith('vlan') else ''})
+    return entries
+
+# Function to pull the connected subnets out of a route table or interface address listing:
+# Cisco/Aruba 'show ip route connected' ('C  10.0.0.0/24 is directly connected, Vlan10') and the
+# SilverPeak shell's 'ip -4 -o addr show' ('2: lan0  inet 10.0.0.1/24 brd ...'). Host routes
+# (/32 local addresses), loopback and Cisco's 'is variably subnetted' headers are skipped.
+def parse_connected_subnets(output):
+    subnets = set()
+    for line in output.splitlines():
+        if 'subnetted' in line:
+            continue
+        for prefix in PREFIX.findall(line):
+            try:
+                network = ipaddress.ip_interface(prefix).network
+            except ValueError:
+                continue
+            if network.prefixlen < 32 and not network.is_loopback:
+                subnets.add(network)
+    return sorted(subnets)
+
+# How each kind of gateway is reached and read. 'shell' is sent first to leave the CLI (SilverPeak's Linux shell).
+# 'subnets' lists the gateway's connected prefixes, which size the subnets its ARP table covers.
+GATEWAY_PLATFORMS = {
+    'cisco': {'device_type': 'cisco_ios', 'command': 'show ip arp', 'parser': parse_cisco_arp, 'subnets': 'show ip route connected'},
+    'aruba': {'device_type': 'aruba_os', 'command': 'show arp', 'parser': parse_aruba_arp, 'subnets': 'show ip route connected'},
+    'silverpeak': {'device_type': 'cisco_ios', 'shell': '_spsshell', 'command': 'arp | grep -v incomplete', 'parser': parse_silverpeak_arp, 'subnets': 'ip -4 -o addr show'},
+}
+
+# Function to read a gateway list - '10.0.0.1,10.0.1.1:aruba,10.0.2.1:silverpeak' -> [(ip, platform)]
+def parse_gateway_list(text, default_platform='cisco'):
+    gateways = []
+    for item in text.split(','):
+        ip, _, platform = item.strip().partition(':')
+        if not ip:
+            continue
+        platform = (platform or default_platform).strip().lower()
+        if platform not in GATEWAY_PLATFORMS:
+            print(f"Unknown platform '{platform}' for {ip} - expected one of: {', '.join(GATEWAY_PLATFORMS)}. Skipping.")
+            continue
+        gateways.append((ip, platform))
+    return gateways
+
+# Function to log into one gateway and return (hostname, ARP entries, connected subnets). A gateway
+# whose connected subnets can't be read still returns its ARP entries, with no subnets (subnet_size 0).
+# Nothing is printed here - gateways are harvested in worker threads under a progress line.
+def harvest_gateway(ip, platform, username, password, jump_host=None, timing=None):
+    settings = GATEWAY_PLATFORMS[platform]
+    device_info = {
+        'device_type': settings['device_type'],
+        'ip': ip,
+        'username': username,
+        'password': password,
+    }
+    timing = timing or TimingProfiles()
+    connection = open_connection(device_info, jump_host, timing)
+    try:
+        connection.enable()
+        hostname = timing.find_prompt(connection, ip).strip("#<>[]")
+        if 'shell' in settings:
+            # The shell prompt differs from the CLI's, so match any shell prompt from here on
+            connection.send_command(settings['shell'], expect_string=r'[#$]\s*$')
+            send = lambda command: timing.send_command(connection, ip, command, expect_string=r'[#$]\s*$')
+        else:
+            send = lambda command: timing.send_command(connection, ip, command)
+        output = send(settings['command'])
+        try:
+            subnets = parse_connected_subnets(send(settings['subnets']))
+        except Exception:
+            subnets = []
+    finally:
+        connection.disconnect()
+    return hostname, settings['parser'](output), subnets
+
+# Function to harvest every gateway in a thread pool. Yields (ip, platform, hostname, entries, subnets, error)
+# as each one finishes; a gateway that fails is reported rather than stopping the run.
+def harvest_gateways(gateways, username, password, jump_host=None, timing=None, label="Harvesting gateways"):
+    timing = timing or TimingProfiles()
+    with ThreadPoolExecutor(max_workers=max(min(MAX_WORKERS, len(gateways)), 1)) as pool:
+        futures = {pool.submit(harvest_gateway, ip, platform, username, password, jump_host, timing): (ip, platform) for ip, platform in gateways}
+        progress = Progress(label, total=len(futures), unit="gateways", min_total=0)
+        for future in as_completed(futures):
+            ip, platform = futures[future]
+            progress.update(detail=ip)
+            error = future.exception()
+            if error is not None:
+                yield ip, platform, None, [], [], error
+            else:
+                hostname, entries, subnets = future.result()
+                yield ip, platform, hostname, entries, subnets, None
+        progress.close()
+
+# Function to build a gateway's result in subnet_sweeper's format, plus the ARP details behind it.
+# subnet_size counts the usable hosts in the gateway's connected subnets, as subnet_recon does, and
+# total_attempts the ARP entries examined - no addresses are probed.
+def harvest_result(ip, hostname, entries, subnets=()):
+    active_hosts = list(dict.fromkeys(entry['ip'] for entry in entries))
+    return {
+        "gateway": ip,
+        "hostname": hostname,
+        "total_alive": len(active_hosts),
+        "subnet_size": sum(len(list(subnet.hosts())) for subnet in subnets),
+        "total_attempts": len(entries),
+        "subnets": [str(subnet) for subnet in subnets],
+        "active_hosts": active_hosts,
+        "arp_entries": entries,
+    }
+
+# Function to write one JSON file per gateway and a combined summary, as subnet_sweeper does.
+# results is a list of harvest_result dicts; returns the summary's path.
+def save_harvest(results, prefix="Harvest", output_directory='Output'):
+    current_datetime = datetime.now().strftime("%Y-%m-%d")
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+
+    all_active_hosts = []
+    total_attempts = 0
+    for result in results:
+        output_path = os.path.join(output_directory, f"{prefix} - {result['gateway']} - {current_datetime}.json")
+        with open(output_path, 'w') as json_file:
+            json.dump(result, json_file, indent=4)
+        all_active_hosts.extend(result['active_hosts'])
+        total_attempts += result['total_attempts']
+
+    combined_results = {
+        "total_successful": len(all_active_hosts),
+        "total_attempts": total_attempts,
+        "all_active_hosts": all_active_hosts,
+        "gateways": [result['gateway'] for result in results],
+    }
+    combined_output_path = os.path.join(output_directory, f"{prefix} Summary - {current_datetime}.json")
+    with open(combined_output_path, 'w') as json_file:
+        json.dump(combined_results, json_file, indent=4)
+    return combined_output_path
+
+# Function to harvest gateways and save the results - shared by the gateway and SilverPeak modes
+def run_harvest(gateways, username, password, jump_host=None, prefix="Harvest", collector='gateway_harvester'):
+    timing = TimingProfiles()
+
+    # ARP entries also go to the shared snapshot database
+    store = SnapshotStore()
+    snapshot = store.start(collector)
+
+    try:
+        harvested = []
+        for ip, platform, hostname, entries, subnets, error in harvest_gateways(gateways, username, password, jump_host, timing):
+            if error is not None:
+                print(f"Unable to harvest {ip} ({platform}): {error}")
+                continue
+            print(f"{hostname} [{ip}]: {len(entries)} ARP entries")
+            harvested.append((ip, platform, hostname, entries, subnets))
+
+        # Every gateway's hosts are reverse-resolved in one batch, answers cached for the next run
+        resolver = DnsResolver()
+        names = resolver.resolve_many(entry['ip'] for _, _, _, entries, _ in harvested for entry in entries)
+        resolver.save()
+
+        results = []
+        for ip, platform, hostname, entries, subnets in harvested:
+            entries = [dict(entry, name=names.get(entry['ip'])) for entry in entries]
+            results.append(harvest_result(ip, hostname, entries, subnets))
+            # Listed even when its table is empty, so lookups drop the gateway's stale entries
+            snapshot.add('devices', {'ip': ip, 'hostname': hostname, 'device_type': GATEWAY_PLATFORMS[platform]['device_type']})
+            snapshot.add_many('arp_entries', [dict(entry, device_ip=ip, hostname=hostname) for entry in entries])
+
+        timing.save()
+    finally:
+        snapshot.finish()
+        store.close()
+
+    summary_path = save_harvest(results, prefix)
+    print(f"\nHarvested {sum(result['total_alive'] for result in results)} live hosts from {len(results)} of {len(gateways)} gateways.")
+    print(f"Combined results saved to: {summary_path}")
+    return results
+
+def main():
+
+    print("#####\nGateway ARP Harvester\n#####\n")
+
+    gateway_input = input("(Example: 10.0.0.1,10.0.1.1:aruba,10.0.2.1:silverpeak)\nEnter gateway IP addresses, with :platform where it differs from the default: ")
+    default_platform = input(f"Default platform [{'/'.join(GATEWAY_PLATFORMS)}] (leave blank for cisco): ").strip().lower() or 'cisco'
+    if default_platform not in GATEWAY_PLATFORMS:
+        print(f"Unknown platform: {default_platform}")
+        return
+    gateways = parse_gateway_list(gateway_input, default_platform)
+    if not gateways:
+        print("No gateways to harvest.")
+        return
+
+    username = input("Enter your username: ")
+    password = getpass.getpass(prompt="Enter your password: ")
+    jump_host = prompt_jump_host()
+
+    try:
+        run_harvest(gateways, username, password, jump_host)
+    finally:
+        if jump_host is not None:
+            jump_host.close()
+
+if __name__ == "__main__":
+    main()
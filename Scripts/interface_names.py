@@ -0,0 +1,136 @@
+# Description:
+"""Canonicalizes vendor long/short interface names into one join key (e.g. 'Gi1/0/1')."""
+
+from functools import lru_cache
+import re
+
+# Long interface type names and the canonical short form used as the key everywhere
+CANONICAL_TYPES = [
+    ('FastEthernet', 'Fa'),
+    ('GigabitEthernet', 'Gi'),
+    ('TwoGigabitEthernet', 'Tw'),
+    ('FiveGigabitEthernet', 'Fi'),
+    ('TenGigabitEthernet', 'Te'),
+    ('TwentyFiveGigabitEthernet', 'Twe'),
+    ('FortyGigabitEthernet', 'Fo'),
+    ('FiftyGigabitEthernet', 'Fif'),
+    ('HundredGigabitEthernet', 'Hu'),
+    ('TwoHundredGigabitEthernet', 'TH'),
+    ('FourHundredGigabitEthernet', 'FH'),
+    ('AppGigabitEthernet', 'Ap'),
+    ('Ten-GigabitEthernet', 'Te'),  # Comware spelling
+    ('Ethernet', 'Et'),
+    ('Port-channel', 'Po'),
+    ('Bundle-Ether', 'BE'),
+    ('Bridge-Aggregation', 'BAGG'),
+    ('Vlan', 'Vl'),
+    ('Loopback', 'Lo'),
+    ('Tunnel', 'Tu'),
+    ('Management', 'Ma'),
+    ('mgmt', 'mgmt'),
+    ('Serial', 'Se'),
+    ('Dialer', 'Di'),
+    ('BDI', 'BDI'),
+    ('nve', 'nve'),
+]
+
+# Vendor spellings that aren't a plain prefix of the long name, or whose prefix is ambiguous
+ALIASES = {
+    'gig': 'Gi',
+    'ge': 'Gi',  # Comware
+    'xge': 'Te',  # Comware
+    'gige': 'Gi',
+    'tengige': 'Te',
+    'twentyfivegige': 'Twe',
+    'fortygige': 'Fo',
+    'hundredgige': 'Hu',
+    'eth': 'Et',
+    'po': 'Po',
+    'portchannel': 'Po',
+    'port-channel': 'Po',
+    'tw': 'Tw',
+    'twe': 'Twe',
+    'fi': 'Fi',
+    'fo': 'Fo',
+    'be': 'BE',
+    'fif': 'Fif',
+    'th': 'TH',
+    'fh': 'FH',
+    'mgmt': 'mgmt',
+    'vlan': 'Vl',
+    'trk': 'Trk',  # HP/Aruba trunk groups
+}
+
+# Canonical short name -> long type name (first spelling listed wins, e.g. 'Te' -> 'TenGigabitEthernet')
+LONG_TYPES = {}
+for long_name, short in CANONICAL_TYPES:
+    LONG_TYPES.setdefault(short, long_name)
+
+# Canonical types that are physical Ethernet ports (counted in interface summaries)
+ETHERNET_TYPES = {'Fa', 'Gi', 'Tw', 'Fi', 'Te', 'Twe', 'Fo', 'Fif', 'Hu', 'TH', 'FH', 'Et'}
+
+# Splits 'GigabitEthernet1/0/1,' / 'Gi 1/0/1' / 'Port-channel10.100' into type and number
+INTERFACE_PATTERN = re.compile(r'\s*([A-Za-z][A-Za-z-]*?)\s*(\d[\w/.:]*)?\s*,?\s*$')
+
+# HP ProCurve/Aruba AOS-Switch Ethernet ports - '24' on fixed switches, 'A1'/'B24' on modular chassis
+PROCURVE_PORT_PATTERN = re.compile(r'\s*[A-Za-z]?\d+\s*,?\s*$')
+
+# Shortest abbreviation resolved through the trie - a single letter ('A1', 'B24') is a ProCurve module
+MIN_PREFIX = 2
+
+# Function to build the prefix trie once at import. Every node holds the set of canonical types
+# reachable below it, so any unambiguous abbreviation of MIN_PREFIX or more letters ('Gigabit', 'TenG') resolves.
+def _build_trie():
+    root = {'children': {}, 'types': set()}
+    for long_name, short in CANONICAL_TYPES:
+        node = root
+        for char in long_name.lower():
+            node = node['children'].setdefault(char, {'children': {}, 'types': set()})
+            node['types'].add(short)
+    return root
+
+_TRIE = _build_trie()
+
+# Function to resolve an interface type prefix ('Gi', 'gigabitethernet', 'TenGig') to its canonical form
+def _canonical_type(prefix):
+    lowered = prefix.lower()
+    if lowered in ALIASES:
+        return ALIASES[lowered]
+    if len(lowered) < MIN_PREFIX:
+        return None
+
+    node = _TRIE
+    for char in lowered:
+        node = node['children'].get(char)
+        if node is None:
+            return None
+    return next(iter(node['types'])) if len(node['types']) == 1 else None
+
+# Function to map any long/short interface name to its canonical key - unknown types pass through unchanged
+@lru_cache(maxsize=8192)
+def canonical_interface(name):
+    if not name:
+        return ''
+    match = INTERFACE_PATTERN.match(str(name))
+    if not match:
+        return str(name).strip()
+    prefix, number = match.group(1), match.group(2) or ''
+    return (_canonical_type(prefix) or prefix) + number
+
+# Function to get the long type name of an interface ('Gi1/0/1' -> 'GigabitEthernet'), or None if unknown.
+# ProCurve-style ports ('A1', '24') are reported as 'Ethernet'.
+@lru_cache(maxsize=1024)
+def long_interface_type(name):
+    if PROCURVE_PORT_PATTERN.match(str(name or '')):
+        return 'Ethernet'
+    match = INTERFACE_PATTERN.match(str(name or ''))
+    if not match:
+        return None
+    return LONG_TYPES.get(_canonical_type(match.group(1)))
+
+# Function to check if an interface is a physical Ethernet port
+def is_ethernet(name):
+    if PROCURVE_PORT_PATTERN.match(str(name or '')):
+        return True
+    match = INTERFACE_PATTERN.match(str(name or ''))
+    return bool(match) and _canonical_type(match.group(1)) in ETHERNET_TYPES
@@ -0,0 +1,107 @@
+# Description:
+"""Appends report rows to Parquet datasets partitioned by site and date, for fleet-wide analytics."""
+
+from datetime import date, datetime
+import os
+import re
+import uuid
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATASET_DIR = os.path.join('Output', 'Datasets')
+ROWS_PER_FILE = 50000  # Rows buffered before a part file is written
+PARTITIONING = ds.partitioning(pa.schema([('site', pa.string()), ('date', pa.string())]), flavor='hive')
+
+# Function to make a value safe to use as a partition directory name
+def partition_value(value):
+    return re.sub(r'[^\w.-]+', '_', str(value)).strip('_') or 'unknown'
+
+# Function to build a schema - every column is a string unless types ({column: pyarrow type}) says otherwise
+def dataset_schema(columns, types=None):
+    types = types or {}
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+# Function to convert a cell to the column's type - None/NaN/NA become null
+def _value(value, field_type):
+    if value is None:
+        return None
+    try:
+        if value != value:  # NaN
+            return None
+    except TypeError:  # pandas.NA refuses comparison
+        return None
+    if pa.types.is_string(field_type):
+        return str(value)
+    return value
+
+# Rows for one dataset, site and day, written as new part files:
+#   Output\Datasets\<name>\site=<site>\date=<YYYY-MM-DD>\part-<time>-<id>.parquet
+# Existing files are never opened again, so appending a run never rewrites earlier partitions.
+# Part files are written under a '.' name and renamed once complete, so readers never see half a file.
+class DatasetWriter:
+    def __init__(self, name, site, columns, types=None, day=None, root=DATASET_DIR):
+        self.name = name
+        self.schema = dataset_schema(columns, types)
+        self.path = os.path.join(root, name, f"site={partition_value(site)}", f"date={day or date.isoformat(date.today())}")
+        self.rows = {field.name: [] for field in self.schema}
+        self.count = 0
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Function to add a dict row - keys outside the schema are ignored, missing ones are null
+    def write_record(self, record):
+        for field in self.schema:
+            self.rows[field.name].append(_value(record.get(field.name), field.type))
+        self.count += 1
+        if self.count >= ROWS_PER_FILE:
+            self.flush()
+
+    # Function to add every row of a DataFrame, matching its columns by name
+    def write_frame(self, frame):
+        for record in frame.to_dict('records'):
+            self.write_record(record)
+
+    # Function to write the buffered rows out as one new part file
+    def flush(self):
+        if not self.count:
+            return
+        table = pa.Table.from_pydict(self.rows, schema=self.schema)
+        os.makedirs(self.path, exist_ok=True)
+        filename = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex}.parquet"
+        temp_path = os.path.join(self.path, f".{filename}.tmp")
+        pq.write_table(table, temp_path, compression='zstd')
+        os.replace(temp_path, os.path.join(self.path, filename))
+        self.files.append(filename)
+        self.rows = {field.name: [] for field in self.schema}
+        self.count = 0
+
+    def close(self):
+        self.flush()
+
+# Function to read a dataset back as a DataFrame. Only the requested columns are read, and partitions
+# outside sites / since..until (ISO dates, inclusive) are skipped without opening their files.
+# The 'site' and 'date' partition values can be requested as columns too.
+def read_dataset(name, columns=None, sites=None, since=None, until=None, root=DATASET_DIR):
+    dataset = ds.dataset(os.path.join(root, name), format='parquet', partitioning=PARTITIONING)
+    conditions = []
+    if sites:
+        conditions.append(ds.field('site').isin([partition_value(site) for site in sites]))
+    if since:
+        conditions.append(ds.field('date') >= since)
+    if until:
+        conditions.append(ds.field('date') <= until)
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+# Function to ask whether this run should also append its rows to the Parquet datasets
+def prompt_dataset_export():
+    answer = input(f"Also append results to the Parquet datasets in {DATASET_DIR}? [y/n]: ").strip().lower()
+    return answer == 'y'
@@ -0,0 +1,106 @@
+# Description:
+"""Caches parsed records on disk, keyed by a hash of the command, platform, parser version and raw output."""
+
+from functools import lru_cache
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+CACHE_DIR = os.path.join('Resources', 'ParseCache')
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # Least recently used entries are evicted past this size
+
+# Stores each parse result as Resources/ParseCache/<sha256>.pickle. A hit touches the file's mtime,
+# so eviction by oldest mtime drops the least recently used results first.
+# Bump a parser's version string whenever its output changes shape, so old entries stop matching.
+class ParseCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(cache_dir) if entry.name.endswith('.pickle'))
+
+    # Function to build the cache key - the raw output is hashed along with everything that shapes the result
+    @staticmethod
+    def key(command, platform, version, output):
+        digest = hashlib.sha256()
+        for part in (command, platform, version):
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(output.encode('utf-8', 'replace'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pickle")
+
+    # Function to get a cached result - returns (True, records) on a hit, (False, None) on a miss
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                records = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, records
+
+    # Function to store a result. The temp file is unique per call (worker processes share thread idents
+    # under fork), and an overwritten entry's old size is taken back out so the total stays accurate.
+    def put(self, key, records):
+        path = self._path(key)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                pickle.dump(records, file, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(temp_path)
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        with self.lock:
+            self.size += size - old_size
+            if self.size > self.max_bytes:
+                self._evict()
+
+    # Function to delete the least recently used entries until the cache is back under its size limit
+    def _evict(self):
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.pickle')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+                self.size -= size
+            except OSError:
+                pass
+
+    # Function to return the cached result for this output, or run parse(output) and cache it
+    def cached(self, command, platform, version, output, parse):
+        key = self.key(command, platform, version, output)
+        hit, records = self.get(key)
+        if hit:
+            return records
+        records = parse(output)
+        self.put(key, records)
+        return records
+
+# Function to get one ParseCache per process - offline worker processes each open their own
+@lru_cache(maxsize=1)
+def shared_cache():
+    return ParseCache()
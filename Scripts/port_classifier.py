@@ -0,0 +1,111 @@
+# Description:
+"""Classifies hosts by their open TCP ports (and optional banners) with an in-process asyncio connect scan."""
+
+import asyncio
+import re
+from progress import Progress
+
+CONNECT_TIMEOUT = 1.5  # Seconds to wait for a TCP handshake before calling the port filtered
+BANNER_TIMEOUT = 2.0  # Seconds to wait for a banner on ports a rule matches banners on
+MAX_CONNECTIONS = 256  # Connection attempts in flight at once across every host
+
+UNREACHABLE = "Host unreachable"
+UNKNOWN = "Unknown"
+
+# Classification rules, checked in order - the first rule that matches names the host.
+#   'any': [ports]        - at least one of these ports is open
+#   'all': [ports]        - every one of these ports is open
+#   'banner': (port, re)  - the port is open and its banner matches the regex (case-insensitive)
+# Conditions in one rule must all hold. Append rules here to teach the scanner new device types, e.g.
+#   {'name': 'Cisco Device', 'banner': (22, r'^SSH-[\d.]+-Cisco')},
+CLASSIFICATION_RULES = [
+    {'name': 'Windows Machine', 'any': [135, 445]},
+    {'name': 'Printer', 'any': [515, 9100]},
+    {'name': 'Voice Gateway', 'all': [1720, 5060, 5061]},
+    {'name': 'Phone/SIP Device', 'any': [5060, 5061]},
+    {'name': 'SSH Capable Device', 'any': [22]},
+]
+
+# Function to list the ports the rules need scanned, and the ones whose banners need reading
+def rule_ports(rules=CLASSIFICATION_RULES):
+    ports = set()
+    banner_ports = set()
+    for rule in rules:
+        ports.update(rule.get('any', []))
+        ports.update(rule.get('all', []))
+        if 'banner' in rule:
+            ports.add(rule['banner'][0])
+            banner_ports.add(rule['banner'][0])
+    return sorted(ports), banner_ports
+
+# Function to name a host from its open ports and banners ({port: banner text}) - the first matching rule wins
+def classify(open_ports, banners=None, rules=CLASSIFICATION_RULES):
+    banners = banners or {}
+    for rule in rules:
+        if 'any' in rule and not any(port in open_ports for port in rule['any']):
+            continue
+        if 'all' in rule and not all(port in open_ports for port in rule['all']):
+            continue
+        if 'banner' in rule:
+            port, pattern = rule['banner']
+            if port not in open_ports or not re.search(pattern, banners.get(port, ''), re.IGNORECASE):
+                continue
+        return rule['name']
+    return UNKNOWN
+
+# Function to try one port - returns 'open', 'closed' (refused, so the host is up) or 'filtered', plus any banner
+async def probe(ip, port, read_banner, limit):
+    async with limit:
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), CONNECT_TIMEOUT)
+        except ConnectionRefusedError:
+            return 'closed', ''
+        except (asyncio.TimeoutError, OSError):
+            return 'filtered', ''
+
+        banner = ''
+        if read_banner:
+            try:
+                banner = (await asyncio.wait_for(reader.read(256), BANNER_TIMEOUT)).decode('utf-8', 'replace').strip()
+            except (asyncio.TimeoutError, OSError):
+                pass
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return 'open', banner
+
+# Function to scan one host's rule ports concurrently and classify it.
+# A host where every port timed out is reported unreachable, as nmap's host discovery did.
+async def scan_host(ip, ports, banner_ports, limit, rules):
+    states = await asyncio.gather(*(probe(ip, port, port in banner_ports, limit) for port in ports))
+    if all(state == 'filtered' for state, _ in states):
+        return UNREACHABLE
+    open_ports = [port for port, (state, _) in zip(ports, states) if state == 'open']
+    banners = {port: banner for port, (state, banner) in zip(ports, states) if banner}
+    return classify(open_ports, banners, rules)
+
+async def _classify_hosts(ips, rules):
+    ports, banner_ports = rule_ports(rules)
+    limit = asyncio.Semaphore(MAX_CONNECTIONS)
+    progress = Progress("Classifying hosts", total=len(ips), unit="hosts")
+
+    async def scan(ip):
+        try:
+            result = await scan_host(ip, ports, banner_ports, limit, rules)
+        except Exception as e:
+            result = f"Scan failed: {e}"
+        progress.update(detail=ip)
+        return ip, result
+
+    results = dict(await asyncio.gather(*(scan(ip) for ip in ips)))
+    progress.close()
+    return results
+
+# Function to classify every host at once - returns {ip: classification}
+def classify_hosts(ips, rules=CLASSIFICATION_RULES):
+    ips = list(dict.fromkeys(ips))
+    if not ips:
+        return {}
+    return asyncio.run(_classify_hosts(ips, rules))
@@ -0,0 +1,43 @@
+# Description:
+"""Hash-indexed correlation of interface, switchport, MAC, neighbor and etherchannel data."""
+
+from interface_names import canonical_interface
+
+# Every index is keyed by the canonical interface name - 'GigabitEthernet1/0/1' and 'Gi1/0/1' -> 'Gi1/0/1'
+
+# Function to get a record's field - records may be dicts (TextFSM) or lists (hand-parsed rows)
+def _field(record, field):
+    try:
+        return record[field]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+# Function to index records by interface - the first record seen for an interface wins.
+# Fields holding a list of interfaces (e.g. TextFSM destination_port) index the record under each one.
+def index_first(records, field, key=canonical_interface):
+    index = {}
+    for record in records or []:
+        values = _field(record, field)
+        for value in values if isinstance(values, list) else [values]:
+            if value:
+                index.setdefault(key(value), record)
+    return index
+
+# Function to group one field of the records by interface, keeping first-seen order and dropping repeats
+def index_grouped(records, field, value_field, key=canonical_interface):
+    index = {}
+    for record in records or []:
+        value = _field(record, value_field)
+        values = _field(record, field)
+        for interface in values if isinstance(values, list) else [values]:
+            if interface:
+                # dict keys keep insertion order and make the repeat check O(1) on busy uplinks
+                index.setdefault(key(interface), {})[value] = None
+    return {interface: list(group) for interface, group in index.items()}
+
+# Function to join each interface against every index in one linear pass.
+# Yields (interface, matches) where matches maps each index name to its record for that interface (or None).
+def correlate(interfaces, field, indexes, key=canonical_interface):
+    for interface in interfaces or []:
+        interface_name = key(_field(interface, field))
+        yield interface, {name: index.get(interface_name) for name, index in indexes.items()}
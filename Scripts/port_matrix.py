@@ -5,18 +5,44 @@
 from datetime import date
 import getpass
 import json
-from netmiko import ConnectHandler
+from connect_helper import open_connection, prompt_jump_host
+from device_detect import AUTODETECT, FingerprintCache, connect_detected
 import os
-
-def send_show(target_device, command):
+from interface_names import canonical_interface
+from port_correlator import correlate, index_first, index_grouped
+from parse_cache import ParseCache
+from progress import Progress
+from snapshot_store import SnapshotStore
+from textfsm_cache import parse_output_async
+
+# Function to collect raw command output over the device's open session - parsing is done separately
+# in the TextFSM pool. A failed command returns '' so the rest of the device's commands still run.
+def send_show(connection, command):
     result = ''
     try:
-        with ConnectHandler(**target_device) as net_connect:
-            result = net_connect.send_command(command, use_textfsm=True, read_timeout=120)
+        result = connection.send_command(command, read_timeout=120)
     except Exception as e:
-        print(f"Failed to collect results for:\nCommand: {command}\nDevice: {target_device['ip']}\nType: {target_device['device_type']}\nError: {str(e)}")
+        print(f"Failed to collect results for:\nCommand: {command}\nDevice: {connection.host}\nType: {connection.device_type}\nError: {str(e)}")
     return result
 
+# Function to treat a failed/unparsed send_show result as an empty list of records
+def as_records(result):
+    return result if isinstance(result, list) else []
+
+# Function to split a running config into {short interface name: [config lines]} in one pass
+# e.g. 'interface GigabitEthernet1/0/1' is indexed as 'Gi1/0/1' to match interface['intf']
+def index_interface_config(running_config):
+    interface_configs = {}
+    block = None
+    for line in running_config.splitlines():
+        if line.startswith('interface '):
+            block = interface_configs.setdefault(canonical_interface(line[len('interface '):]), [])
+        elif block is not None and line.startswith(' '):
+            block.append(line)
+        else:
+            block = None
+    return interface_configs
+
 def main():
 
     print("#####\nPort Matrixer\n#####\n")
@@ -60,160 +86,166 @@ def main():
     username = input("Enter your username: ")
     password = getpass.getpass(prompt="Enter your password: ")
     enpass = getpass.getpass(prompt="Enter enable password: ")
+    jump_host = prompt_jump_host()
+
+    # Cached device types for inventory entries left as 'autodetect'
+    fingerprints = FingerprintCache()
 
-    # Connect to devices and execute the show commands
-    for device in devices:
-        device_type = device['device_type']
-        device_ip = device['device_IP']
-        device_name = device['name']
-        device_location = device['location']
-        filename = device_name + " - port-matrix - " + preorpost + "-" + today + ".txt"
+    # Parsed TextFSM results keyed by a hash of the raw output, so reruns skip unchanged parsing
+    parse_cache = ParseCache()
+
+    # Interface, MAC and neighbor rows also go to the shared snapshot database
+    store = SnapshotStore()
+    snapshot = store.start('port_matrix', selected_inventory.split('.json')[0])
+
+    try:
+        # Connect to devices and execute the show commands
+        for device in devices:
+            device_type = device.get('device_type', AUTODETECT)
+            device_ip = device['device_IP']
+            device_name = device['name']
+            device_location = device['location']
+            filename = device_name + " - port-matrix - " + preorpost + "-" + today + ".txt"
     
-        device_info = {
-            'device_type': device_type,
-            'ip': device_ip,
-            'username': username,
-            'password': password,
-            'secret': enpass,
-        }
-
-        interfaces = send_show(device_info, 'show interface')
-        mac_info = send_show(device_info, 'show mac address-table')
-        cdp = send_show(device_info, 'show cdp neighbor detail')
-        lldp = send_show(device_info, 'show lldp neighbor')
-        lldp_det = send_show(device_info, 'show lldp neighbor detail')
-
-        if isinstance(lldp, list):  # Check if lldp is a list
-            for nei in lldp:
-                nei['ip'] = ''
-                nei['type'] = ''
-                if 'Gi' in nei['local_interface']:
-                    _, int_num = nei['local_interface'].split('Gi')
-                    nei['local_interface'] = 'GigabitEthernet' + int_num
-                elif 'Fa' in nei['local_interface']:
-                    _, int_num = nei['local_interface'].split('Fa')
-                    nei['local_interface'] = 'FastEthernet' + int_num
-                for nei_det in lldp_det:
-                    if nei['neighbor'] == nei_det['neighbor']:
-                        nei['ip'] = nei_det['management_ip']
-                        nei['type'] = nei_det['system_description']
-
-        for interface in interfaces:
-            int_name = interface['interface']
-            interface['intf'] = ''
-            if 'TenGig' in int_name:
-                _,int_num = int_name.split('TenGigabitEthernet')
-                interface['intf'] = 'Te' + int_num
-            elif 'Gigabit' in int_name:
-                _,int_num = int_name.split('GigabitEthernet')
-                interface['intf'] = 'Gi' + int_num
-            elif 'FastEth' in int_name:
-                _,int_num = int_name.split('FastEthernet')
-                interface['intf'] = 'Fa' + int_num
-            elif 'Port-c' in int_name:
-                _,int_num = int_name.split('Port-channel')
-                interface['intf'] = 'Po' + int_num
-
-            interface['status'] = interface['link_status']
-            if interface['link_status'] == 'administratively down':
-                interface['status'] = 'admin down'
-            elif interface['link_status'] == 'up' and 'down' in interface['protocol_status']:
-                interface['status'] = 'up/down'
-
-            interface['macs'] = []
-            interface['neighbor'] = ''
-            interface['nei_ip'] = ''
-            interface['nei_type'] = ''
-            interface['nei_port'] = ''
-
-            if type(lldp) == 'list':
-                for nei in lldp:
-                    if nei['local_interface'] == interface['interface']:
-                        interface['neighbor'] = nei['neighbor']
-                        interface['nei_ip'] = nei['ip']
-                        interface['nei_type'] = nei['type']
-                        interface['nei_port'] = nei['neighbor_interface']
-
-
-            for nei in cdp:
-                if nei['local_port'] == interface['interface']:
-                    interface['neighbor'] = nei['destination_host']
-                    interface['nei_ip'] = nei['management_ip']
-                    interface['nei_type'] = nei['platform']
-                    interface['nei_port'] = nei['remote_port']
-
-        mac_ints = {}
-
-        for mac in mac_info:
-            for interface in mac['destination_port']:
-                if interface not in mac_ints:
-                    mac_ints[interface] = []
-                mac_ints[interface].append(mac['destination_address'])
-
-        etherc = send_show(device_info, 'show etherchannel summary')
-
-        for interface in interfaces:
-            macs = ''
-            int_name = interface['intf']
-            if int_name in mac_ints:
-                if len(mac_ints[int_name]) > 1:
-                    macs = ', '.join(mac_ints[int_name])
+            device_info = {
+                'device_type': device_type,
+                'ip': device_ip,
+                'username': username,
+                'password': password,
+                'secret': enpass,
+            }
+
+            # One session per device for every command, the running config included
+            try:
+                if device_type == AUTODETECT:
+                    device_type, connection = connect_detected(device_info, fingerprints, lambda detected: open_connection(dict(device_info, device_type=detected), jump_host), jump_host)
+                    device_info['device_type'] = device_type
                 else:
-                    macs = mac_ints[int_name][0]
-            interface['macs'] = macs
-
-            if 'Po' in int_name:
-                for pc in etherc:
-                    if pc['po_name'] == int_name:
-                        interface['interface'] = interface['interface'] + " (" + ','.join(pc['interfaces']) + ")"
-
-
-        try:
-            # Establish the SSH/Telnet connection and enter enable mode
-            connection = ConnectHandler(**device_info)
-
-            outfile = os.path.join(output_dir, filename)
-            file = open(outfile, "w")
-            print(f"\n########\nCollecting info for: {device_name}")
-            file.write(device_name.upper())
-            file.write("\n")
-            file.write(device_location)
-            file.write("\n\n")
-
-            int_count = len(interfaces)
-            current_int = 0
-
-            for interface in interfaces:
-                current_int += 1
-                sho_run = send_show(device_info, 'show run interface ' + interface['intf'])
-                mode = ''
-                avlan = ''
-                tvlan = ''
-                vvlan = ''
-                lines = sho_run.split('\n')
-
-                # Display results on the same line as they come in
-                print(f"\rParsing interface: ({current_int}/{int_count})", end='')
-                for line in lines:
-                    if 'switchport mode access' in line:
-                        mode = 'access'
-                    if 'switchport access vlan' in line:
-                        _,avlan = line.split('switchport access vlan ')
-                    if 'switchport mode trunk' in line:
-                        mode = 'trunk'
-                    if 'voice vlan' in line:
-                        _,vvlan = line.split('voice vlan ')
-                    if 'switchport trunk allowed' in line:
-                        if 'add' in line:
-                            _,vlans = line.split('add ')
-                            tvlan = tvlan + ',' + vlans
-                        else:
-                            _,tvlan = line.split('allowed vlan ')
-
-
-                file.write(f"{interface['interface']};{interface['media_type']};{interface['description']};{interface['status']};{interface['macs']};{mode};{avlan};{vvlan};{tvlan};{interface['neighbor']};{interface['nei_ip']};{interface['nei_type']};{interface['nei_port']}\n")
-            connection.disconnect()
-            file.close()
-
-        except Exception as e:
-            print(f"Failed to connect to {device_ip} ({device_type}): {str(e)}")
\ No newline at end of file
+                    connection = open_connection(device_info, jump_host)
+            except Exception as e:
+                print(f"Failed to connect to {device_ip} ({device_type}): {str(e)}")
+                continue
+
+            # Each output is queued for parsing as soon as it arrives, so parsing overlaps the next collection
+            commands = [
+                'show interface',
+                'show mac address-table',
+                'show cdp neighbor detail',
+                'show lldp neighbor',
+                'show lldp neighbor detail',
+                'show etherchannel summary',
+            ]
+            try:
+                parsed = [parse_output_async(device_type, command, send_show(connection, command), parse_cache) for command in commands]
+                running_config = send_show(connection, 'show running-config')
+            finally:
+                connection.disconnect()
+            interfaces, mac_info, cdp, lldp, lldp_det, etherc = (future.result() for future in parsed)
+
+            # Build interface-keyed indexes once so every interface is joined in a single pass
+            lldp_details = index_first(as_records(lldp_det), 'neighbor', key=str)
+            for nei in as_records(lldp):
+                detail = lldp_details.get(nei['neighbor'], {})
+                nei['ip'] = detail.get('management_ip', '')
+                nei['type'] = detail.get('system_description', '')
+
+            indexes = {
+                'lldp': index_first(as_records(lldp), 'local_interface'),
+                'cdp': index_first(as_records(cdp), 'local_port'),
+                'macs': index_grouped(as_records(mac_info), 'destination_port', 'destination_address'),
+                'etherchannel': index_first(as_records(etherc), 'po_name'),
+            }
+
+            for interface, match in correlate(as_records(interfaces), 'interface', indexes):
+                interface['intf'] = canonical_interface(interface['interface'])
+
+                interface['status'] = interface['link_status']
+                if interface['link_status'] == 'administratively down':
+                    interface['status'] = 'admin down'
+                elif interface['link_status'] == 'up' and 'down' in interface['protocol_status']:
+                    interface['status'] = 'up/down'
+
+                interface['neighbor'] = ''
+                interface['nei_ip'] = ''
+                interface['nei_type'] = ''
+                interface['nei_port'] = ''
+                interface['nei_protocol'] = ''
+
+                # LLDP first, then CDP wins where both see a neighbor
+                if match['lldp']:
+                    interface['neighbor'] = match['lldp']['neighbor']
+                    interface['nei_ip'] = match['lldp']['ip']
+                    interface['nei_type'] = match['lldp']['type']
+                    interface['nei_port'] = match['lldp']['neighbor_interface']
+                    interface['nei_protocol'] = 'lldp'
+                if match['cdp']:
+                    interface['neighbor'] = match['cdp']['destination_host']
+                    interface['nei_ip'] = match['cdp']['management_ip']
+                    interface['nei_type'] = match['cdp']['platform']
+                    interface['nei_port'] = match['cdp']['remote_port']
+                    interface['nei_protocol'] = 'cdp'
+
+                interface['macs'] = ', '.join(match['macs'] or [])
+
+                if match['etherchannel'] and interface['intf'].startswith('Po'):
+                    interface['interface'] = interface['interface'] + " (" + ','.join(match['etherchannel']['interfaces']) + ")"
+
+            try:
+                # The running config is indexed once for every interface
+                interface_configs = index_interface_config(running_config)
+
+                outfile = os.path.join(output_dir, filename)
+                file = open(outfile, "w")
+                print(f"\n########\nCollecting info for: {device_name}")
+                file.write(device_name.upper())
+                file.write("\n")
+                file.write(device_location)
+                file.write("\n\n")
+
+                progress = Progress("Parsing interfaces", total=len(as_records(interfaces)), unit="interfaces")
+
+                for interface in as_records(interfaces):
+                    progress.update()
+                    mode = ''
+                    avlan = ''
+                    tvlan = ''
+                    vvlan = ''
+                    lines = interface_configs.get(interface['intf'], [])
+
+                    for line in lines:
+                        if 'switchport mode access' in line:
+                            mode = 'access'
+                        if 'switchport access vlan' in line:
+                            _,avlan = line.split('switchport access vlan ')
+                        if 'switchport mode trunk' in line:
+                            mode = 'trunk'
+                        if 'voice vlan' in line:
+                            _,vvlan = line.split('voice vlan ')
+                        if 'switchport trunk allowed' in line:
+                            if 'add' in line:
+                                _,vlans = line.split('add ')
+                                tvlan = tvlan + ',' + vlans
+                            else:
+                                _,tvlan = line.split('allowed vlan ')
+
+
+                    file.write(f"{interface['interface']};{interface['media_type']};{interface['description']};{interface['status']};{interface['macs']};{mode};{avlan};{vvlan};{tvlan};{interface['neighbor']};{interface['nei_ip']};{interface['nei_type']};{interface['nei_port']}\n")
+
+                    device = {'device_ip': device_ip, 'hostname': device_name, 'interface': interface['interface']}
+                    snapshot.add('interfaces', dict(device, description=interface['description'], status=interface['status'], media=interface['media_type'], mode=mode, access_vlan=avlan, voice_vlan=vvlan, trunk_vlans=tvlan))
+                    for mac in filter(None, interface['macs'].split(', ')):
+                        snapshot.add('mac_entries', dict(device, mac=mac))
+                    if interface['neighbor']:
+                        snapshot.add('neighbors', dict(device, protocol=interface['nei_protocol'], neighbor=interface['neighbor'], neighbor_ip=interface['nei_ip'], platform=interface['nei_type'], neighbor_interface=interface['nei_port']))
+                progress.close()
+                file.close()
+
+            except Exception as e:
+                print(f"Failed to build the port matrix for {device_ip} ({device_type}): {str(e)}")
+
+        fingerprints.save()
+    finally:
+        snapshot.finish()
+        store.close()
+        if jump_host is not None:
+            jump_host.close()
\ No newline at end of file
@@ -5,16 +5,332 @@
 from datetime import date
 import getpass
 import json
-from netmiko import ConnectHandler
+from capture_store import CaptureStore, run_offline
+from connect_helper import open_connection, prompt_jump_host
+from device_detect import AUTODETECT, FingerprintCache, connect_detected
 import pandas as pd
 import os
+from interface_names import canonical_interface
+from parquet_export import DatasetWriter, prompt_dataset_export
+from parse_cache import ParseCache, shared_cache
+from progress import Progress
+from report_writer import ReportWriter
+from snapshot_store import SnapshotStore
+from table_parser import parse_fixed_width, table_rows
 import re
-import xlsxwriter
+from timing_profiles import TimingProfiles
+
+# Bump when any parser below changes the shape of its rows, so cached parse results are not reused
+PARSER_VERSION = '2'
+
+# Commands collected from every device, in collection order
+PORT_MATRIX_COMMANDS = [
+    "show interfaces status",
+    "show interfaces description",
+    "show interfaces switchport",
+    "show cdp neighbor detail",
+    "show lldp neighbors detail",
+    "show mac address-table",
+]
+
+# Neighbor table columns, in the order parse_cdp_detail / parse_lldp_detail emit them
+CDP_COLUMNS = ["Interface", "CDP Neighbor Name", "CDP Neighbor IP", "CDP Neighbor Platform", "CDP Neighbor Interface"]
+LLDP_COLUMNS = ["Interface", "LLDP Neighbor Name", "LLDP Neighbor IP", "LLDP Neighbor System", "LLDP Neighbor Interface"]
+
+# Port matrix sheet columns - one row per interface from 'show interfaces description'
+PORT_MATRIX_COLUMNS = [
+    "Interface", "Description", "Media", "Status",
+    "Admin Mode", "Access VLAN", "Native VLAN", "Voice VLAN", "Trunked VLANs",
+    "MAC Address",
+    "CDP Neighbor Name", "CDP Neighbor IP", "CDP Neighbor Platform", "CDP Neighbor Interface",
+    "LLDP Neighbor Name", "LLDP Neighbor IP", "LLDP Neighbor System", "LLDP Neighbor Interface",
+]
+
+# Parquet dataset columns - the port matrix plus the device each row came from
+PORT_MATRIX_DATASET_COLUMNS = ["Hostname", "Device IP"] + PORT_MATRIX_COLUMNS
+
+# 'show interfaces switchport' labels kept for the port matrix, and the column each one fills
+SWITCHPORT_FIELDS = {
+    'Name': 'Interface',
+    'Administrative Mode': 'Admin Mode',
+    'Access Mode VLAN': 'Access VLAN',
+    'Trunking Native Mode VLAN': 'Native VLAN',
+    'Voice VLAN': 'Voice VLAN',
+    'Trunking VLANs Enabled': 'Trunked VLANs',
+}
+SWITCHPORT_LINE = re.compile(r'(' + '|'.join(map(re.escape, SWITCHPORT_FIELDS)) + r'):\s*(.*)')
+
+# Function to parse 'show interfaces switchport' in one pass into columns: {column: [value per interface]}.
+# Every 'Name:' line opens a new record; a trunk VLAN list ending in ',' continues on the following line(s).
+def parse_switchport(output):
+    table = {column: [] for column in SWITCHPORT_FIELDS.values()}
+    trunk_vlans = table['Trunked VLANs']
+    continuing = False
+    for line in output.splitlines():
+        if continuing:
+            words = line.split()
+            if words:
+                trunk_vlans[-1] += words[0]
+            continuing = bool(words) and trunk_vlans[-1].endswith(',')
+            continue
+
+        match = SWITCHPORT_LINE.match(line)
+        if not match:
+            continue
+        label, value = match.groups()
+        if label == 'Name':
+            for column in table.values():
+                column.append(None)
+        elif not trunk_vlans:
+            continue  # Field before the first 'Name:' line
+
+        words = value.split()
+        if not words:
+            continue
+        if label == 'Administrative Mode':
+            table['Admin Mode'][-1] = ' '.join(words)
+        else:
+            # VLAN fields carry the name after the number, e.g. '1 (default)' - keep the number
+            table[SWITCHPORT_FIELDS[label]][-1] = words[0]
+            continuing = label == 'Trunking VLANs Enabled' and words[0].endswith(',')
+    return table
+
+# Function to parse 'show interfaces description' into columns {Interface, Description}, skipping VLAN interfaces.
+# Column spans come from the header line.
+def parse_interface_description(output):
+    table = parse_fixed_width(output, ["Interface", "Status", "Protocol", "Description"])
+    rows = [row for row in table_rows(table, ["Interface", "Description"]) if not row[0].startswith("Vl")]
+    return {"Interface": [row[0] for row in rows], "Description": [row[1] for row in rows]}
+
+# Function to parse 'show interfaces status' into columns {Interface, Media (Type), Status}
+def parse_interface_status(output):
+    table = parse_fixed_width(output, ["Port", "Name", "Status", "Vlan", "Duplex", "Speed", "Type"])
+    return {"Interface": table["Port"], "Media": table["Type"], "Status": table["Status"]}
+
+# Function to parse 'show cdp neighbor detail' into [local interface, device ID, IP, platform, remote interface] rows
+def parse_cdp_detail(output):
+    cdp_neighbor_lines = output.strip().splitlines()
+    cdp_neighbor_data = []
+    progress = Progress("Parsing CDP neighbor details", total=len(cdp_neighbor_lines), unit="lines")
+    ip_address = None  # Initialize ip_address outside the loop
+    local_interface = None
+    remote_interface = None
+    device_id = None
+    platform = None
+
+    for line in cdp_neighbor_lines:
+        progress.update()
+        if line.startswith("Device ID:"):
+            if local_interface is not None:
+                # Append the previous data before resetting
+                cdp_neighbor_data.append([local_interface, device_id, ip_address, platform, remote_interface])
+            device_id = line.split(":")[1].strip()
+            ip_address = None
+            platform = None
+            remote_interface = None
+        elif line.startswith("  IP address:"):
+            ip_address = line.split(":")[1].strip()
+        elif line.startswith("Interface:"):
+            local_interface = canonical_interface(line.split()[1])
+            remote_interface = line.split()[6]
+        elif line.startswith("Platform:"):
+            platform_str = line.split()[1:]
+            platform_comma = ' '.join(platform_str).find(",")
+            if platform_comma != -1:
+                platform = ' '.join(platform_str)[0:platform_comma]
+            else:
+                platform = ' '.join(platform_str)[0:]
+
+    # Append the last set of data
+    if local_interface is not None:
+        cdp_neighbor_data.append([local_interface, device_id, ip_address, platform, remote_interface])
+
+    progress.close()
+    return cdp_neighbor_data
+
+# Function to parse 'show lldp neighbors detail' into [local interface, system name, IP, description, remote interface] rows
+def parse_lldp_detail(output):
+    lldp_neighbor_lines = output.strip().splitlines()
+    lldp_neighbor_data = []
+    progress = Progress("Parsing LLDP neighbor details", total=len(lldp_neighbor_lines), unit="lines")
+    local_interface = None
+    remote_interface = None
+    system_name = None
+    ip_address = None
+    system_description = None
+    processing_description = False
+
+    for line in lldp_neighbor_lines:
+        progress.update()
+        if line.startswith("Local Intf:"):
+            if local_interface is not None:
+                # Append the previous data before resetting
+                lldp_neighbor_data.append([local_interface, system_name, ip_address, system_description, remote_interface])
+            local_interface = line.split(":")[1].strip()
+            remote_interface = None
+            system_name = None
+            ip_address = None
+            system_description = None
+        elif line.startswith("Port id:"):
+            remote_interface = line.split(":")[1].strip()
+        elif line.startswith("System Name:"):
+            system_name = line.split(":")[1].strip()
+        elif line.startswith("    IP:"):
+            ip_address = line.split(":")[1].strip()
+        elif line.startswith("System Description:"):
+            processing_description = True
+        elif processing_description:
+            system_description = line.strip()
+            processing_description = False
+
+    # Append the last set of data
+    if local_interface is not None:
+        lldp_neighbor_data.append([local_interface, system_name, ip_address, system_description, remote_interface])
+
+    progress.close()
+    return lldp_neighbor_data
+
+# Function to parse 'show mac address-table' into columns {Interface, MAC Address} for numbered VLANs only
+def parse_mac_address_table(output):
+    table = parse_fixed_width(output, ["Vlan", "Mac Address", "Type", "Ports"])
+    rows = [
+        (port, mac) for vlan, mac, port in table_rows(table, ["Vlan", "Mac Address", "Ports"])
+        if vlan[:1].isdigit() and mac
+    ]
+    return {"Interface": [row[0] for row in rows], "MAC Address": [row[1] for row in rows]}
+
+# Function to key a parsed table by canonical interface name, as a categorical sharing the matrix's categories.
+# Rows for interfaces that aren't in the matrix (e.g. Vlan/CPU entries) fall out here, before any join.
+def keyed_frame(frame, categories):
+    keys = pd.Categorical(frame.pop("Interface").map(canonical_interface), categories=categories)
+    return frame.set_index(pd.CategoricalIndex(keys, name="Key"))[keys.notna()]
+
+# Function to parse one device's raw outputs ({command: output}) and join them into its port matrix frame.
+# Results are reused from the parse cache when the raw output is unchanged.
+def build_port_matrix(device_type, outputs, parse_cache):
+    def parse(command, parser):
+        return parse_cache.cached(command, device_type, PARSER_VERSION, outputs.get(command) or '', parser)
+
+    # One row per interface from 'show interfaces description'; every other table joins onto its key
+    matrix = pd.DataFrame(parse("show interfaces description", parse_interface_description))
+    matrix_keys = matrix["Interface"].map(canonical_interface)
+    categories = pd.Index(matrix_keys.unique())
+    matrix = matrix.set_index(pd.CategoricalIndex(matrix_keys, categories=categories, name="Key"))
+
+    # First row per interface wins, as on the device
+    tables = [
+        pd.DataFrame(parse("show interfaces status", parse_interface_status)),
+        pd.DataFrame(parse("show interfaces switchport", parse_switchport)),
+        pd.DataFrame(parse("show cdp neighbor detail", parse_cdp_detail), columns=CDP_COLUMNS),
+        pd.DataFrame(parse("show lldp neighbors detail", parse_lldp_detail), columns=LLDP_COLUMNS),
+    ]
+    tables = [keyed_frame(table, categories) for table in tables]
+    tables = [table[~table.index.duplicated()] for table in tables]
+
+    # MACs per interface - repeats dropped, then joined in first-seen order within each group
+    macs = keyed_frame(pd.DataFrame(parse("show mac address-table", parse_mac_address_table)), categories)
+    macs = macs.reset_index().drop_duplicates()
+    macs = macs.groupby("Key", observed=True, sort=False)["MAC Address"].agg(",".join).to_frame()
+
+    # Single join pass on the shared categorical key
+    merged_df = matrix.join(tables + [macs], how="left")
+    return merged_df.reset_index(drop=True).reindex(columns=PORT_MATRIX_COLUMNS)
+
+# Function run in a worker process for offline mode - rebuilds one device's frame from its captures
+def offline_device(capture):
+    capture_root, device_ip = capture
+    captures = CaptureStore(capture_root)
+    manifest = captures.manifest(device_ip)
+    outputs = {command: captures.load(device_ip, command) for command in PORT_MATRIX_COMMANDS}
+    merged_df = build_port_matrix(manifest.get('device_type', 'cisco_ios'), outputs, shared_cache())
+    return manifest.get('hostname', 'Undefined'), merged_df, device_ip
+
+# Function to open the port matrix workbook with its linked Index sheet up front
+def open_port_matrix_report(excel_file_path):
+    print(f'Exporting to {excel_file_path}')
+    report = ReportWriter(excel_file_path)
+    index_sheet = report.add_sheet("Index", ["Devices"])
+    index_sheet.worksheet.hide_gridlines(2)  # Hide gridlines and headings in the index worksheet
+    return report, index_sheet
+
+# Function to write one device's sheet as soon as its frame is built, and link it from the index.
+# With a DatasetWriter, the same rows are appended to the port_matrix Parquet dataset.
+def write_device_sheet(report, index_sheet, prompt, merged_df, device_ip, dataset=None):
+    sheet = report.add_sheet(f"{prompt}_{device_ip}", PORT_MATRIX_COLUMNS, title=f"Device: {prompt} - IP: {device_ip}", header_row=2)
+    sheet.write_frame(merged_df)
+    sheet.close()
+    index_sheet.write_link(sheet.name)
+    if dataset is not None:
+        dataset.write_frame(merged_df.assign(**{"Hostname": prompt, "Device IP": device_ip}))
+
+# Function to add one device's port matrix to a snapshot - interface, MAC and CDP/LLDP neighbor rows
+def add_to_snapshot(snapshot, hostname, device_ip, merged_df):
+    device = {'device_ip': device_ip, 'hostname': hostname}
+    for row in merged_df.to_dict('records'):
+        interface = row['Interface']
+        snapshot.add('interfaces', dict(device,
+            interface=interface, description=row['Description'], status=row['Status'], media=row['Media'],
+            mode=row['Admin Mode'], access_vlan=row['Access VLAN'], voice_vlan=row['Voice VLAN'], trunk_vlans=row['Trunked VLANs'],
+        ))
+        if isinstance(row['MAC Address'], str):
+            for mac in row['MAC Address'].split(','):
+                snapshot.add('mac_entries', dict(device, interface=interface, mac=mac))
+        for protocol in ('CDP', 'LLDP'):
+            system = 'Platform' if protocol == 'CDP' else 'System'
+            if isinstance(row[f'{protocol} Neighbor Name'], str):
+                snapshot.add('neighbors', dict(device,
+                    interface=interface, protocol=protocol.lower(), neighbor=row[f'{protocol} Neighbor Name'],
+                    neighbor_ip=row[f'{protocol} Neighbor IP'], platform=row[f'{protocol} Neighbor {system}'],
+                    neighbor_interface=row[f'{protocol} Neighbor Interface'],
+                ))
+
+# Function to open the port_matrix dataset partition for an inventory (site) and day
+def open_port_matrix_dataset(inventory_name, day=None):
+    return DatasetWriter("port_matrix", inventory_name, PORT_MATRIX_DATASET_COLUMNS, day=day)
+
+# Function to regenerate the port matrix from a capture directory - no device access needed.
+# Every device is parsed and joined in its own process, then the workbook is written once.
+def reprocess_captures():
+    today = date.isoformat(date.today())
+    capture_root = input("Enter the capture directory (e.g. Output\\<inventory>\\<job>\\Captures): ").strip().strip('"')
+    if not os.path.isdir(capture_root):
+        print(f"Capture directory not found: {capture_root}")
+        return
+
+    captures = CaptureStore(capture_root)
+    device_ips = captures.devices()
+    if not device_ips:
+        print(f"No captured devices found in {capture_root}")
+        return
+
+    # Rows land in the partition for the day they were captured, not the day they were reprocessed
+    dataset = None
+    if prompt_dataset_export():
+        dataset = open_port_matrix_dataset(captures.name, captures.run.get('created', '')[:10] or None)
+
+    # Each device's sheet is written as soon as its worker finishes
+    output_dir = os.path.dirname(os.path.normpath(capture_root))
+    report, index_sheet = open_port_matrix_report(os.path.join(output_dir, f"{captures.name}_port-matrix_{today}_offline.xlsx"))
+    with report:
+        for (_, device_ip), result, error in run_offline(offline_device, [(capture_root, device_ip) for device_ip in device_ips]):
+            if error is not None:
+                print(f'Unable to reprocess: {device_ip}\nError: {error}')
+                continue
+            write_device_sheet(report, index_sheet, *result, dataset=dataset)
+        index_sheet.close()
+    if dataset is not None:
+        dataset.close()
 
 def main():
 
     print("#####\nPort Matrixer v2\n#####\n")
 
+    # Offline mode rebuilds the workbook from a previous run's raw captures
+    mode = input("Collect live or reprocess captured output? [type live or offline]: ").strip().lower()
+    if mode == 'offline':
+        reprocess_captures()
+        return
+
     today = date.isoformat(date.today())
 
     # List available JSON inventory files in the 'Inventories' directory
@@ -49,6 +365,8 @@ def main():
     preorpost = input("Discovery, Pre-change, or post-change? [type disc, pre, or post]: ")
     username = input("Enter your username: ")
     password = getpass.getpass(prompt="Enter your password: ")
+    jump_host = prompt_jump_host()
+    dataset = open_port_matrix_dataset(inventory_name) if prompt_dataset_export() else None
 
     # Create the "Output" directory if it doesn't exist
     job_folder = preorpost + " - " + today
@@ -61,330 +379,96 @@ def main():
     joblog_out = os.path.join(output_dir, joblog)
     joblog_data = {'Success': [], 'Error': []}
 
-    # List to store dataframes for each device
-    device_dfs = []
-
-    # Connect to devices and execute the show commands
-    for device in devices:
-        prompt = 'Undefined'
-        device_type = device['device_type']
-        device_ip = device['device_IP']
-
-        device_info = {
-            'device_type': device_type,
-            'ip': device_ip,
-            'username': username,
-            'password': password,
-            #uncomment below for slower old gear like HP Comware
-            #'global_delay_factor': 60,
-        }
-
-        # Connect to the switch
-        try:
-            connection = ConnectHandler(**device_info)
-            #connection.enable()
-            # Execute show commands
-            prompt = connection.find_prompt().strip("#<>[]")
-            print(f'\nConnected to {prompt} [{device_ip}]\n')
-            print('Collecting "show interfaces status"...')
-            show_interfaces_status = connection.send_command("show interfaces status")
-            print('Collecting "show interfaces description"...')
-            show_interfaces_desc = connection.send_command("show interfaces description")
-            print('Collecting "show interfaces switchport"...')
-            show_interfaces_switchport = connection.send_command("show interfaces switchport")
-            print('Collecting "show cdp neighbor detail"...')
-            show_cdp_neighbor_detail = connection.send_command("show cdp neighbor detail")
-            print('Collecting "show lldp neighbors detail"...')
-            show_lldp_neighbors_detail = connection.send_command("show lldp neighbors detail")
-            print('Collecting "show mac address-table"...')
-            show_mac_address_table = connection.send_command("show mac address-table")
-
-            # Parse show interfaces description output
-            interface_desc_lines = show_interfaces_desc.strip().splitlines()
-            interface_desc_data = []
-            for line in interface_desc_lines[1:]:
-                interface = line.split()[0]
-                if not interface.startswith("Vl"):
-                    desc = line[55:].strip()
-                    interface_desc_data.append([interface, desc])
-
-            # Convert the description data into a DataFrame
-            interface_desc_df = pd.DataFrame(interface_desc_data, columns=["Interface", "Description"])
-
-            # Parse show interfaces status output
-            interface_status_lines = show_interfaces_status.strip().splitlines()
-            interface_status_data = []
-            for line in interface_status_lines[1:]:
-                if len(line.split()[0].strip()) < 6:
-                    interface = line[:6].strip()
-                    media = line[67:].strip()
-                    status = line[29:43].strip()
-                elif len(line.split()[0].strip()) < 9:
-                    interface = line[:9].strip()
-                    media = line[70:].strip()
-                    status = line[32:45].strip()
-                elif len(line.split()[0].strip()) < 13:
-                    interface = line[:12].strip()
-                    media = line[72:].strip()
-                    status = line[34:47].strip()
-                interface_status_data.append([interface, media, status])
-
-            # Convert the status data into a DataFrame
-            interface_status_df = pd.DataFrame(interface_status_data, columns=["Interface", "Media", "Status"])
-
-            # Merge the status DataFrame with the description DataFrame
-            interface_data_df = pd.merge(interface_desc_df, interface_status_df, on="Interface", how="left")
-
-            # Parse show interfaces switchport output
-            switchport_lines = show_interfaces_switchport.strip().split("\n\n")
-            switchport_data = []
-            for section in switchport_lines:
-                lines = section.strip().splitlines()
-                interface = None
-                admin_status = None
-                admin_mode = None
-                access_vlan = None
-                access_vlan_name = None
-                native_vlan = None
-                native_vlan_name = None
-                voice_vlan = None
-                voice_vlan_name = None
-                trunk_vlans = None
-                trunk_vlans_list = None
-                idx = 0
-
-                for idx, line in enumerate(lines):
-                    print(f'\rParsing switchport info...', end='', flush=True)
-                    if line.startswith("Name:"):
-                        interface = line.split()[1]
-                    #elif line.startswith("Switchport:"):
-                    #    admin_status = line.split()[1:]
-                    elif line.startswith("Administrative Mode:"):
-                        admin_mode = " ".join(line.split()[2:])
-                    elif line.startswith("Access Mode VLAN:"):
-                        access_vlan = line.split()[3]
-                        #access_vlan_name = line.split()[4].strip("()")
-                    elif line.startswith("Trunking Native Mode VLAN:"):
-                        native_vlan = line.split()[4]
-                        #if len(line.split()) > 5:
-                        #    native_vlan_name = line.split()[5].strip("()")
-                    elif line.startswith("Voice VLAN:"):
-                        voice_vlan = line.split()[2]
-                        #if voice_vlan != "none":
-                        #    voice_vlan_name = line.split()[3].strip("()")
-                        #else:
-                        #    voice_vlan_name = "none"
-                    elif line.startswith("Trunking VLANs Enabled:"):
-                        # Add the VLANs from the current line
-                        trunk_vlans_list = line.split()[3]
-                        # Check for continuation line
-                        if trunk_vlans_list.endswith(",") and idx + 1 < len(lines):
-                            next_line = idx + 1
-                            trunk_vlans_list += lines[next_line].split()[0]  # Concatenate the VLANs from the next line
-                        # Use the concatenated string as the trunk_vlans
-                        trunk_vlans = trunk_vlans_list
-
-                switchport_data.append([
-                    #interface, admin_status, admin_mode, access_vlan, access_vlan_name, native_vlan, native_vlan_name, voice_vlan, voice_vlan_name, trunk_vlans
-                    interface, admin_mode, access_vlan, native_vlan, voice_vlan, trunk_vlans
-                ])
-
-            print('\nSwitchport info parsed!')
-            switchport_df = pd.DataFrame(switchport_data, columns=[
-                "Interface", "Admin Mode", "Access VLAN", "Native VLAN", "Voice VLAN", "Trunked VLANs"
-            ])
-
-            # Parse show cdp neighbor detail output
-            cdp_neighbor_lines = show_cdp_neighbor_detail.strip().splitlines()
-            cdp_neighbor_data = []
-            cdp_total_lines = len(cdp_neighbor_lines)
-            cdp_current_line = 0
-            ip_address = None  # Initialize ip_address outside the loop
-            local_interface = None
-            remote_interface = None
-            device_id = None
-            platform = None
-            
-            for line in cdp_neighbor_lines:
-                cdp_current_line += 1
-                print(f'\rParsing CDP neighbor details - Line {cdp_current_line} of {cdp_total_lines}', end='', flush=True)
-                if line.startswith("Device ID:"):
-                    if local_interface is not None:
-                        # Append the previous data before resetting
-                        cdp_neighbor_data.append([local_interface, device_id, ip_address, platform, remote_interface])
-                    device_id = line.split(":")[1].strip()
-                    ip_address = None
-                    platform = None
-                    remote_interface = None
-                elif line.startswith("  IP address:"):
-                    ip_address = line.split(":")[1].strip()
-                elif line.startswith("Interface:"):
-                    local_interface_str = line.split()[1]
-                    comma_index = local_interface_str.find(",")
-                    if local_interface_str.startswith("GigabitEthernet"):
-                        if comma_index != -1:
-                            local_interface = "Gi" + local_interface_str[15:comma_index]
-                        else:
-                            local_interface = "Gi" + local_interface_str[15:]
-                    elif local_interface_str.startswith("TenGigabitEthernet"):
-                        if comma_index != -1:
-                            local_interface = "Te" + local_interface_str[18:comma_index]
-                        else:
-                            local_interface = "Te" + local_interface_str[18:]
-                    remote_interface = line.split()[6]
-                elif line.startswith("Platform:"):
-                    platform_str = line.split()[1:]
-                    platform_comma = ' '.join(platform_str).find(",")
-                    if platform_comma != -1:
-                        platform = ' '.join(platform_str)[0:platform_comma]
-                    else:
-                        platform = ' '.join(platform_str)[0:]
-                    
-            # Append the last set of data
-            if local_interface is not None:
-                cdp_neighbor_data.append([local_interface, device_id, ip_address, platform, remote_interface])
-
-            print('\nCDP Parsed!')
-            cdp_neighbor_df = pd.DataFrame(cdp_neighbor_data, columns=["Interface", "CDP Neighbor Name", "CDP Neighbor IP", "CDP Neighbor Platform", "CDP Neighbor Interface"])
+    # Workbook is written device by device as each one finishes
+    report, index_sheet = open_port_matrix_report(os.path.join(output_dir, f"{inventory_name}_port-matrix_{today}.xlsx"))
 
-            # Parse show lldp neighbors detail output
-            lldp_neighbor_lines = show_lldp_neighbors_detail.strip().splitlines()
-            lldp_neighbor_data = []
-            lldp_total_lines = len(lldp_neighbor_lines)
-            lldp_current_line = 0
-            local_interface = None
-            remote_interface = None
-            system_name = None
-            ip_address = None
-            system_description = None
-            processing_description = False
+    # Learned per-device delay factors and read timeouts from previous runs
+    timing = TimingProfiles()
 
-            for line in lldp_neighbor_lines:
-                lldp_current_line += 1
-                print(f'\rParsing LLDP neighbor details - Line {lldp_current_line} of {lldp_total_lines}', end='', flush=True)
-                if line.startswith("Local Intf:"):
-                    if local_interface is not None:
-                        # Append the previous data before resetting
-                        lldp_neighbor_data.append([local_interface, system_name, ip_address, system_description, remote_interface])
-                    local_interface = line.split(":")[1].strip()
-                    remote_interface = None
-                    system_name = None
-                    ip_address = None
-                    system_description = None
-                elif line.startswith("Port id:"):
-                    remote_interface = line.split(":")[1].strip()
-                elif line.startswith("System Name:"):
-                    system_name = line.split(":")[1].strip()
-                elif line.startswith("    IP:"):
-                    ip_address = line.split(":")[1].strip()
-                elif line.startswith("System Description:"):
-                    processing_description = True
-                elif processing_description:
-                    system_description = line.strip()
-                    processing_description = False
-
-            # Append the last set of data
-            if local_interface is not None:
-                lldp_neighbor_data.append([local_interface, system_name, ip_address, system_description, remote_interface])
+    # Cached device types for inventory entries left as 'autodetect'
+    fingerprints = FingerprintCache()
 
-            print('\nLLDP Parsed!')
-            lldp_neighbor_df = pd.DataFrame(lldp_neighbor_data, columns=["Interface", "LLDP Neighbor Name", "LLDP Neighbor IP", "LLDP Neighbor System", "LLDP Neighbor Interface"])
-
-            # Parse show mac address-table output
-            mac_address_lines = show_mac_address_table.strip().splitlines()
-            print(f'Parsing MAC table')
-            mac_address_data = [line.split()[:4] for line in mac_address_lines[1:]]
-            print('Adding MAC table to dataframe')
-            mac_address_df = pd.DataFrame(mac_address_data, columns=["VLAN", "MAC Address", "Type", "Interface"])
-
-            # Drop the 'Type' column and filter dashes from the 'VLAN' column
-            print('Dropping "Type" column from MAC table dataframe')
-            mac_address_df = mac_address_df.drop("Type", axis=1)
-            mac_address_df = mac_address_df[mac_address_df["VLAN"] != "-------------------------------------------"]
-
-            # Remove duplicate MAC addresses within each VLAN
-            print('Removing duplicate MAC addresses within each VLAN')
-            mac_address_df = mac_address_df.drop_duplicates(subset=["VLAN", "MAC Address"])
-
-            # Replace None and empty strings with a placeholder value
-            mac_address_df["MAC Address"] = mac_address_df["MAC Address"].fillna("None")
-            mac_address_df["MAC Address"] = mac_address_df["MAC Address"].replace("", "None")
-
-            # Group MAC addresses by Interface and concatenate them into a comma-delimited string
-            print('Grouping MACs by Interface')
-            mac_address_grouped = mac_address_df.groupby("Interface")["MAC Address"].apply(lambda x: ",".join(x)).reset_index()
-
-            # Merge the grouped MAC addresses back to the original DataFrame
-            print('Merging grouped MACs by Interface back into the dataframe')
-            mac_address_df = mac_address_df.merge(mac_address_grouped, on="Interface", how="left")
-
-            # Rename the column to "MAC Addresses"
-            print('Renaming column to "MAC Addresses"')
-            mac_address_df = mac_address_df.rename(columns={"MAC Address": "MAC Addresses"})
-
-            # Merge dataframes
-            print('Merging Dataframe')
-            merged_df = interface_data_df.merge(switchport_df, on="Interface", how="left")
-            merged_df = merged_df.merge(mac_address_grouped, on="Interface", how="left")
-            merged_df = merged_df.merge(cdp_neighbor_df.groupby("Interface").first().reset_index(), on="Interface", how="left")
-            merged_df = merged_df.merge(lldp_neighbor_df.groupby("Interface").first().reset_index(), on="Interface", how="left")
-
-            # Append dataframe to list
-            print('Appending Dataframe to list')
-            device_dfs.append((prompt, merged_df, device_ip))
-
-        except Exception as e:
-            print(f'Unknown exception with: {device_ip}\nError: {e}')
-            joblog_data['Error'].append({'device_ip': device_ip, 'device_type': device_type, 'error': str(e)})
-            
-        finally:
-            connection.disconnect()
-            print(f'\nCompleted processing on: {prompt} [{device_ip}].')
+    # Parsed results keyed by a hash of the raw output, so reruns skip unchanged parsing
+    parse_cache = ParseCache()
 
-    # Save to Excel with multiple sheets
-    excel_file_path = os.path.join(output_dir, f"{inventory_name}_port-matrix_{today}.xlsx")
-    print(f'Exporting to {excel_file_path}')
-    with pd.ExcelWriter(excel_file_path, engine='xlsxwriter') as writer:
-        workbook = writer.book
-        index_worksheet = workbook.add_worksheet("Index")  # Create the index worksheet
-        index_worksheet.write('A1', 'Devices', workbook.add_format({'bold': True}))
-
-        # Write worksheet names and create clickable links
-        for idx, (prompt, df, device_ip) in enumerate(device_dfs, start=2):  # Unpack the tuple
-            sheet_name = f"{prompt}_{device_ip}"  # Create the sheet name with prompt and device_ip
-            df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=2)  # Start writing from row 3
-            worksheet = writer.sheets[sheet_name]  # Get the worksheet object
-            merge_format = workbook.add_format({'bold': True, 'font_size': 14, 'align': 'center', 'valign': 'vcenter'})
-            worksheet.merge_range('B1:D1', f"Device: {prompt} - IP: {device_ip}", merge_format)  # Merge and center heading in first two columns
-            worksheet.set_row(2, 15)  # Add a blank row after the heading
-
-            # Automatically adjust column widths based on content
-            for i, width in enumerate(get_col_widths(df)):
-                worksheet.set_column(i, i, width)
-
-            # Add entry to the index worksheet
-            cell_ref = xlsxwriter.utility.xl_rowcol_to_cell(idx, 0)
-            link = f'internal:{sheet_name}!A1'  # Internal link to A1 cell of the worksheet
-            index_worksheet.write_url(cell_ref, link, string=sheet_name)
-            
-            # Freeze the top 3 rows
-            worksheet.freeze_panes(3, 0)
+    # Raw per-command output is kept under the job folder for offline reprocessing
+    captures = CaptureStore(os.path.join(output_dir, 'Captures'), name=inventory_name)
 
-        # Set up the index worksheet
-        index_worksheet.set_column('A:A', 30)  # Set the column width for worksheet names
-        index_worksheet.freeze_panes(1, 0)  # Freeze the top row
+    # Interface, MAC and neighbor rows also go to the shared snapshot database
+    store = SnapshotStore()
+    snapshot = store.start('port_matrix_v2', inventory_name)
 
-        # Hide gridlines and headings in the index worksheet
-        index_worksheet.hide_gridlines(2)
+    try:
+        # Connect to devices and execute the show commands
+        try:
+            for device in devices:
+                prompt = 'Undefined'
+                connection = None
+                device_type = device.get('device_type', AUTODETECT)
+                device_ip = device['device_IP']
+
+                device_info = {
+                    'device_type': device_type,
+                    'ip': device_ip,
+                    'username': username,
+                    'password': password,
+                }
+
+                # Connect to the switch
+                try:
+                    if device_type == AUTODETECT:
+                        device_type, connection = connect_detected(device_info, fingerprints, lambda detected: open_connection(dict(device_info, device_type=detected), jump_host, timing), jump_host)
+                        device_info['device_type'] = device_type
+                    else:
+                        connection = open_connection(device_info, jump_host, timing)
+                    #connection.enable()
+                    # Execute show commands, saving each raw output as it arrives
+                    prompt = timing.find_prompt(connection, device_ip).strip("#<>[]")
+                    print(f'\nConnected to {prompt} [{device_ip}]\n')
+                    captures.save_device(device_ip, device_type=device_type, hostname=prompt)
+                    outputs = {}
+                    for command in PORT_MATRIX_COMMANDS:
+                        print(f'Collecting "{command}"...')
+                        outputs[command] = timing.send_command(connection, device_ip, command)
+                        captures.save(device_ip, command, outputs[command])
+
+                    print('Parsing and correlating interface data')
+                    merged_df = build_port_matrix(device_type, outputs, parse_cache)
+
+                    # Write the device's sheet now rather than holding every frame until the end
+                    print('Writing device sheet')
+                    write_device_sheet(report, index_sheet, prompt, merged_df, device_ip, dataset)
+                    add_to_snapshot(snapshot, prompt, device_ip, merged_df)
+
+                except Exception as e:
+                    print(f'Unknown exception with: {device_ip}\nError: {e}')
+                    joblog_data['Error'].append({'device_ip': device_ip, 'device_type': device_type, 'error': str(e)})
+            
+                finally:
+                    if connection is not None:
+                        connection.disconnect()
+                    # Write the device's capture manifest once, whether or not every command finished
+                    captures.flush(device_ip)
+                    print(f'\nCompleted processing on: {prompt} [{device_ip}].')
+        finally:
+            if jump_host is not None:
+                jump_host.close()
+        timing.save()
+        fingerprints.save()
+    finally:
+        snapshot.finish()
+        store.close()
+
+    # Finish the index and close the workbook
+    index_sheet.close()
+    report.close()
+    if dataset is not None:
+        dataset.close()
 
     # Save job log to JSON
     with open(joblog_out, 'w') as f:
         json.dump(joblog_data, f, indent=4)
-        
-def get_col_widths(dataframe):
-    # Get the maximum width of each column
-    return [max([len(str(value)) for value in dataframe[col].values] + [len(col)]) for col in dataframe.columns]
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
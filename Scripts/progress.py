@@ -0,0 +1,111 @@
+# Description:
+"""Throttled progress reporting for hot loops - rate, ETA, and log-only output when not on a terminal."""
+
+import logging
+import sys
+import time
+
+RENDER_INTERVAL = 0.25  # Seconds between terminal redraws (at most 4 per second)
+LOG_INTERVAL = 10.0  # Seconds between log lines when stdout isn't a terminal
+MIN_TOTAL = 20  # Loops with a known total smaller than this finish too fast to be worth reporting
+
+# Status lines for non-interactive runs get their own INFO-level logger and handler - the root logger is
+# left at WARNING unless a script configures it, which would otherwise drop every line
+logger = logging.getLogger('progress')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Function to format seconds as H:MM:SS / M:SS for the ETA
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+# Counts work done and redraws a single status line at most once per interval.
+# update() only adds to a counter and compares the clock, so it is cheap enough to call per line.
+# When stdout isn't a TTY (redirected, run from a scheduler) the status lines, final totals included,
+# are logged to stderr instead of being drawn. Loops with a total below min_total report nothing - pass
+# min_total=0 where each item is slow (a device login, a ping) so short runs still show progress.
+#
+#   with Progress("Parsing MAC entries", total=len(rows), unit="entries") as progress:
+#       for row in rows:
+#           ...
+#           progress.update()
+class Progress:
+    def __init__(self, label, total=None, unit='items', interval=None, stream=None, min_total=MIN_TOTAL):
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.stream = stream or sys.stdout
+        self.interactive = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self.quiet = total is not None and total < min_total
+        self.interval = interval if interval is not None else (RENDER_INTERVAL if self.interactive else LOG_INTERVAL)
+        self.count = 0
+        self.detail = ''
+        self.started = time.monotonic()
+        self._next_render = self.started + self.interval
+        self._width = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Function to record work done; detail is an optional short suffix (e.g. the current IP)
+    def update(self, count=1, detail=None):
+        self.count += count
+        if detail is not None:
+            self.detail = detail
+        now = time.monotonic()
+        if now >= self._next_render and not self.quiet:
+            self._next_render = now + self.interval
+            self._render(now)
+
+    def _status(self, now):
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.count / elapsed
+        if self.total:
+            percent = min(self.count / self.total, 1.0) * 100
+            status = f"{self.label}: {self.count}/{self.total} ({percent:.1f}%) - {rate:.1f} {self.unit}/s"
+            if rate > 0 and self.count < self.total:
+                status += f" - ETA {_format_duration((self.total - self.count) / rate)}"
+        else:
+            status = f"{self.label}: {self.count} {self.unit} - {rate:.1f} {self.unit}/s"
+        if self.detail:
+            status += f" - {self.detail}"
+        return status
+
+    def _render(self, now):
+        status = self._status(now)
+        if self.interactive:
+            # Pad over whatever was left from a longer previous line
+            self.stream.write('\r' + status.ljust(self._width))
+            self.stream.flush()
+            self._width = len(status)
+        else:
+            logger.info(status)
+
+    # Function to print a message on its own line without garbling the status line
+    def write(self, message):
+        if self.interactive and self._width:
+            self.stream.write('\r' + ' ' * self._width + '\r')
+            self._width = 0
+        print(message, file=self.stream)
+
+    # Function to draw the final totals and end the status line
+    def close(self):
+        if self.quiet:
+            return
+        now = time.monotonic()
+        status = self._status(now) + f" - done in {_format_duration(now - self.started)}"
+        if self.interactive:
+            self.stream.write('\r' + status.ljust(self._width) + '\n')
+            self.stream.flush()
+            self._width = 0
+        else:
+            logger.info(status)
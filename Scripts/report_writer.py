@@ -0,0 +1,108 @@
+# Description:
+"""Streams multi-sheet xlsx reports row by row in xlsxwriter's constant_memory mode."""
+
+import re
+import xlsxwriter
+
+MAX_COLUMN_WIDTH = 80  # Long values (descriptions, trunk lists) stop widening their column here
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+# Function to turn a value into something xlsxwriter can write - None/NaN/NA become a skipped cell
+def _cell(value):
+    if value is None:
+        return None
+    try:
+        if value != value:  # NaN
+            return None
+    except TypeError:  # pandas.NA refuses comparison
+        return None
+    return value
+
+# One worksheet being written top to bottom. Column widths are tracked as rows go through,
+# so nothing has to walk the finished sheet again; they're applied when the sheet is closed.
+class SheetStream:
+    def __init__(self, report, worksheet, name, columns, start_row):
+        self.report = report
+        self.worksheet = worksheet
+        self.name = name
+        self.row = start_row
+        self.columns = list(columns)
+        self.widths = [len(str(column)) for column in columns]
+        if columns:
+            worksheet.write_row(self.row, 0, columns, report.header_format)
+            worksheet.freeze_panes(self.row + 1, 0)
+            self.row += 1
+
+    def _track(self, col, value):
+        if col >= len(self.widths):
+            self.widths.extend([0] * (col + 1 - len(self.widths)))
+        width = len(str(value))
+        if width > self.widths[col]:
+            self.widths[col] = width
+
+    def write_row(self, values):
+        for col, value in enumerate(values):
+            value = _cell(value)
+            if value is None:
+                continue
+            self.worksheet.write(self.row, col, value)
+            self._track(col, value)
+        self.row += 1
+
+    # Function to write a dict row, picking its values in the sheet's column order
+    def write_record(self, record):
+        self.write_row([record.get(column) for column in self.columns])
+
+    # Function to stream a DataFrame's rows (no index) without building a second copy of it
+    def write_frame(self, frame):
+        for values in frame.itertuples(index=False, name=None):
+            self.write_row(values)
+
+    # Function to add a row holding a link to another sheet in this workbook
+    def write_link(self, sheet_name, text=None):
+        text = text or sheet_name
+        self.worksheet.write_url(self.row, 0, f"internal:'{sheet_name}'!A1", string=text)
+        self._track(0, text)
+        self.row += 1
+
+    def close(self):
+        for col, width in enumerate(self.widths):
+            self.worksheet.set_column(col, col, min(width, MAX_COLUMN_WIDTH) + 1)
+
+# Workbook opened up front and written as data arrives. In constant_memory mode each row is flushed
+# to a temp file once the next row starts, so memory stays flat however many sheets are written.
+class ReportWriter:
+    def __init__(self, path):
+        self.path = path
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.header_format = self.workbook.add_format({'bold': True, 'border': 1})
+        self.title_format = self.workbook.add_format({'bold': True, 'font_size': 14, 'align': 'center', 'valign': 'vcenter'})
+        self.sheet_names = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Function to make a valid, unique sheet name (max 31 characters, no []:*?/\)
+    def _sheet_name(self, name):
+        base = INVALID_SHEET_CHARS.sub('_', str(name))[:31]
+        sheet_name = base
+        suffix = 1
+        while sheet_name.lower() in self.sheet_names:
+            suffix += 1
+            sheet_name = f"{base[:31 - len(str(suffix)) - 1]}~{suffix}"
+        self.sheet_names.add(sheet_name.lower())
+        return sheet_name
+
+    # Function to start a sheet. The optional title is merged across B1:D1 and the header goes on header_row.
+    def add_sheet(self, name, columns, title=None, header_row=0):
+        sheet_name = self._sheet_name(name)
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        if title:
+            worksheet.merge_range('B1:D1', title, self.title_format)
+        return SheetStream(self, worksheet, sheet_name, columns, header_row)
+
+    def close(self):
+        self.workbook.close()
@@ -6,7 +6,9 @@ import os
 from datetime import date
 import json
 import getpass
-from netmiko import ConnectHandler
+from config_archive import ConfigArchive, RUNNING_CONFIG_COMMANDS
+from connect_helper import open_connection, prompt_jump_host
+from device_detect import AUTODETECT, FingerprintCache, connect_detected
 
 # Function to provide different show command libraries for different device types. 
 # device_type is defined in the inventory file selected and passed from there.
@@ -184,6 +186,11 @@ def main():
     preorpost = input("Discovery, Pre-change, or post-change? [type disc, pre, or post]: ")
     username = input("Enter your username: ")
     password = getpass.getpass(prompt="Enter your password: ")
+    jump_host = prompt_jump_host()
+    incremental = input("Reuse archived 'show run' for unchanged devices (incremental)? [y/n]: ").strip().lower() == 'y'
+
+    # Archived running configs for incremental mode
+    archive = ConfigArchive() if incremental else None
 
     # List of show commands to be sent to devices
     # If statement pivots from the device_type specified in the inventory
@@ -207,41 +214,59 @@ def main():
     #     # Add more commands as needed
     # ]
 
+    # Cached device types for inventory entries left as 'autodetect'
+    fingerprints = FingerprintCache()
+
     # Connect to devices and execute the show commands
-    for device in devices:
-        device_type = device['device_type']
-        device_ip = device['device_IP']
-        device_name = device['name']
-        show_commands = vendor_commands(device_type)
-    
-        device_info = {
-            'device_type': device_type,
-            'ip': device_ip,
-            'username': username,
-            'password': password,
-        }
+    try:
+        for device in devices:
+            device_type = device.get('device_type', AUTODETECT)
+            device_ip = device['device_IP']
+            device_name = device['name']
     
-        try:
-            connection = ConnectHandler(**device_info)
-            prompt = connection.find_prompt().strip('#<>[]')
-            filename = prompt + " - " + device_ip + " - " + preorpost + " - " + today + ".txt"
-            outfile = os.path.join(output_dir, filename)
-            file = open(outfile, "w")
-            file.write(f"{device_name.upper()} - {device_type} - {device_ip}")
-            file.write("\n\n")
-            # Add code here to add results to status JSON file that tracks status of each switch and/or errors
-            print(f"Device {device_name} ({device_type}) - Command outputs:")
-            for show_command in show_commands:
-                file.write(show_command)
-                file.write("\n")
-                output = connection.send_command(show_command)
-                #if output has some type of error message:
-                    #return some error message about syntax
-                file.write(output)
+            device_info = {
+                'device_type': device_type,
+                'ip': device_ip,
+                'username': username,
+                'password': password,
+            }
+
+            try:
+                if device_type == AUTODETECT:
+                    device_type, connection = connect_detected(device_info, fingerprints, lambda detected: open_connection(dict(device_info, device_type=detected), jump_host), jump_host)
+                    device_info['device_type'] = device_type
+                else:
+                    connection = open_connection(device_info, jump_host)
+                show_commands = vendor_commands(device_type)
+                prompt = connection.find_prompt().strip('#<>[]')
+                filename = prompt + " - " + device_ip + " - " + preorpost + " - " + today + ".txt"
+                outfile = os.path.join(output_dir, filename)
+                file = open(outfile, "w")
+                file.write(f"{device_name.upper()} - {device_type} - {device_ip}")
                 file.write("\n\n")
-                print(f"--- {show_command} ---")
-            connection.disconnect()
-            file.close()
-        except Exception as e:
-            print(f"Failed to connect to {device_ip} ({device_type})\nError:\n{str(e)}")
-            # Add code here to add results of exceptions to track status.
+                # Add code here to add results to status JSON file that tracks status of each switch and/or errors
+                print(f"Device {device_name} ({device_type}) - Command outputs:")
+                for show_command in show_commands:
+                    file.write(show_command)
+                    file.write("\n")
+                    if archive is not None and show_command in RUNNING_CONFIG_COMMANDS:
+                        # Incremental mode - only transfer the config if it changed since the archived copy
+                        output, reused = archive.get_config(device_ip, device_type, show_command, connection.send_command)
+                        if reused:
+                            print(f"Configuration unchanged on {prompt} - reusing archived '{show_command}'")
+                    else:
+                        output = connection.send_command(show_command)
+                    #if output has some type of error message:
+                        #return some error message about syntax
+                    file.write(output)
+                    file.write("\n\n")
+                    print(f"--- {show_command} ---")
+                connection.disconnect()
+                file.close()
+            except Exception as e:
+                print(f"Failed to connect to {device_ip} ({device_type})\nError:\n{str(e)}")
+                # Add code here to add results of exceptions to track status.
+    finally:
+        if jump_host is not None:
+            jump_host.close()
+    fingerprints.save()
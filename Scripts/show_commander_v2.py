@@ -8,7 +8,9 @@ import json
 import os
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog, scrolledtext
-from netmiko import ConnectHandler
+from capture_store import CaptureStore
+from connect_helper import JumpHost, open_connection
+from device_detect import AUTODETECT, FingerprintCache, connect_detected
 import logging
 import threading
 
@@ -147,6 +149,19 @@ frame.grid(row=2, column=0, padx=5, pady=5, sticky='nsew')
 main_frame.grid_rowconfigure(2, weight=1)
 main_frame.grid_columnconfigure(0, weight=1)
 
+# Frame for optional jump host (bastion) - leave blank to connect directly
+jump_frame = tk.Frame(main_frame)
+jump_frame.grid(row=3, column=0, padx=5, pady=5, sticky='w')
+tk.Label(jump_frame, text="Jump Host").grid(row=0, column=0, padx=5, pady=5)
+jump_host_entry = tk.Entry(jump_frame)
+jump_host_entry.grid(row=0, column=1, padx=5, pady=5)
+tk.Label(jump_frame, text="Username").grid(row=0, column=2, padx=5, pady=5)
+jump_username_entry = tk.Entry(jump_frame)
+jump_username_entry.grid(row=0, column=3, padx=5, pady=5)
+tk.Label(jump_frame, text="Password").grid(row=0, column=4, padx=5, pady=5)
+jump_password_entry = tk.Entry(jump_frame, show='*')
+jump_password_entry.grid(row=0, column=5, padx=5, pady=5)
+
 # Column labels
 tk.Label(frame, text="Delete").grid(row=0, column=0, padx=5, pady=5)
 tk.Label(frame, text="IP Address").grid(row=0, column=1, padx=5, pady=5)
@@ -168,7 +183,7 @@ def add_row(data=None):
     row = len(entries) + 1  # Adjust row index for new rows
     delete_button = tk.Button(frame, text="X", command=lambda r=row: delete_row(r))
     ip = tk.Entry(frame)
-    device_type = ttk.Combobox(frame, values=device_types)
+    device_type = ttk.Combobox(frame, values=device_types + [AUTODETECT])
     username = tk.Entry(frame)
     password = tk.Entry(frame, show='*')
 
@@ -220,7 +235,22 @@ def run_show_commands():
         terminal_print("Error: Invalid JSON format in command list.\n")
         logging.error("Error: Invalid JSON format in command list.\n")
         return
-        
+
+    # One shared jump host transport for every device in the run
+    jump_host = None
+    jump_input = jump_host_entry.get().strip()
+    if jump_input:
+        jump_ip, _, jump_port = jump_input.partition(':')
+        jump_host = JumpHost(jump_ip, jump_username_entry.get(), jump_password_entry.get(), port=jump_port or 22)
+        terminal_print(f"Tunnelling device sessions through jump host {jump_ip}\n")
+        logging.info(f"Tunnelling device sessions through jump host {jump_ip}")
+
+    # Cached device types for rows left blank or set to 'autodetect'
+    fingerprints = FingerprintCache(os.path.join(resource_dir, 'fingerprints.json'))
+
+    # Raw per-command output, kept for offline reprocessing (e.g. port_matrix_v2 offline mode)
+    captures = CaptureStore(os.path.join(output_dir, 'Captures', today), name=f"show-commander_{today}")
+
     for entry in entries:
         ip = entry['ip'].get()
         if not validate_ip(ip):
@@ -239,7 +269,15 @@ def run_show_commands():
         }
         
         try:
-            with ConnectHandler(**device) as net_connect:
+            if device_type in ('', AUTODETECT):
+                device_type, net_connect = connect_detected(device, fingerprints, lambda detected: open_connection(dict(device, device_type=detected), jump_host), jump_host)
+                device['device_type'] = device_type
+                terminal_print(f"Detected {ip} as {device_type}\n")
+                logging.info(f"Detected {ip} as {device_type}")
+            else:
+                net_connect = open_connection(device, jump_host)
+
+            with net_connect:
                 hostname = net_connect.find_prompt().strip('#<>[]')
                 outfile = f"{hostname} - {ip}.txt"
                 filename = os.path.join(output_dir, outfile)
@@ -247,12 +285,15 @@ def run_show_commands():
                 logging.info(f"Connected to {hostname} ({ip})")
                 terminal_print(f"Connected to {hostname} ({ip})\n")
 
+                captures.save_device(ip, device_type=device_type, hostname=hostname)
                 output = f"=====================\n{hostname} ({ip})\n=====================\n"
                 for command in show_commands[device_type]:
                     terminal_print(f"Sending {command}\n")
                     logging.info(f"Sending {command}\n")
+                    command_output = net_connect.send_command(command)
+                    captures.save(ip, command, command_output)
                     output += f"\n\n{command}\n{'-' * len(command)}\n"
-                    output += net_connect.send_command(command)
+                    output += command_output
                 
                 with open(filename, 'w') as file:
                     file.write(output)
@@ -264,7 +305,14 @@ def run_show_commands():
             logging.error(f"Failed to connect to {ip}: {str(e)}")
             terminal_print(f"Failed to connect to {ip}: {str(e)}\n")
             continue
-    
+        finally:
+            # Write the device's capture manifest once its commands are done
+            captures.flush(ip)
+
+    if jump_host is not None:
+        jump_host.close()
+    fingerprints.save()
+
     if any([os.path.exists(os.path.join(output_dir, f)) for f in os.listdir(output_dir)]):
         messagebox.showinfo("Success", "Output saved successfully.")
     else:
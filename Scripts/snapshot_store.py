@@ -0,0 +1,183 @@
+# Description:
+"""Keeps every collector's results in one indexed SQLite database, keyed by snapshot (one collection run)."""
+
+from datetime import datetime
+import os
+import re
+import sqlite3
+import threading
+
+DB_PATH = os.path.join('Output', 'snapshots.db')
+BATCH_SIZE = 1000  # Buffered rows written per transaction
+
+# Result tables and their columns - every table also carries snapshot_id
+TABLES = {
+    'devices': ['ip', 'hostname', 'device_type', 'make', 'model', 'serial', 'os_version', 'location'],
+    'interfaces': ['device_ip', 'hostname', 'interface', 'description', 'status', 'media', 'mode', 'access_vlan', 'voice_vlan', 'trunk_vlans'],
+    'mac_entries': ['device_ip', 'hostname', 'interface', 'vlan', 'mac', 'vendor'],
+    'arp_entries': ['device_ip', 'hostname', 'interface', 'vlan', 'ip', 'mac', 'vendor', 'name'],
+    'neighbors': ['device_ip', 'hostname', 'interface', 'protocol', 'neighbor', 'neighbor_ip', 'platform', 'neighbor_interface'],
+    'sweep_results': ['ip', 'icmp', 'ssh', 'telnet', 'http', 'https'],
+}
+
+# Columns the common lookups filter on
+INDEXES = {
+    'devices': [('ip',), ('serial',), ('hostname',)],
+    'interfaces': [('device_ip', 'interface')],
+    'mac_entries': [('mac',), ('device_ip', 'interface')],
+    'arp_entries': [('mac',), ('ip',)],
+    'neighbors': [('neighbor',), ('device_ip', 'interface')],
+    'sweep_results': [('ip',)],
+}
+
+# Function to normalise a MAC address to 12 lowercase hex digits so Cisco, Aruba and ARP formats match
+# ('AABB.CCDD.EEFF', 'aa:bb:cc:dd:ee:ff' and 'aa-bb-cc-dd-ee-ff' all become 'aabbccddeeff')
+def normalize_mac(mac):
+    if not mac:
+        return mac
+    digits = re.sub(r'[^0-9a-fA-F]', '', str(mac)).lower()
+    return digits if len(digits) == 12 else str(mac).lower()
+
+# Function to turn a value into something sqlite3 stores - None/NaN/NA become NULL, other types text
+def _value(value):
+    if value is None:
+        return None
+    try:
+        if value != value:  # NaN
+            return None
+    except TypeError:  # pandas.NA refuses comparison
+        return None
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+def _schema():
+    statements = [
+        "CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY, collector TEXT, site TEXT, started TEXT, finished TEXT)",
+        "CREATE INDEX IF NOT EXISTS idx_snapshots_started ON snapshots (started)",
+    ]
+    for table, columns in TABLES.items():
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (snapshot_id INTEGER REFERENCES snapshots (id), {', '.join(columns)})")
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_snapshot ON {table} (snapshot_id)")
+        for index in INDEXES.get(table, []):
+            statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(index)} ON {table} ({', '.join(index)})")
+    return ';\n'.join(statements) + ';'
+
+# One SQLite database in WAL mode, so lookups can run while a collector is writing.
+# Rows are buffered and written BATCH_SIZE at a time in a single transaction; one connection is shared
+# by every thread in the process behind a lock.
+class SnapshotStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_schema())
+        self.pending = {table: [] for table in TABLES}
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Function to start a snapshot for one collection run - returns a Snapshot to add its rows to
+    def start(self, collector, site=None):
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO snapshots (collector, site, started) VALUES (?, ?, ?)",
+                (collector, site, datetime.now().isoformat(timespec='seconds')),
+            )
+        return Snapshot(self, cursor.lastrowid)
+
+    # Function to buffer one row (a dict keyed by the table's column names) for a snapshot
+    def add(self, table, snapshot_id, record):
+        row = [snapshot_id]
+        for column in TABLES[table]:
+            value = _value(record.get(column))
+            row.append(normalize_mac(value) if column == 'mac' else value)
+        with self.lock:
+            self.pending[table].append(row)
+            self.count += 1
+            if self.count >= BATCH_SIZE:
+                self._flush()
+
+    # Function to write every buffered row in one transaction
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.count:
+            return
+        with self.connection:
+            for table, rows in self.pending.items():
+                if rows:
+                    placeholders = ', '.join('?' * (len(TABLES[table]) + 1))
+                    self.connection.executemany(f"INSERT INTO {table} (snapshot_id, {', '.join(TABLES[table])}) VALUES ({placeholders})", rows)
+        self.pending = {table: [] for table in TABLES}
+        self.count = 0
+
+    # Function to write out a snapshot's remaining rows and stamp its finish time
+    def finish(self, snapshot_id):
+        with self.lock:
+            self._flush()
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE snapshots SET finished = ? WHERE id = ?",
+                    (datetime.now().isoformat(timespec='seconds'), snapshot_id),
+                )
+
+    # Function to run a read query - returns a list of dicts
+    def query(self, sql, params=()):
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(sql, params)]
+
+    # Function to find where a MAC address was seen (switch MAC tables and ARP caches), newest first.
+    # since/until are ISO date or datetime strings compared against the snapshot start time (until is exclusive).
+    def find_mac(self, mac, since=None, until=None):
+        conditions = ["entry.mac = ?"]
+        params = [normalize_mac(mac)]
+        if since:
+            conditions.append("snapshots.started >= ?")
+            params.append(since)
+        if until:
+            conditions.append("snapshots.started < ?")
+            params.append(until)
+        where = ' AND '.join(conditions)
+        sql = (
+            f"SELECT 'mac_table' AS source, snapshots.started, snapshots.site, entry.device_ip, entry.hostname, entry.interface, entry.vlan, NULL AS ip "
+            f"FROM mac_entries AS entry JOIN snapshots ON snapshots.id = entry.snapshot_id WHERE {where} "
+            f"UNION ALL "
+            f"SELECT 'arp', snapshots.started, snapshots.site, entry.device_ip, entry.hostname, entry.interface, entry.vlan, entry.ip "
+            f"FROM arp_entries AS entry JOIN snapshots ON snapshots.id = entry.snapshot_id WHERE {where} "
+            f"ORDER BY started DESC"
+        )
+        return self.query(sql, params + params)
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.connection.close()
+
+# One collection run's handle - collectors add rows to it, then finish it
+class Snapshot:
+    def __init__(self, store, snapshot_id):
+        self.store = store
+        self.id = snapshot_id
+
+    def add(self, table, record):
+        self.store.add(table, self.id, record)
+
+    def add_many(self, table, records):
+        for record in records:
+            self.store.add(table, self.id, record)
+
+    def finish(self):
+        self.store.finish(self.id)
@@ -1,58 +1,32 @@
-import json
-import getpass
-from netmiko import ConnectHandler
-
-# Function to get ARP data from SilverPeak appliance
-def get_arp_data(device, command):
-    try:
-        # Establish an SSH connection to the device
-        connection = ConnectHandler(**device)
-
-        # Enable mode (no password required)
-        connection.enable()
-
-        # Enter shell mode
-        connection.send_command("_spsshell")
+# Author - Bryan Dufresne
+# Description:
+"""Collects ARP tables from many SilverPeak appliances in parallel via the SilverPeak shell."""
 
-        # Run the arp command and collect the output
-        arp_output = connection.send_command(command)
-
-        # Close the SSH connection
-        connection.disconnect()
-
-        return arp_output
-    except Exception as e:
-        return str(e)
-
-def main(ip):
-    # Define the target device and SSH parameters
-    device = {
-        'device_type': 'cisco_ios',  # SilverPeak devices often work with Cisco device_type
-        'ip': ip,
-        'username': input("Enter your username: "),
-        'password': getpass.getpass(prompt="Enter your password: "),
-    }
+import getpass
+from connect_helper import prompt_jump_host
+from gateway_harvester import parse_gateway_list, run_harvest
 
-    # Define the command to run (ARP excluding incomplete entries)
-    arp_command = "arp | grep -v incomplete"
+def main():
 
-    # Get ARP data from the device
-    arp_output = get_arp_data(device, arp_command)
+    print("#####\nSilverPeak ARPer\n#####\n")
 
-    # Process ARP output and extract IP and MAC addresses
-    arp_entries = []
-    for line in arp_output.splitlines():
-        if len(line.strip()) > 0:
-            parts = line.split()
-            if len(parts) >= 3:
-                ip_address, mac_address = parts[1], parts[3]
-                arp_entries.append({'ip': ip_address, 'mac': mac_address})
+    appliances = input("(Example: 172.16.1.1,172.16.1.2,etc)\nEnter SilverPeak IP addresses: ")
+    gateways = parse_gateway_list(appliances, 'silverpeak')
+    if not gateways:
+        print("No appliances to collect from.")
+        return
 
-    # Store the ARP data in a JSON file
-    with open('arp_data.json', 'w') as json_file:
-        json.dump(arp_entries, json_file, indent=4)
+    username = input("Enter your username: ")
+    password = getpass.getpass(prompt="Enter your password: ")
+    jump_host = prompt_jump_host()
 
-    print("ARP data extracted and saved in arp_data.json")
+    # Each appliance drops into _spsshell and runs 'arp | grep -v incomplete' in a thread pool;
+    # one JSON per appliance plus a combined summary are written to Output
+    try:
+        run_harvest(gateways, username, password, jump_host, prefix="SilverPeak ARP", collector='sp_arper')
+    finally:
+        if jump_host is not None:
+            jump_host.close()
 
 if __name__ == "__main__":
-    main(ip)
+    main()
@@ -6,7 +6,9 @@ import ipaddress
 import json
 import os
 from datetime import datetime
-from scapy.all import ARP, Ether, srp
+from scapy.all import ARP, Ether, conf, srp
+from dns_resolver import DnsResolver
+from snapshot_store import SnapshotStore
 
 def discover_hosts(subnet):
     active_hosts = []
@@ -39,46 +41,66 @@ def main():
 
     all_results = []
 
-    for subnet_str in subnets:
-        try:
-            subnet = ipaddress.ip_network(subnet_str.strip(), strict=False)
-        except ValueError:
-            print(f"Invalid subnet/CIDR format: {subnet_str.strip()}. Skipping.")
-            continue
-
-        output_filename = f"Recon - {subnet_str.replace('/', '-')} - {current_datetime}.json"
-
-        successful_pings = 0
-        total_attempts_subnet = 0
-
-        active_hosts = discover_hosts(subnet)
+    # ARP replies also go to the shared snapshot database
+    store = SnapshotStore()
+    snapshot = store.start('subnet_recon')
+
+    try:
+        # Reverse DNS answers are cached across subnets and saved for the next run
+        resolver = DnsResolver()
+
+        for subnet_str in subnets:
+            try:
+                subnet = ipaddress.ip_network(subnet_str.strip(), strict=False)
+            except ValueError:
+                print(f"Invalid subnet/CIDR format: {subnet_str.strip()}. Skipping.")
+                continue
+
+            output_filename = f"Recon - {subnet_str.replace('/', '-')} - {current_datetime}.json"
+
+            successful_pings = 0
+            total_attempts_subnet = 0
+
+            active_hosts = discover_hosts(subnet)
+            names = resolver.resolve_many(host['ip'] for host in active_hosts)
+            active_hosts = [dict(host, name=names.get(host['ip'])) for host in active_hosts]
+            # Entries are recorded against this machine's address on the segment, so each subnet's
+            # results only replace that subnet's previous recon
+            source_ip = conf.route.route(str(subnet.network_address))[1]
+            snapshot.add('devices', {'ip': source_ip})
+            snapshot.add_many('arp_entries', [dict(host, device_ip=source_ip) for host in active_hosts])
         
-        results_dict = {
-            "total_alive": len(active_hosts),
-            "subnet_size": len(list(subnet.hosts())),
-            "active_hosts": active_hosts
+            results_dict = {
+                "total_alive": len(active_hosts),
+                "subnet_size": len(list(subnet.hosts())),
+                "active_hosts": active_hosts
+            }
+
+            output_path_subnet = os.path.join(output_directory, output_filename)
+            with open(output_path_subnet, 'w') as json_file:
+                json.dump(results_dict, json_file, indent=4)
+
+            total_successful_pings += len(active_hosts)
+            total_attempts += len(list(subnet.hosts()))
+            all_results.extend(active_hosts)
+
+            print(f"\nSubnet recon for {subnet_str} completed.")
+            print(f"Results saved to: {output_path_subnet}")
+
+        combined_results = {
+            "total_successful": total_successful_pings,
+            "total_attempts": total_attempts,
+            "all_active_hosts": all_results
         }
 
-        output_path_subnet = os.path.join(output_directory, output_filename)
-        with open(output_path_subnet, 'w') as json_file:
-            json.dump(results_dict, json_file, indent=4)
-
-        total_successful_pings += len(active_hosts)
-        total_attempts += len(list(subnet.hosts()))
-        all_results.extend(active_hosts)
-
-        print(f"\nSubnet recon for {subnet_str} completed.")
-        print(f"Results saved to: {output_path_subnet}")
-
-    combined_results = {
-        "total_successful": total_successful_pings,
-        "total_attempts": total_attempts,
-        "all_active_hosts": all_results
-    }
+        combined_output_path = os.path.join(output_directory, f"Recon Summary - {current_datetime}.json")
+        with open(combined_output_path, 'w') as json_file:
+            json.dump(combined_results, json_file, indent=4)
 
-    combined_output_path = os.path.join(output_directory, f"Recon Summary - {current_datetime}.json")
-    with open(combined_output_path, 'w') as json_file:
-        json.dump(combined_results, json_file, indent=4)
+        resolver.save()
+    finally:
+        snapshot.finish()
+        store.close()
 
     print("\nSubnet recon completed.")
     print(f"Combined results saved to: {combined_output_path}")
@@ -7,6 +7,8 @@ import json
 import os
 from datetime import datetime
 from ping3 import ping
+from progress import Progress
+from snapshot_store import SnapshotStore
 
 def ping_host(host, active_hosts):
 	# Ping the host with a timeout of 1 second (adjust as needed)
@@ -42,76 +44,87 @@ def main():
     # Initialize a list to store active host IP addresses
     all_active_hosts = []
 
-    for subnet_str in subnets:
-        try:
-            # Parse the user input as a network
-            network = ipaddress.ip_network(subnet_str.strip(), strict=False)
-        except ValueError:
-            print(f"Invalid subnet/CIDR format: {subnet_str.strip()}. Skipping.")
-            continue
-
-        # Define the output filename using subnet/CIDR and current date/time
-        output_filename = f"Sweep - {subnet_str.replace('/', '-')} - {current_datetime}.json"
-
-        # Initialize variables to count successful pings and total attempts for this subnet
-        successful_pings = 0
-        total_attempts_subnet = 0
-
-        # Initialize an empty string to store ping results for this subnet
-        ping_results_subnet = ""
-
-        # Initialize a list to store active host IP addresses and MACs for this subnet
-        active_hosts = []
-        ip_mac = []
-
-        # Perform the ping sweep for each host in the network
-        for host in network.hosts():
-            total_attempts_subnet += 1
-            host = str(host)
-            result = ping_host(host, active_hosts)
-            ping_results_subnet += result
-
-            if result == "alive":
-                # Increment the successful ping counter
-                successful_pings += 1
-
-                # Display results on the same line as they come in
-                print(f"\rResults: ({successful_pings}/{total_attempts_subnet})", end='')
-
-
-        # Create a dictionary to store the results and active host IP addresses for this subnet
-        results_dict = {
-            "total_alive": successful_pings,
-            "subnet_size": total_attempts_subnet,
-            "active_hosts": active_hosts
+    # Every host's ping result also goes to the shared snapshot database
+    store = SnapshotStore()
+    snapshot = store.start('subnet_sweeper')
+
+    try:
+        for subnet_str in subnets:
+            try:
+                # Parse the user input as a network
+                network = ipaddress.ip_network(subnet_str.strip(), strict=False)
+            except ValueError:
+                print(f"Invalid subnet/CIDR format: {subnet_str.strip()}. Skipping.")
+                continue
+
+            # Define the output filename using subnet/CIDR and current date/time
+            output_filename = f"Sweep - {subnet_str.replace('/', '-')} - {current_datetime}.json"
+
+            # Initialize variables to count successful pings and total attempts for this subnet
+            successful_pings = 0
+            total_attempts_subnet = 0
+
+            # Initialize an empty string to store ping results for this subnet
+            ping_results_subnet = ""
+
+            # Initialize a list to store active host IP addresses and MACs for this subnet
+            active_hosts = []
+            ip_mac = []
+
+            # Perform the ping sweep for each host in the network (/31 and /32 have no network/broadcast address)
+            host_count = network.num_addresses - 2 if network.num_addresses > 2 else network.num_addresses
+            progress = Progress(f"Sweeping {network}", total=host_count, unit="hosts", min_total=0)
+            for host in network.hosts():
+                total_attempts_subnet += 1
+                host = str(host)
+                result = ping_host(host, active_hosts)
+                ping_results_subnet += result
+                snapshot.add('sweep_results', {'ip': host, 'icmp': result == "alive"})
+
+                if result == "alive":
+                    # Increment the successful ping counter
+                    successful_pings += 1
+
+                # Results redraw on the same line at a throttled rate
+                progress.update(detail=f"Alive: {successful_pings}")
+
+
+            # Create a dictionary to store the results and active host IP addresses for this subnet
+            results_dict = {
+                "total_alive": successful_pings,
+                "subnet_size": total_attempts_subnet,
+                "active_hosts": active_hosts
+            }
+
+            # Write the ping results for this subnet to a JSON file
+            output_path_subnet = os.path.join(output_directory, output_filename)
+            with open(output_path_subnet, 'w') as json_file:
+                json.dump(results_dict, json_file, indent=4)
+
+            # Update the total counts and active host list
+            total_successful_pings += successful_pings
+            total_attempts += total_attempts_subnet
+            all_active_hosts.extend(active_hosts)
+
+            progress.close()
+            print(f"Ping sweep for {subnet_str} completed.")
+            print(f"Results saved to: {output_path_subnet}")
+
+        # Create a dictionary for the combined results and active host IP addresses
+        combined_results = {
+            "total_successful": total_successful_pings,
+            "total_attempts": total_attempts,
+            "all_active_hosts": all_active_hosts
         }
 
-        # Write the ping results for this subnet to a JSON file
-        output_path_subnet = os.path.join(output_directory, output_filename)
-        with open(output_path_subnet, 'w') as json_file:
-            json.dump(results_dict, json_file, indent=4)
-
-        # Update the total counts and active host list
-        total_successful_pings += successful_pings
-        total_attempts += total_attempts_subnet
-        all_active_hosts.extend(active_hosts)
-
-        print(f"\nPing sweep for {subnet_str} completed.")
-        print(f"Results saved to: {output_path_subnet}")
-
-    # Create a dictionary for the combined results and active host IP addresses
-    combined_results = {
-        "total_successful": total_successful_pings,
-        "total_attempts": total_attempts,
-        "all_active_hosts": all_active_hosts
-    }
-
-    # Write the combined results to a JSON file
-    combined_output_path = os.path.join(output_directory, f"Sweep Summary - {current_datetime}.json")
-    with open(combined_output_path, 'w') as json_file:
-        json.dump(combined_results, json_file, indent=4)
+        # Write the combined results to a JSON file
+        combined_output_path = os.path.join(output_directory, f"Sweep Summary - {current_datetime}.json")
+        with open(combined_output_path, 'w') as json_file:
+            json.dump(combined_results, json_file, indent=4)
+    finally:
+        snapshot.finish()
+        store.close()
 
-															
     print("\nPing sweeps completed.")
     print(f"Combined results saved to: {combined_output_path}")
 
@@ -0,0 +1,84 @@
+# Description:
+"""Header-driven single-pass parser for fixed-width 'show' tables."""
+
+import re
+
+RULER_PATTERN = re.compile(r'-+')
+HEADER_GAP = re.compile(r'\S+(?: \S+)*')  # Header words separated by single spaces belong together
+
+# Function to find column start offsets in a header line.
+# Known column names are located in order; otherwise a dashed ruler under the header is used,
+# and failing that, header words separated by two or more spaces are treated as one column.
+def column_spans(header, ruler=None, columns=None):
+    if columns:
+        starts = []
+        position = 0
+        for name in columns:
+            position = header.index(name, position)
+            starts.append(position)
+            position += len(name)
+        names = list(columns)
+    elif ruler is not None:
+        starts = [match.start() for match in RULER_PATTERN.finditer(ruler)]
+        names = [header[start:end].strip() for start, end in zip(starts, starts[1:] + [None])]
+    else:
+        matches = list(HEADER_GAP.finditer(header))
+        starts = [match.start() for match in matches]
+        names = [match.group() for match in matches]
+    return names, starts
+
+# Function to slice one row at the column starts. A value that straddles a boundary (right-aligned
+# values like 'a-1000' under 'Speed') is given to the column it starts in.
+def _slice_row(line, starts):
+    bounds = []
+    previous = 0
+    for start in starts[1:]:
+        while start > previous and start < len(line) and line[start] != ' ' and line[start - 1] != ' ':
+            start -= 1
+        bounds.append(start)
+        previous = start
+    cuts = [0] + bounds + [None]
+    return [line[begin:end].strip() for begin, end in zip(cuts, cuts[1:])]
+
+def _is_header(line, columns):
+    if not columns:
+        return bool(line.strip())
+    position = 0
+    for name in columns:
+        position = line.find(name, position)
+        if position == -1:
+            return False
+        position += len(name)
+    return True
+
+# Function to parse a fixed-width table into column arrays: {column name: [value per row]}.
+# The header is the first line containing every name in columns (or the first non-blank line);
+# spans are computed from it once and every following non-blank row is sliced in a single pass.
+def parse_fixed_width(output, columns=None):
+    lines = output.splitlines()
+    for index, line in enumerate(lines):
+        if _is_header(line, columns):
+            break
+    else:
+        return {name: [] for name in columns or []}
+
+    header = lines[index]
+    body = lines[index + 1:]
+    ruler = None
+    if body and set(body[0].strip()) <= {'-', ' '} and body[0].strip():
+        ruler = body[0]
+        body = body[1:]
+
+    names, starts = column_spans(header, ruler, columns)
+    table = {name: [] for name in names}
+    arrays = [table[name] for name in names]
+    for line in body:
+        if not line.strip():
+            continue
+        for array, value in zip(arrays, _slice_row(line, starts)):
+            array.append(value)
+    return table
+
+# Function to turn column arrays back into row tuples in the given column order
+def table_rows(table, columns):
+    return zip(*(table[name] for name in columns))
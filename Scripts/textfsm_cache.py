@@ -0,0 +1,117 @@
+# Description:
+"""Parses raw 'show' output with precompiled ntc-templates TextFSM objects in a process pool."""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from importlib import metadata
+import logging
+import os
+import threading
+import textfsm
+from textfsm import clitable
+from ntc_templates import parse as ntc_parse
+
+# Returned by _template() when the index maps a command to several templates that must be merged
+MULTI_TEMPLATE = 'multi'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Function to map a netmiko device_type to its ntc-templates platform ('cisco_ios_telnet' -> 'cisco_ios')
+def _platform(device_type):
+    for suffix in ('_ssh', '_telnet', '_serial'):
+        if device_type.endswith(suffix):
+            return device_type[:-len(suffix)]
+    return device_type
+
+# Function to load the ntc-templates index once per process
+@lru_cache(maxsize=1)
+def _index():
+    return clitable.CliTable('index', ntc_parse._get_template_dir())
+
+# Function to look up and compile the template for (platform, command) once per process.
+# Returns the TextFSM object, None when there's no template, or MULTI_TEMPLATE.
+@lru_cache(maxsize=512)
+def _template(platform, command):
+    index = _index()
+    row = index.index.GetRowMatch({'Platform': platform, 'Command': command})
+    if not row:
+        return None
+    templates = index.index.index[row]['Template'].split(':')
+    if len(templates) > 1:
+        return MULTI_TEMPLATE
+    with open(os.path.join(index.template_dir, templates[0]), 'r') as file:
+        return textfsm.TextFSM(file)
+
+# Function run in a worker process - returns a list of dicts with lowercase keys (like use_textfsm=True),
+# or the raw output unchanged when there's no template or it doesn't match, as netmiko does
+def _parse(platform, command, output):
+    fsm = _template(platform, command)
+    if fsm is None:
+        return output
+    try:
+        if fsm == MULTI_TEMPLATE:
+            return ntc_parse.parse_output(platform=platform, command=command, data=output)
+        # Workers run one task at a time, so the cached FSM is safe to reset and reuse
+        fsm.Reset()
+        records = fsm.ParseTextToDicts(output)
+    except (textfsm.TextFSMError, clitable.CliTableError):
+        return output
+    return [{key.lower(): value for key, value in record.items()} for record in records]
+
+# Function to parse in the calling process - for code that is already running in a worker process
+def parse_text(device_type, command, output):
+    return _parse(_platform(device_type), command, output)
+
+# Function to get the installed ntc-templates release - part of the parse cache key, so upgraded templates reparse
+@lru_cache(maxsize=1)
+def templates_version():
+    try:
+        return metadata.version('ntc_templates')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+# Function to get the shared parser pool, started on first use
+def parser_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor()
+        return _pool
+
+# Function to queue raw output for parsing and return a Future - the collecting thread can go
+# straight back to the device while the regex work runs in another process.
+# With a ParseCache, unchanged output is answered from disk without touching the pool.
+def parse_output_async(device_type, command, output, cache=None):
+    platform = _platform(device_type)
+    if cache is None:
+        return parser_pool().submit(_parse, platform, command, output)
+
+    key = cache.key(command, platform, templates_version(), output)
+    hit, records = cache.get(key)
+    if hit:
+        future = Future()
+        future.set_result(records)
+        return future
+
+    # The caller's future is only resolved once the result is in the cache, so records are pickled
+    # before the caller can start mutating them
+    future = Future()
+
+    def store(done):
+        error = done.exception()
+        if error is not None:
+            future.set_exception(error)
+            return
+        try:
+            cache.put(key, done.result())
+        except Exception as e:
+            logging.error(f"Unable to cache parsed '{command}' output: {e}")
+        future.set_result(done.result())
+
+    parser_pool().submit(_parse, platform, command, output).add_done_callback(store)
+    return future
+
+# Function to parse raw output in the pool and wait for the result
+def parse_output(device_type, command, output, cache=None):
+    return parse_output_async(device_type, command, output, cache).result()
@@ -0,0 +1,109 @@
+# Description:
+"""Learns per-device prompt latency and command durations to tune netmiko timing."""
+
+import json
+import os
+import threading
+import time
+from netmiko.exceptions import ReadTimeout
+
+PROFILE_PATH = os.path.join('Resources', 'timing_profiles.json')
+
+# Prompt latency (seconds) of a device that is happy with netmiko's default timing
+BASELINE_PROMPT = 0.5
+MAX_DELAY_FACTOR = 60  # What slower old gear like HP Comware needed by hand
+
+# Learned read_timeout = observed worst case * headroom, kept within these bounds
+TIMEOUT_HEADROOM = 3
+MIN_READ_TIMEOUT = 10.0
+MAX_READ_TIMEOUT = 600.0
+
+# Weight given to the newest sample in the running average
+SMOOTHING = 0.3
+
+# Keeps a JSON store of timing observations keyed by device IP, then by command:
+# {"10.0.0.1": {"prompt": 0.42, "commands": {"show run": {"avg": 3.1, "max": 4.0}}}}
+class TimingProfiles:
+    def __init__(self, path=PROFILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.profiles = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as file:
+                    self.profiles = json.load(file)
+            except (OSError, ValueError):
+                self.profiles = {}
+
+    def _profile(self, ip):
+        return self.profiles.setdefault(ip, {'prompt': None, 'commands': {}})
+
+    # Function to return device_info with a delay factor learned from prompt latency.
+    # Devices with no history keep whatever global_delay_factor was passed in.
+    def apply(self, device_info):
+        profile = self.profiles.get(device_info.get('ip'))
+        if not profile or profile.get('prompt') is None:
+            return device_info
+
+        delay_factor = min(max(profile['prompt'] / BASELINE_PROMPT, 1), MAX_DELAY_FACTOR)
+        tuned = dict(device_info)
+        tuned['global_delay_factor'] = round(delay_factor, 1)
+        # Only let netmiko trim its sleeps on devices that answer quickly
+        tuned['fast_cli'] = delay_factor <= 1
+        return tuned
+
+    # Function to get the read_timeout for a command from its worst observed duration
+    def read_timeout(self, ip, command, default=30.0):
+        stats = self.profiles.get(ip, {}).get('commands', {}).get(command)
+        if not stats:
+            return default
+        return min(max(stats['max'] * TIMEOUT_HEADROOM, MIN_READ_TIMEOUT), MAX_READ_TIMEOUT)
+
+    def record_prompt(self, ip, seconds):
+        with self._lock:
+            profile = self._profile(ip)
+            previous = profile.get('prompt')
+            profile['prompt'] = seconds if previous is None else previous + SMOOTHING * (seconds - previous)
+
+    def record_command(self, ip, command, seconds):
+        with self._lock:
+            commands = self._profile(ip)['commands']
+            stats = commands.get(command)
+            if stats is None:
+                commands[command] = {'avg': seconds, 'max': seconds}
+            else:
+                stats['avg'] += SMOOTHING * (seconds - stats['avg'])
+                # Let the worst case decay slowly so one bad night doesn't stick forever
+                stats['max'] = max(seconds, stats['max'] - SMOOTHING * (stats['max'] - stats['avg']))
+
+    # Function to run find_prompt and record how long the device took to answer
+    def find_prompt(self, connection, ip):
+        start = time.monotonic()
+        prompt = connection.find_prompt()
+        elapsed = time.monotonic() - start
+        # find_prompt sleeps 0.25s per unit of delay factor - take that back out so a
+        # raised factor doesn't feed on itself and ratchet up run after run
+        delay_factor = getattr(connection, 'global_delay_factor', 1) or 1
+        self.record_prompt(ip, max(elapsed - 0.25 * (delay_factor - 1), 0))
+        return prompt
+
+    # Function to run send_command with a learned read_timeout and record its duration
+    def send_command(self, connection, ip, command, default_timeout=10.0, **kwargs):
+        read_timeout = self.read_timeout(ip, command, default_timeout)
+        start = time.monotonic()
+        try:
+            output = connection.send_command(command, read_timeout=read_timeout, **kwargs)
+        except ReadTimeout:
+            # Remember the miss so the next run waits twice as long for this command
+            self.record_command(ip, command, read_timeout * 2 / TIMEOUT_HEADROOM)
+            raise
+        self.record_command(ip, command, time.monotonic() - start)
+        return output
+
+    def save(self):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, 'w') as file:
+                json.dump(self.profiles, file, indent=4)
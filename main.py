@@ -2,28 +2,66 @@
 # Description:
 """Aggregates modules from Scripts directory and provides selection to execute."""
 
+import ast
 import cowsay
 import importlib
 import os
+import sys
 
-# Function to list Python files in a directory
+# Scripts import their shared helpers by bare module name (e.g. 'from connect_helper import ...')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Scripts'))
+
+# Menu metadata caches - {directory: (mtime, files)} and {path: (mtime, description, has_main)}
+_file_cache = {}
+_module_cache = {}
+
+# Function to list Python files in a directory - rescanned only when the directory's mtime changes
 def list_python_files(directory):
+    mtime = os.stat(directory).st_mtime_ns
+    cached = _file_cache.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
     python_files = []
     for root, dirs, files in os.walk(directory):
         for file in files:
             if file.endswith('.py') and file != '__init__.py':
                 python_files.append(file)
+    _file_cache[directory] = (mtime, python_files)
     return python_files
 
-# Function to get the module description from its docstring
-def get_module_description(module_name):
+# Function to read a module's description (its docstring) and whether it defines a top-level 'main'.
+# The file is parsed with ast rather than imported, so listing a module never loads its dependencies
+# or runs its top-level code; the result is cached until the file's mtime changes.
+def get_module_info(module_name, directory='Scripts'):
+    path = os.path.join(directory, f'{module_name}.py')
     try:
-        # Dynamically import the module using importlib
-        module = importlib.import_module(f'Scripts.{module_name}')
-        # Retrieve the module's docstring (__doc__) or provide a default message
-        return module.__doc__ or "No description available."
-    except ModuleNotFoundError:
-        return "No description available."
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return "No description available.", False
+    cached = _module_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            tree = ast.parse(file.read(), filename=path)
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+        tree = None
+    docstring = ast.get_docstring(tree) if tree is not None else None
+    has_main = tree is not None and any(isinstance(node, ast.FunctionDef) and node.name == 'main' for node in tree.body)
+    # Retrieve the module's docstring or provide a default message
+    description = docstring or "No description available."
+    _module_cache[path] = (mtime, description, has_main)
+    return description, has_main
+
+# Function to get the module description from its docstring
+def get_module_description(module_name, directory='Scripts'):
+    return get_module_info(module_name, directory)[0]
+
+# Function to list the modules that can be run from the menu - helper libraries without a 'main' are left out
+def list_runnable_modules(directory):
+    return [file for file in list_python_files(directory) if get_module_info(file[:-3], directory)[1]]
 
 # Function to execute the selected module's 'main' function
 def execute_selected_module(module_name):
@@ -49,13 +87,13 @@ def main():
 
     while True:
         print("Available modules:")
-        python_files = list_python_files(script_directory)
+        python_files = list_runnable_modules(script_directory)
 
         print("0. Exit")  # Option to exit the script
 
         for idx, module_file in enumerate(python_files, start=1):
             module_name = module_file[:-3]  # Remove '.py' extension
-            description = get_module_description(module_name)
+            description = get_module_description(module_name, script_directory)
             print(f"{idx}. {module_name}:\t\t{description}")  # Display module and description on the same line with a tab
 
         try:
@@ -0,0 +1,235 @@
+"""Runs JumpHost and open_connection against a local paramiko stand-in bastion and a fake Cisco device."""
+
+import os
+import socket
+import sys
+import threading
+import unittest
+
+import paramiko
+from netmiko.exceptions import NetmikoAuthenticationException
+
+# Scripts import each other by bare module name, as they do when run from main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts'))
+
+from connect_helper import JumpHost, open_connection
+
+HOST_KEY = paramiko.RSAKey.generate(2048)
+SHOW_VERSION = "Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(7)E4\r\n"
+
+
+# Function to copy bytes from one socket-like object to another until either side closes
+def _pump(source, destination):
+    try:
+        while True:
+            data = source.recv(4096)
+            if not data:
+                break
+            destination.sendall(data)
+    except (OSError, EOFError):
+        pass
+    finally:
+        for end in (source, destination):
+            try:
+                end.close()
+            except OSError:
+                pass
+
+
+# Function to accept connections on a listening socket forever, handing each to handler in a thread
+def _serve(listener, handler):
+    def accept():
+        while True:
+            try:
+                client, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=handler, args=(client,), daemon=True).start()
+    threading.Thread(target=accept, daemon=True).start()
+
+
+def _listen():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(8)
+    return listener
+
+
+# Stand-in bastion: password auth, and direct-tcpip channels forwarded to whatever is listening locally
+class BastionServer(paramiko.ServerInterface):
+    def __init__(self, bastion):
+        self.bastion = bastion
+        self.upstream = {}
+
+    def check_auth_password(self, username, password):
+        self.bastion.logins.append(username)
+        if (username, password) == ('bastion-user', 'secret'):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        try:
+            self.upstream[chanid] = socket.create_connection(destination, timeout=2)
+        except OSError:
+            return paramiko.OPEN_FAILED_CONNECT_FAILED
+        self.bastion.destinations.append(destination)
+        return paramiko.OPEN_SUCCEEDED
+
+
+class Bastion:
+    def __init__(self):
+        self.logins = []
+        self.destinations = []
+        self.listener = _listen()
+        self.port = self.listener.getsockname()[1]
+        _serve(self.listener, self.handle)
+
+    def handle(self, client):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(HOST_KEY)
+        server = BastionServer(self)
+        transport.start_server(server=server)
+        while transport.is_active():
+            channel = transport.accept(timeout=0.5)
+            if channel is None:
+                continue
+            upstream = server.upstream.pop(channel.get_id())
+            threading.Thread(target=_pump, args=(channel, upstream), daemon=True).start()
+            threading.Thread(target=_pump, args=(upstream, channel), daemon=True).start()
+
+    def close(self):
+        self.listener.close()
+
+
+# Fake Cisco IOS device: an SSH shell that echoes each command and answers at the 'sw1#' prompt
+class DeviceServer(paramiko.ServerInterface):
+    def __init__(self):
+        self.shell = threading.Event()
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL if (username, password) == ('admin', 'cisco') else paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == 'session' else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+
+class Device:
+    def __init__(self):
+        self.listener = _listen()
+        self.port = self.listener.getsockname()[1]
+        _serve(self.listener, self.handle)
+
+    def handle(self, client):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(HOST_KEY)
+        server = DeviceServer()
+        try:
+            transport.start_server(server=server)
+        except paramiko.SSHException:
+            return
+        channel = transport.accept(timeout=10)
+        if channel is None or not server.shell.wait(10):
+            transport.close()
+            return
+        channel.sendall(b"\r\nsw1#")
+        buffer = b''
+        while True:
+            data = channel.recv(1024)
+            if not data:
+                break
+            buffer += data
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                command = line.decode().strip()
+                output = SHOW_VERSION if command == 'show version' else ''
+                channel.sendall(f"{command}\r\n{output}sw1#".encode())
+        transport.close()
+
+    def close(self):
+        self.listener.close()
+
+
+# JumpHost that keeps every channel it opens, so tests can check they were closed
+class RecordingJumpHost(JumpHost):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.channels = []
+
+    def open_channel(self, ip, port=22):
+        channel = super().open_channel(ip, port)
+        self.channels.append(channel)
+        return channel
+
+
+class JumpHostTests(unittest.TestCase):
+    def setUp(self):
+        self.bastion = Bastion()
+        self.device = Device()
+        self.addCleanup(self.bastion.close)
+        self.addCleanup(self.device.close)
+        self.jump_host = RecordingJumpHost('127.0.0.1', 'bastion-user', 'secret', port=self.bastion.port)
+        self.addCleanup(self.jump_host.close)
+
+    def device_info(self, password='cisco'):
+        return {'device_type': 'cisco_ios', 'ip': '127.0.0.1', 'port': self.device.port, 'username': 'admin', 'password': password, 'fast_cli': True}
+
+    def test_sessions_share_one_bastion_login(self):
+        for _ in range(2):
+            connection = open_connection(self.device_info(), self.jump_host)
+            self.assertEqual(connection.find_prompt(), 'sw1#')
+            self.assertIn('Version 15.2(7)E4', connection.send_command('show version'))
+            connection.disconnect()
+
+        self.assertEqual(self.bastion.logins, ['bastion-user'])
+        self.assertEqual(self.bastion.destinations, [('127.0.0.1', self.device.port)] * 2)
+
+    def test_failed_login_closes_the_channel(self):
+        with self.assertRaises(NetmikoAuthenticationException):
+            open_connection(self.device_info(password='wrong'), self.jump_host)
+        self.assertEqual(len(self.jump_host.channels), 1)
+        self.assertTrue(self.jump_host.channels[0].closed)
+
+    def test_telnet_is_refused_through_a_jump_host(self):
+        with self.assertRaises(ValueError):
+            open_connection(dict(self.device_info(), device_type='cisco_ios_telnet'), self.jump_host)
+
+    def test_probe(self):
+        closed = _listen()
+        closed_port = closed.getsockname()[1]
+        closed.close()
+        self.assertTrue(self.jump_host.probe('127.0.0.1', self.device.port))
+        self.assertFalse(self.jump_host.probe('127.0.0.1', closed_port))
+        self.assertTrue(self.jump_host.channels[0].closed)
+
+    def test_reconnects_after_the_transport_drops(self):
+        self.jump_host.connect()
+        self.jump_host._client.get_transport().close()
+        self.jump_host.probe('127.0.0.1', self.device.port)
+        self.assertEqual(self.bastion.logins, ['bastion-user', 'bastion-user'])
+
+    def test_context_manager_closes_the_bastion(self):
+        with self.jump_host as jump_host:
+            transport = jump_host._client.get_transport()
+            self.assertTrue(transport.is_active())
+        self.assertFalse(transport.is_active())
+        self.assertIsNone(self.jump_host._client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Checks which reverse lookup failures DnsResolver caches as misses."""
+
+import os
+import socket
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Scripts import each other by bare module name, as they do when run from main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts'))
+
+from dns_resolver import DnsResolver
+
+
+class DnsResolverTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.resolver = DnsResolver(os.path.join(directory.name, 'dns_cache.json'))
+
+    def lookup(self, error):
+        with mock.patch('dns_resolver.socket.gethostbyaddr', side_effect=error):
+            return self.resolver.resolve('10.0.0.5')
+
+    def test_not_found_codes_are_cached_as_misses(self):
+        # HOST_NOT_FOUND, NO_DATA, WSAHOST_NOT_FOUND, WSANO_DATA
+        for code in (1, 4, 11001, 11004):
+            self.resolver.entries.clear()
+            self.assertIsNone(self.lookup(socket.herror(code, 'Unknown host')))
+            self.assertEqual(self.resolver.cached('10.0.0.5'), (True, None), code)
+
+    def test_windows_gaierror_miss_is_cached(self):
+        self.assertIsNone(self.lookup(socket.gaierror(11001, 'No such host is known')))
+        self.assertEqual(self.resolver.cached('10.0.0.5'), (True, None))
+
+    def test_transient_failures_are_not_cached(self):
+        for error in (socket.herror(2, 'Try again'), socket.herror(11002, 'Try again'), socket.timeout('timed out')):
+            with self.assertLogs(level='ERROR'):
+                self.assertIsNone(self.lookup(error))
+            self.assertEqual(self.resolver.cached('10.0.0.5'), (False, None), error)
+
+    def test_names_are_cached(self):
+        with mock.patch('dns_resolver.socket.gethostbyaddr', return_value=('pc-1.corp.local', [], ['10.0.0.5'])):
+            self.assertEqual(self.resolver.resolve('10.0.0.5'), 'pc-1.corp.local')
+        self.assertEqual(self.resolver.cached('10.0.0.5'), (True, 'pc-1.corp.local'))
+
+
+if __name__ == '__main__':
+    unittest.main()
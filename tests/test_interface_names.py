@@ -0,0 +1,41 @@
+"""Checks interface name canonicalization across Cisco, Comware and HP ProCurve/Aruba spellings."""
+
+import os
+import sys
+import unittest
+
+# Scripts import each other by bare module name, as they do when run from main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Scripts'))
+
+from interface_names import canonical_interface, is_ethernet, long_interface_type
+
+
+class CanonicalInterfaceTests(unittest.TestCase):
+    def test_long_and_short_cisco_names_share_a_key(self):
+        for name in ('GigabitEthernet1/0/1', 'Gi1/0/1', 'gi 1/0/1', 'Gig1/0/1', 'GigabitEth1/0/1,'):
+            self.assertEqual(canonical_interface(name), 'Gi1/0/1', name)
+        self.assertEqual(canonical_interface('TenGigabitEthernet1/1/1'), 'Te1/1/1')
+        self.assertEqual(canonical_interface('Port-channel10'), 'Po10')
+        self.assertEqual(canonical_interface('Vlan100'), 'Vl100')
+        self.assertEqual(canonical_interface('XGE1/0/49'), 'Te1/0/49')
+
+    def test_procurve_ports_are_left_unchanged(self):
+        for name in ('A1', 'A2', 'B24', 'S1', 'D1', 'L1', 'V1', '24'):
+            self.assertEqual(canonical_interface(name), name)
+        self.assertEqual(canonical_interface('Trk1'), 'Trk1')
+
+    def test_procurve_ports_are_ethernet(self):
+        for name in ('A1', 'B24', '24'):
+            self.assertTrue(is_ethernet(name), name)
+            self.assertEqual(long_interface_type(name), 'Ethernet')
+        self.assertFalse(is_ethernet('Trk1'))
+
+    def test_cisco_ethernet_detection(self):
+        self.assertTrue(is_ethernet('Gi1/0/1'))
+        self.assertFalse(is_ethernet('Vl1'))
+        self.assertFalse(is_ethernet('Po1'))
+        self.assertEqual(long_interface_type('Te1/1/1'), 'TenGigabitEthernet')
+
+
+if __name__ == '__main__':
+    unittest.main()